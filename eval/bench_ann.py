@@ -0,0 +1,66 @@
+"""Recall@k vs per-query latency of the IVF / HNSW index types against exact flat search.
+
+Usage: python eval/bench_ann.py [corpus_chunks] [dim] [queries]
+The corpus is synthetic: L2-normalised vectors drawn around topic centroids, the
+same shape as the normalised TF-IDF rows a segment holds (use a small dim to stay
+within memory at 200k rows). Indexes are built with index_faiss.build_ann_index;
+prints a JSON summary like run_eval.py.
+"""
+import json, os, statistics, sys, tempfile, time
+
+
+os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='bench-ann-')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import faiss  # noqa: E402
+import numpy as np  # noqa: E402
+from src.app.core import index_faiss  # noqa: E402
+from src.app.core.config import settings  # noqa: E402
+
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+DIM = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+QUERIES = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+K = 5
+
+
+rng = np.random.default_rng(3)
+topics = rng.standard_normal((max(1, N // 200), DIM)).astype('float32')
+corpus = topics[rng.integers(0, len(topics), N)] + 0.6 * rng.standard_normal((N, DIM)).astype('float32')
+corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+queries = corpus[rng.integers(0, N, QUERIES)] + 0.3 * rng.standard_normal((QUERIES, DIM)).astype('float32')
+queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+_, truth = faiss.knn(queries, corpus, K, metric=faiss.METRIC_INNER_PRODUCT)
+
+
+def measure(search):
+    samples, hits = [], 0
+    for qi in range(QUERIES):
+        t0 = time.perf_counter()
+        ids = search(queries[qi:qi + 1])
+        samples.append((time.perf_counter() - t0) * 1000)
+        hits += len(set(ids[0].tolist()) & set(truth[qi].tolist()))
+    return {
+        'recall_at_k': round(hits / (QUERIES * K), 4),
+        'mean_ms': round(statistics.mean(samples), 3),
+        'p95_ms': round(sorted(samples)[int(len(samples) * 0.95) - 1], 3),
+    }
+
+
+rows = [dict({'index': 'flat', 'param': None},
+             **measure(lambda q: faiss.knn(q, corpus, K, metric=faiss.METRIC_INNER_PRODUCT)[1]))]
+settings.FAISS_ANN_MIN_CHUNKS = 1
+for kind, param_name, values in [('ivf', 'nprobe', [1, 4, 16, 64]), ('hnsw', 'ef_search', [32, 128, 512])]:
+    settings.FAISS_INDEX_TYPE = kind
+    t0 = time.perf_counter()
+    index = index_faiss.build_ann_index(corpus)
+    build_s = round(time.perf_counter() - t0, 2)
+    for v in values:
+        params = index_faiss._search_params(index, v if kind == 'ivf' else None, v if kind == 'hnsw' else None)
+        row = {'index': kind, 'param': f'{param_name}={v}', 'build_s': build_s}
+        row.update(measure(lambda q: index.search(q, K, params=params)[1]))
+        rows.append(row)
+        print(json.dumps(row), file=sys.stderr)
+    del index
+
+
+print(json.dumps({'corpus_chunks': N, 'dim': DIM, 'queries': QUERIES, 'k': K, 'results': rows}, indent=2))
@@ -0,0 +1,155 @@
+"""audit_risky_clauses() latency on large synthetic contracts: the anchored
+scanner with bisected sentence boundaries against the previous
+one-re.finditer-per-pattern implementation.
+
+Usage: python eval/bench_audit.py [contract_chars] [runs]
+Contracts are filler clauses with risky clauses (and near-miss decoys) spread
+through them, up to MAX_RAW_CHARS by default; every run also checks that both
+implementations return identical findings. Prints a JSON summary like run_eval.py.
+"""
+import json, os, random, re, statistics, sys, tempfile, time
+from typing import Dict, List, Optional
+
+
+os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='bench-audit-')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.app.core.config import settings  # noqa: E402
+from src.app.core.extract import audit_risky_clauses  # noqa: E402
+
+
+CHARS = int(sys.argv[1]) if len(sys.argv) > 1 else settings.MAX_RAW_CHARS
+RUNS = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+
+def reference_audit_risky_clauses(text: str) -> List[Dict]:
+    """audit_risky_clauses() before the anchored scanner, kept verbatim for comparison."""
+    findings: List[Dict] = []
+
+
+    # Normalize for robust matching
+    normalized = text
+
+
+    def add_finding(kind: str, severity: str, match: re.Match, note: Optional[str] = None):
+        # Expand evidence to sentence window for better context
+        start = match.start()
+        end = match.end()
+        left = normalized.rfind('.', 0, start)
+        right = normalized.find('.', end)
+        left = 0 if left == -1 else left + 1
+        right = len(normalized) if right == -1 else right + 1
+        span_text = normalized[left:right].strip()
+        findings.append({
+            'clause': kind,
+            'severity': severity,
+            'evidence': span_text,
+            'start': start,
+            'end': end,
+            'note': note
+        })
+
+
+    # Auto-renewal with < threshold days notice (configurable)
+    for m in re.finditer(r"auto[-\s]?renew\w*[^\n]{0,300}?notice[^\n]{0,80}?(\d{1,2})\s*day", normalized, re.IGNORECASE):
+        try:
+            days = int(m.group(1))
+            if days < settings.NOTICE_DAYS_THRESHOLD:
+                add_finding('auto_renewal_short_notice', 'medium', m, note=f'Notice {days} days < {settings.NOTICE_DAYS_THRESHOLD}')
+        except Exception:
+            continue
+
+
+    # Unlimited liability indicators
+    unlimited_patterns = [
+        r"unlimited\s+liability",
+        r"without\s+limit\s+of\s+liability",
+        r"no\s+cap\s+on\s+liability",
+        r"liability\s+shall\s+not\s+be\s+limited"
+    ]
+    for pat in unlimited_patterns:
+        for m in re.finditer(pat, normalized, re.IGNORECASE):
+            add_finding('unlimited_liability', 'high', m)
+
+
+    # Broad indemnity indicators (non-exhaustive)
+    broad_indemnity_patterns = [
+        r"indemnif\w+[^\n]{0,300}?(any|all)\s+claims",
+        r"indemnif\w+[^\n]{0,300}?third\s+parties",
+        r"hold\s+harmless[^\n]{0,300}?(any|all)\s+losses",
+        r"defend\s+and\s+indemnif\w+"
+    ]
+    for pat in broad_indemnity_patterns:
+        for m in re.finditer(pat, normalized, re.IGNORECASE):
+            add_finding('broad_indemnity', 'medium', m)
+
+
+    # Liability cap overly high or missing currency (heuristic)
+    m = re.search(r"liability\s+cap[^\n]{0,150}?([\$€£]?\s?\d{1,3}(?:[,\s]?\d{3})*(?:\.\d{2})?)\s*([A-Za-z]{3})?", normalized, re.IGNORECASE)
+    if not m:
+        # If liability cap section missing, flag informational
+        for mm in re.finditer(r"liability\s+cap", normalized, re.IGNORECASE):
+            add_finding('liability_cap_unclear', 'low', mm, note='Liability cap referenced but not found')
+    else:
+        amount_raw = m.group(1).replace(' ', '')
+        digits = re.sub(r"[^0-9]", "", amount_raw)
+        try:
+            val = int(digits)
+            if val >= settings.LIABILITY_CAP_THRESHOLD:
+                add_finding('liability_cap_high', 'medium', m, note=f'Cap ~{val} >= {settings.LIABILITY_CAP_THRESHOLD}')
+        except Exception:
+            pass
+
+
+    return findings
+
+
+rng = random.Random(17)
+filler = ['The Supplier shall deliver the Services in a professional manner.',
+          'Each party shall give notice in writing to the other party.',
+          'No amendment is valid unless agreed in writing by both parties.',
+          'The Supplier indemnifies nobody for delays caused by force majeure',
+          'Liability for indirect loss is excluded to the extent permitted.',
+          'This agreement auto-renews unless terminated, subject to the terms below']
+risky = ['This Agreement auto-renews for one year unless either party gives notice of 15 days.',
+         'The Supplier accepts unlimited liability for data breaches.',
+         'There is no cap on liability for wilful misconduct.',
+         'The Supplier shall indemnify the Client against all claims arising from the Services.',
+         'The Supplier shall defend and indemnify the Client and hold harmless the Client from all losses.',
+         'Liability cap: $5,000,000 USD']
+
+
+def contract(chars: int, risky_every: int) -> str:
+    lines: List[str] = []
+    size = 0
+    while size < chars:
+        if risky_every and len(lines) % risky_every == 0:
+            line = rng.choice(risky)
+        else:
+            line = ' '.join(rng.choices(filler, k=4))
+        lines.append(line)
+        size += len(line) + 1
+    return '\n'.join(lines) + '\n'
+
+
+def timed(fn, text):
+    samples = []
+    for _ in range(RUNS):
+        t0 = time.perf_counter()
+        fn(text)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {'mean_ms': round(statistics.mean(samples), 2), 'min_ms': round(min(samples), 2)}
+
+
+rows = []
+for label, risky_every in [('no_risky_clauses', 0), ('sparse_risky_clauses', 500), ('dense_risky_clauses', 20)]:
+    text = contract(CHARS, risky_every)
+    findings = audit_risky_clauses(text)
+    assert findings == reference_audit_risky_clauses(text), label
+    row = {'contract': label, 'chars': len(text), 'findings': len(findings),
+           'reference': timed(reference_audit_risky_clauses, text), 'anchored': timed(audit_risky_clauses, text)}
+    row['speedup'] = round(row['reference']['mean_ms'] / max(row['anchored']['mean_ms'], 1e-9), 2)
+    rows.append(row)
+    print(json.dumps(row), file=sys.stderr)
+
+
+print(json.dumps({'runs': RUNS, 'results': rows}, indent=2))
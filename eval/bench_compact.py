@@ -0,0 +1,77 @@
+"""Memory footprint vs retrieval quality of the compact vector options.
+
+Usage: python eval/bench_compact.py [corpus_chunks] [queries]
+Builds one segment per configuration over a synthetic corpus (same shape as
+bench_query.py) and compares each configuration's top-5 against the default
+(full vocabulary, float32, exact). Reports bytes per component from
+index_faiss.memory_footprint(), bytes per chunk, a 1M-chunk extrapolation of
+the vector + index bytes, recall@5 against the default and mean query latency.
+Runs against a throwaway DATA_DIR; prints a JSON summary like run_eval.py.
+"""
+import json, os, random, statistics, sys, tempfile, time
+
+
+os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='bench-compact-')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.app.core import index_faiss  # noqa: E402
+from src.app.core.config import settings  # noqa: E402
+
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+QUERIES = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+K = 5
+CONFIGS = [
+    ('default', {}),
+    ('max_features=2000', {'TFIDF_MAX_FEATURES': 2000}),
+    ('min_df=5', {'TFIDF_MIN_DF': 5}),
+    ('float16', {'INDEX_DENSE_DTYPE': 'float16'}),
+    ('svd=256', {'INDEX_SVD_DIM': 256}),
+    ('svd=256,float16', {'INDEX_SVD_DIM': 256, 'INDEX_DENSE_DTYPE': 'float16'}),
+    ('sq8', {'FAISS_INDEX_TYPE': 'sq8'}),
+    ('svd=256,sq8', {'INDEX_SVD_DIM': 256, 'FAISS_INDEX_TYPE': 'sq8'}),
+    ('svd=256,pq32', {'INDEX_SVD_DIM': 256, 'FAISS_INDEX_TYPE': 'pq', 'FAISS_PQ_M': 32}),
+    ('svd=256,ivfpq32', {'INDEX_SVD_DIM': 256, 'FAISS_INDEX_TYPE': 'ivfpq', 'FAISS_PQ_M': 32}),
+]
+
+
+rng = random.Random(11)
+# Zipf-ish word frequencies so min_df / max_features have a tail to prune
+vocab = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 10))) for _ in range(5000)]
+weights = [1 / (r + 1) for r in range(len(vocab))]
+chunks = [{'text': ' '.join(rng.choices(vocab, weights, k=100)), 'doc_id': i // 50 + 1} for i in range(N)]
+questions = [' '.join(rng.choices(vocab, weights, k=6)) for _ in range(QUERIES)]
+defaults = {name: getattr(settings, name) for _, overrides in CONFIGS for name in overrides}
+settings.FAISS_ANN_MIN_CHUNKS = 1
+
+
+rows = []
+truth = None
+for label, overrides in CONFIGS:
+    for name, value in defaults.items():
+        setattr(settings, name, overrides.get(name, value))
+    t0 = time.perf_counter()
+    index_faiss.rebuild_index(chunks)
+    build_s = round(time.perf_counter() - t0, 2)
+    footprint = index_faiss.memory_footprint()
+    samples, results = [], []
+    for q in questions:
+        t0 = time.perf_counter()
+        results.append({r['chunk_index'] for r in index_faiss.query(q, top_k=K)})
+        samples.append((time.perf_counter() - t0) * 1000)
+    if truth is None:
+        truth = results
+    vector_bytes = footprint['vectors'] + footprint['ann_index']
+    row = {
+        'config': label,
+        'build_s': build_s,
+        'footprint_bytes': footprint,
+        'vector_bytes_per_chunk': round(vector_bytes / N, 1),
+        'vector_gib_at_1m_chunks': round(vector_bytes / N * 1_000_000 / 2 ** 30, 2),
+        'recall_at_k_vs_default': round(sum(len(a & b) for a, b in zip(results, truth)) / (QUERIES * K), 4),
+        'mean_ms': round(statistics.mean(samples), 3),
+    }
+    rows.append(row)
+    print(json.dumps(row), file=sys.stderr)
+
+
+print(json.dumps({'corpus_chunks': N, 'queries': QUERIES, 'k': K, 'results': rows}, indent=2))
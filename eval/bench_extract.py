@@ -0,0 +1,170 @@
+"""extract_fields() latency on large synthetic contracts: the anchored
+engine against the previous one-re.search-per-field implementation.
+
+Usage: python eval/bench_extract.py [contract_chars] [runs]
+Contracts are filler clauses with the field anchors (and near-miss decoys) spread
+through them, up to MAX_RAW_CHARS by default; every run also checks that both
+implementations return identical fields. Prints a JSON summary like run_eval.py.
+"""
+import json, os, random, re, statistics, sys, tempfile, time
+from typing import Dict, List, Optional
+
+
+os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='bench-extract-')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.app.core.config import settings  # noqa: E402
+from src.app.core.extract import extract_fields  # noqa: E402
+
+
+CHARS = int(sys.argv[1]) if len(sys.argv) > 1 else settings.MAX_RAW_CHARS
+RUNS = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+
+def reference_extract_fields(text: str) -> Dict:
+    """extract_fields() before the anchored engine, kept verbatim for comparison."""
+    parties: List[str] = []
+    def _clean_party(s: str) -> str:
+        s = s.strip()
+        # Remove role labels in parentheses like ("Client"), (Vendor)
+        s = re.sub(r"\(\s*[‘’'\"]?(Client|Customer|Vendor|Supplier|Party)[’’'\"]?\s*\)", "", s, flags=re.IGNORECASE)
+        # Trim trailing commas and whitespace
+        s = re.sub(r"[\s,]+$", "", s)
+        return s
+    parties_patterns = [
+        # Capture lazily until 'and', across newlines, then stop at comma/period/newline/end
+        r"between\s+(.*?)\s+and\s+(.*?)(?:[,.\n]|$)",
+        r"parties?\s*:\s*(.*?)\s*;\s*(.*?)\s*(?:[\n]|$)"
+    ]
+    for pat in parties_patterns:
+        m = re.search(pat, text, flags=re.IGNORECASE | re.DOTALL)
+        if m:
+            p1 = _clean_party(m.group(1))
+            p2 = _clean_party(m.group(2))
+            if p1 and p2:
+                parties = [p1, p2]
+                break
+
+
+    eff_date: Optional[str] = None
+    m = re.search(r"effective\s+date\s*[:\-]?\s*([A-Za-z]{3,9}\s+\d{1,2},\s*\d{4}|\d{4}-\d{2}-\d{2}|\d{2}/\d{2}/\d{4})", text, re.IGNORECASE)
+    if m:
+        eff_date = m.group(1).strip()
+
+
+    term: Optional[str] = None
+    m = re.search(r"\bterm\b\s*[:\-]?\s*([A-Za-z0-9\s]{1,80})\b", text, re.IGNORECASE)
+    if m:
+        term = m.group(1).strip()
+
+
+    gov_law: Optional[str] = None
+    m = re.search(r"governing\s+law\s*[:\-]?\s*([A-Za-z\s]{1,80})", text, re.IGNORECASE)
+    if m:
+        gov_law = m.group(1).strip()
+
+
+    payment_terms: Optional[str] = None
+    m = re.search(r"payment\s+terms?\s*[:\-]?\s*([\s\S]{0,500})\n", text, re.IGNORECASE)
+    if m:
+        payment_terms = m.group(1).strip()
+
+
+    termination: Optional[str] = None
+    m = re.search(r"termination\s*[:\-]?\s*([\s\S]{0,500})\n", text, re.IGNORECASE)
+    if m:
+        termination = m.group(1).strip()
+
+
+    auto_renewal: Optional[str] = None
+    m = re.search(r"auto[-\s]?renew(al)?\s*[:\-]?\s*(yes|no|true|false|enabled|disabled)", text, re.IGNORECASE)
+    if m:
+        auto_renewal = m.group(2).strip().lower()
+
+
+    confidentiality: Optional[str] = None
+    m = re.search(r"confidentiality\s*[:\-]?\s*([\s\S]{0,400})\n", text, re.IGNORECASE)
+    if m:
+        confidentiality = m.group(1).strip()
+
+
+    indemnity: Optional[str] = None
+    m = re.search(r"indemnity\s*[:\-]?\s*([\s\S]{0,400})\n", text, re.IGNORECASE)
+    if m:
+        indemnity = m.group(1).strip()
+
+
+    liability_cap: Optional[Dict[str, Optional[str]]] = None
+    m = re.search(r"liability\s+cap\s*[:\-]?\s*([\$€£]?\s?\d{1,3}(?:[,\s]?\d{3})*(?:\.\d{2})?)\s*([A-Za-z]{3})?", text, re.IGNORECASE)
+    if m:
+        amount = m.group(1).replace(' ', '')
+        currency = m.group(2)
+        liability_cap = { 'amount': amount, 'currency': currency }
+
+
+    signatories: List[Dict[str, str]] = []
+    for m in re.finditer(r"\b(Signatory|Signer|By):\s*([A-Za-z .'-]+)\s*,\s*(Title|Designation):\s*([A-Za-z .'-]+)", text, re.IGNORECASE):
+        signatories.append({'name': m.group(2).strip(), 'title': m.group(4).strip()})
+
+
+    return {
+        'parties': parties,
+        'effective_date': eff_date,
+        'term': term,
+        'governing_law': gov_law,
+        'payment_terms': payment_terms,
+        'termination': termination,
+        'auto_renewal': auto_renewal,
+        'confidentiality': confidentiality,
+        'indemnity': indemnity,
+        'liability_cap': liability_cap,
+        'signatories': signatories,
+    }
+
+
+rng = random.Random(13)
+filler = ['The Supplier shall deliver the Services in a professional manner.',
+          'Each party shall determine its own costs under this agreement.',
+          'Payments are made by wire transfer to the nominated account.',
+          'The parties agree that notices are effective on receipt.',
+          'Liability for indirect loss is excluded to the extent permitted.',
+          'Nothing in this clause limits the rights granted between affiliates.']
+fields = ['This Agreement is made between Acme Corp ("Client") and Beta LLC, a Delaware company.',
+          'Effective Date: March 3, 2024', 'Term: twelve months from signature',
+          'Governing Law: State of New York', 'Payment terms: net thirty days from invoice',
+          'Termination: either party on ninety days notice', 'Auto-renewal: yes',
+          'Confidentiality: both parties keep information secret', 'Indemnity: supplier indemnifies client',
+          'Liability cap: $2,000,000 USD', 'By: Jane Doe, Title: Chief Executive']
+
+
+def contract(chars: int, fields_at: float) -> str:
+    lines: List[str] = []
+    size = sum(len(f) + 1 for f in fields)
+    while size < chars:
+        line = ' '.join(rng.choices(filler, k=4))
+        lines.append(line)
+        size += len(line) + 1
+    at = int(len(lines) * fields_at)
+    return '\n'.join(lines[:at] + fields + lines[at:]) + '\n'
+
+
+def timed(fn, text):
+    samples = []
+    for _ in range(RUNS):
+        t0 = time.perf_counter()
+        fn(text)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {'mean_ms': round(statistics.mean(samples), 2), 'min_ms': round(min(samples), 2)}
+
+
+rows = []
+for label, fields_at in [('fields_at_start', 0.0), ('fields_at_middle', 0.5), ('fields_at_end', 1.0)]:
+    text = contract(CHARS, fields_at)
+    assert extract_fields(text) == reference_extract_fields(text), label
+    row = {'contract': label, 'chars': len(text),
+           'reference': timed(reference_extract_fields, text), 'anchored': timed(extract_fields, text)}
+    row['speedup'] = round(row['reference']['mean_ms'] / max(row['anchored']['mean_ms'], 1e-9), 2)
+    rows.append(row)
+    print(json.dumps(row), file=sys.stderr)
+
+
+print(json.dumps({'runs': RUNS, 'results': rows}, indent=2))
@@ -0,0 +1,56 @@
+"""Retrieval agreement between INDEX_VECTORIZER=tfidf and =hashing on the eval set.
+
+Usage: python eval/bench_hashing.py [docs_dir]
+Chunks every .txt in docs_dir (default src/data/docs), ingests one document per
+delta segment in each mode and asks the eval/qna.jsonl questions. Reports top-5
+overlap with TF-IDF, how often each mode retrieves a chunk holding the expected
+text, and ingest time. Prints a JSON summary like run_eval.py.
+"""
+import glob, json, os, sys, tempfile, time
+
+
+os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='bench-hashing-')
+os.environ.setdefault('INDEX_MAX_SEGMENTS', '1000000')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.app.core import index_faiss  # noqa: E402
+from src.app.core.config import settings  # noqa: E402
+from src.app.core.extract import chunk_text_iter_with_spans  # noqa: E402
+
+
+EVAL_DIR = os.path.dirname(os.path.abspath(__file__))
+DOCS_DIR = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(EVAL_DIR), 'src', 'data', 'docs')
+K = 5
+
+
+documents = []
+for doc_id, path in enumerate(sorted(glob.glob(os.path.join(DOCS_DIR, '*.txt'))), start=1):
+    with open(path, 'r', encoding='utf-8') as tf:
+        chunks = list(chunk_text_iter_with_spans(tf.read()))
+    for ch in chunks:
+        ch['doc_id'] = doc_id
+    documents.append(chunks)
+with open(os.path.join(EVAL_DIR, 'qna.jsonl'), 'r', encoding='utf-8') as qf:
+    items = [json.loads(line) for line in qf if line.strip()]
+
+
+def run(mode):
+    settings.INDEX_VECTORIZER = mode
+    index_faiss.rebuild_index(documents[0])
+    t0 = time.perf_counter()
+    for chunks in documents[1:]:
+        index_faiss.add_chunks(chunks)
+    ingest_s = time.perf_counter() - t0
+    retrieved = index_faiss.query_batch([it['question'] for it in items], top_k=K)
+    hits = sum(any(e.lower() in r['text'].lower() for r in res for e in it.get('expected_contains', []))
+               for it, res in zip(items, retrieved))
+    return retrieved, {'mode': mode, 'hit_rate': round(hits / max(1, len(items)), 4), 'ingest_s': round(ingest_s, 3)}
+
+
+tfidf, tfidf_row = run('tfidf')
+hashed, hashed_row = run('hashing')
+overlap = [len({r['chunk_index'] for r in a} & {r['chunk_index'] for r in b}) / K for a, b in zip(tfidf, hashed)]
+hashed_row['overlap_at_k_with_tfidf'] = round(sum(overlap) / max(1, len(overlap)), 4)
+
+
+print(json.dumps({'documents': len(documents), 'chunks': sum(map(len, documents)), 'questions': len(items),
+                  'k': K, 'results': [tfidf_row, hashed_row]}, indent=2))
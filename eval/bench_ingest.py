@@ -0,0 +1,84 @@
+"""Ingest latency vs corpus size: delta segments (add_chunks) against full rebuild_index.
+
+Usage: python eval/bench_ingest.py [total_chunks] [batch_chunks]
+Ingests the same batches twice: once with merges off (INDEX_MAX_SEGMENTS very
+high, the ingest path alone) and once with the default merge policy. Merges run
+on a background thread in production; here each ingest waits for the merges it
+triggered, and their time is reported separately (merge_s, and cumulative
+merge_total_s) next to the amortised cost per ingest including merges.
+Runs against a throwaway DATA_DIR; prints a JSON summary like run_eval.py.
+"""
+import json, os, random, sys, tempfile, time
+
+
+os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='bench-ingest-')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.app.core import index_faiss  # noqa: E402
+from src.app.core.config import settings  # noqa: E402
+
+
+TOTAL = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+BATCH = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000
+REBUILD_MAX = int(os.getenv('BENCH_REBUILD_MAX', '20000'))  # dense full rebuilds get too large beyond this
+MODES = [('no_merge', 1_000_000), ('default_merge', settings.INDEX_MAX_SEGMENTS)]
+
+
+rng = random.Random(7)
+vocab = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 10))) for _ in range(2000)]
+
+
+def make_chunks(n, start):
+    return [{'text': ' '.join(rng.choices(vocab, k=100)), 'doc_id': (start + i) // 50 + 1, 'start': 0, 'end': 700}
+            for i in range(n)]
+
+
+corpus = []
+while len(corpus) < TOTAL:
+    corpus.extend(make_chunks(BATCH, len(corpus)))
+checkpoints = {1_000, 10_000, 25_000, 50_000, 100_000, TOTAL}
+
+
+results = {}
+for mode, max_segments in MODES:
+    settings.INDEX_MAX_SEGMENTS = max_segments
+    index_faiss.rebuild_index([])
+    rows = []
+    add_total = merge_total = 0.0
+    batches = 0
+    for start in range(0, TOTAL, BATCH):
+        batch = corpus[start:start + BATCH]
+        t0 = time.perf_counter()
+        index_faiss.add_chunks(batch)
+        delta_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        index_faiss.wait_for_merges()
+        merge_s = time.perf_counter() - t0
+        add_total += delta_s
+        merge_total += merge_s
+        batches += 1
+        n = start + len(batch)
+        if n in checkpoints:
+            row = {'corpus_chunks': n, 'add_chunks_s': round(delta_s, 4), 'merge_s': round(merge_s, 4),
+                   'merge_total_s': round(merge_total, 4),
+                   'amortised_ingest_s': round((add_total + merge_total) / batches, 4)}
+            t0 = time.perf_counter()
+            index_faiss.query('contract termination notice', top_k=5)
+            row['query_s'] = round(time.perf_counter() - t0, 4)
+            row['segments'] = len(index_faiss.load_state().segments)
+            rows.append(row)
+            print(json.dumps({'mode': mode, **row}), file=sys.stderr)
+    results[mode] = rows
+
+
+# Baseline: what every ingest used to cost (full refit over the combined corpus)
+rebuild = []
+for n in sorted(checkpoints):
+    if n > min(TOTAL, REBUILD_MAX):
+        continue
+    t0 = time.perf_counter()
+    index_faiss._build_segment(corpus[:n])
+    rebuild.append({'corpus_chunks': n, 'rebuild_index_s': round(time.perf_counter() - t0, 4)})
+
+
+print(json.dumps({'batch_chunks': BATCH, 'index_max_segments': MODES[1][1], 'results': results,
+                  'rebuild_index': rebuild}, indent=2))
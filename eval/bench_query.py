@@ -0,0 +1,49 @@
+"""Per-query latency: reloading index artifacts from disk on every query (old behaviour)
+vs the resident snapshot that only reloads when a new generation is committed.
+
+Usage: python eval/bench_query.py [corpus_chunks] [queries]
+Runs against a throwaway DATA_DIR; prints a JSON summary like run_eval.py.
+"""
+import json, os, random, statistics, sys, tempfile, time
+
+
+os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='bench-query-')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.app.core import index_faiss  # noqa: E402
+
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+QUERIES = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+
+rng = random.Random(11)
+vocab = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 10))) for _ in range(3000)]
+index_faiss.rebuild_index([{'text': ' '.join(rng.choices(vocab, k=100)), 'doc_id': i // 50 + 1} for i in range(N)])
+questions = [' '.join(rng.choices(vocab, k=6)) for _ in range(QUERIES)]
+
+
+def timed(fn):
+    samples = []
+    for q in questions:
+        t0 = time.perf_counter()
+        fn(q)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {
+        'mean_ms': round(statistics.mean(samples), 3),
+        'p50_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(sorted(samples)[int(len(samples) * 0.95) - 1], 3),
+    }
+
+
+def reload_then_query(q):
+    index_faiss.load_state(force=True)
+    index_faiss.query(q)
+
+
+summary = {
+    'corpus_chunks': N,
+    'queries': QUERIES,
+    'reload_per_query': timed(reload_then_query),
+    'resident_snapshot': timed(index_faiss.query),
+}
+print(json.dumps(summary, indent=2))
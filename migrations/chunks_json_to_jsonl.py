@@ -0,0 +1,18 @@
+"""Convert data/index/chunks.json into the append-only chunk log (chunks.jsonl + chunks.idx).
+
+The service performs the same conversion lazily on first use; run this ahead of a
+deploy so the first ingest does not pay for it. chunks.json is left in place.
+Usage: python migrations/chunks_json_to_jsonl.py
+"""
+import os, sys
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.app.core import chunk_store  # noqa: E402
+
+
+if os.path.exists(chunk_store.OFFSETS_PATH):
+    print(f'{chunk_store.OFFSETS_PATH} already exists; nothing to do ({chunk_store.count()} chunks)')
+else:
+    chunk_store.ensure_migrated()
+    print(f'Migrated {chunk_store.count()} chunks from {chunk_store.LEGACY_JSON_PATH}')
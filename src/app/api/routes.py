@@ -3,24 +3,29 @@ from fastapi import Body
 from pydantic import BaseModel, Field
 import base64, hashlib
 from fastapi.responses import PlainTextResponse, StreamingResponse
-from ..core.extract import pdf_to_text, chunk_text_iter, chunk_text_iter_with_spans
-from ..core.index_faiss import rebuild_index, query as query_index
+from ..core.extract import pdf_to_text, chunk_text_iter, chunk_text_iter_with_spans, extract_and_chunk
+from ..core.index_faiss import rebuild_index, add_chunks, chunk_count, query as query_index, query_batch, generation as index_generation, index_size_bytes
 from ..core.rule_engine import rule_engine_answer
 from ..core.config import settings
+from ..core.workers import get_process_pool
+from ..core.jobs import submit_ingest_job, get_job
+from ..core import chunk_store, registry, batcher, analysis_store, field_index
+from ..core.cache import retrieval_cache, answer_cache, normalise_question
 import logging
 from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
 # Removed rapidfuzz fuzzy scoring (unused) to keep dependencies minimal.
 import os, json, datetime
+import asyncio
+import threading
 import re
-from typing import Optional
-from src.app.core.extract import extract_fields as parse_fields, audit_risky_clauses, llm_extract_fields, llm_audit_risky_clauses
+from typing import Literal, Optional, Union
+from src.app.core.extract import llm_extract_fields, llm_audit_risky_clauses
 
 
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data')
+DATA_DIR = settings.DATA_DIR
 DOCS_DIR = os.path.join(DATA_DIR, 'docs')
 INDEX_DIR = os.path.join(DATA_DIR, 'index')
-CHUNKS_PATH = os.path.join(INDEX_DIR, 'chunks.json')
-DOCS_META_PATH = os.path.join(INDEX_DIR, 'docs.json')
+DOCS_META_PATH = registry.DOCS_META_PATH
 os.makedirs(DOCS_DIR, exist_ok=True)
 os.makedirs(INDEX_DIR, exist_ok=True)
 
@@ -35,115 +40,132 @@ LATENCY = Histogram('api_latency_seconds', 'Request latency', ['endpoint'])
 logger = logging.getLogger(__name__)
 
 
-@router.post('/ingest')
-async def ingest(files: list[UploadFile] = File(...)):
-    REQ_COUNTER.labels(endpoint='ingest').inc()
-    with LATENCY.labels(endpoint='ingest').time():
-        # Load existing corpus and docs metadata once
-        existing_chunks: list = []
-        docs_meta: list[dict] = []
-        next_id = 1
-        if os.path.exists(CHUNKS_PATH):
-            try:
-                with open(CHUNKS_PATH, 'r', encoding='utf-8') as rf:
-                    existing_chunks = json.load(rf)
-            except Exception:
-                existing_chunks = []
-        if os.path.exists(DOCS_META_PATH):
-            try:
-                with open(DOCS_META_PATH, 'r', encoding='utf-8') as df:
-                    docs_meta = json.load(df)
-                    if isinstance(docs_meta, list) and docs_meta:
-                        next_id = max(d.get('id', 0) for d in docs_meta) + 1
-            except Exception:
-                docs_meta = []
+_ingest_lock = threading.Lock()
 
 
-        # Map of existing hashes for duplicate detection
-        hashes = {d.get('sha256'): d for d in docs_meta if d.get('sha256')}
+def _ingest_uploads(uploads: list[tuple[str, Optional[str], bytes]], keep_newest: bool = False) -> tuple[list[int], list[int]]:
+    """Dedup, extract, chunk, index and persist a batch of validated PDFs.
+    `uploads` is [(filename, content_type, content_bytes)] in upload order. Returns the
+    document_ids for every upload plus the ids that were newly created. Blocking: runs
+    on a thread for /ingest and on the job worker pool for background ingest.
+    """
+    with _ingest_lock:
+        # The chunk log only needs its count; documents come from the registry
+        existing_count = chunk_store.count()
+        next_id = registry.next_id()
+        new_docs: list[dict] = []
+        # Duplicates within this batch (the registry covers earlier ingests)
+        hashes: dict[str, dict] = {}
 
 
         document_ids: list[int] = []
         new_chunks = []
-        for f in files:
-            content_bytes = await f.read()
-            # Basic PDF validation by magic header and content-type
-            if not content_bytes.startswith(b"%PDF"):
-                return {'status': 'error', 'message': f'{f.filename} is not a PDF (missing %PDF header)'}
-            if f.content_type and 'pdf' not in (f.content_type or '').lower():
-                return {'status': 'error', 'message': f'{f.filename} content-type {f.content_type} not accepted'}
-
-
+        # Dedup the whole batch before dispatching any extraction work
+        pending = []  # (doc_id, filename, content_type, content_bytes, sha256) in upload order
+        for filename, content_type, content_bytes in uploads:
             sha256 = hashlib.sha256(content_bytes).hexdigest()
-            if sha256 in hashes:
+            existing = hashes.get(sha256) or registry.get_by_sha256(sha256)
+            if existing is not None:
                 # Duplicate: return existing id, skip processing
-                document_ids.append(hashes[sha256]['id'])
+                document_ids.append(existing['id'])
                 continue
 
 
-            # Assign document id and persist
+            # Assign document id
             doc_id = next_id
             next_id += 1
             document_ids.append(doc_id)
+            hashes[sha256] = {'id': doc_id}
+            pending.append((doc_id, filename, content_type, content_bytes, sha256))
+
 
+        # Extract + chunk + regex field/audit analysis on the process pool; map keeps upload order
+        extracted = get_process_pool().map(extract_and_chunk, [p[3] for p in pending])
 
+
+        for (doc_id, filename, content_type, content_bytes, sha256), (text, doc_chunks, page_offsets, analysis) in zip(pending, extracted):
             pdf_path = os.path.join(DOCS_DIR, f'{doc_id}.pdf')
             txt_path = os.path.join(DOCS_DIR, f'{doc_id}.txt')
             with open(pdf_path, 'wb') as out_pdf:
                 out_pdf.write(content_bytes)
-            text = pdf_to_text(content_bytes)
             with open(txt_path, 'w', encoding='utf-8') as out_txt:
                 out_txt.write(text)
+            if text:
+                analysis_store.save(sha256, analysis)
 
 
-            # Chunk
-            count = 0
-            for ch in chunk_text_iter_with_spans(text):
+            for ch in doc_chunks:
                 ch['doc_id'] = doc_id
-                new_chunks.append(ch)
-                count += 1
-                if count >= settings.MAX_CHUNKS:
-                    break
+            new_chunks.extend(doc_chunks)
 
 
             # Record metadata
             meta = {
                 'id': doc_id,
-                'filename': f.filename,
+                'filename': filename,
                 'path_pdf': pdf_path,
                 'path_txt': txt_path,
-                'chunks_count': count,
+                'chunks_count': len(doc_chunks),
                 'size_bytes': len(content_bytes),
-                'mime_type': f.content_type or 'application/pdf',
+                'mime_type': content_type or 'application/pdf',
                 'created_at': datetime.datetime.utcnow().isoformat() + 'Z',
                 'sha256': sha256,
+                'page_offsets': page_offsets,
             }
-            docs_meta.append(meta)
-            hashes[sha256] = meta
+            new_docs.append(meta)
 
 
-        # Combine and enforce cap
-        combined = existing_chunks + new_chunks
-        if len(combined) > settings.MAX_CHUNKS:
+        # Enforce cap: over it, drop the newest chunks (plain append of what fits)
+        # or, for keep_newest, drop the oldest (rewrite the log)
+        overflow = existing_count + len(new_chunks) - settings.MAX_CHUNKS
+        if overflow > 0:
             logger.warning('Combined chunks exceed MAX_CHUNKS; truncating to MAX_CHUNKS.')
-            combined = combined[:settings.MAX_CHUNKS]
 
 
-        # Rebuild index only if new chunks added
+        # Append only the new chunks to the log and as a delta segment; a full
+        # rebuild is needed when old chunks are dropped or the index is out of sync
         if new_chunks:
-            rebuild_index(combined)
-            with open(CHUNKS_PATH, 'w', encoding='utf-8') as wf:
-                json.dump(combined, wf)
-        else:
-            # still ensure chunks file exists
-            if not os.path.exists(CHUNKS_PATH):
-                with open(CHUNKS_PATH, 'w', encoding='utf-8') as wf:
-                    json.dump(existing_chunks, wf)
+            if overflow > 0 and keep_newest:
+                combined = (chunk_store.read_all() + new_chunks)[-settings.MAX_CHUNKS:]
+                chunk_store.replace(combined)
+                rebuild_index(combined)
+            else:
+                if overflow > 0:
+                    new_chunks = new_chunks[:max(0, len(new_chunks) - overflow)]
+                if chunk_count() != existing_count:
+                    chunk_store.append(new_chunks)
+                    rebuild_index(chunk_store.read_all())
+                elif new_chunks:
+                    chunk_store.append(new_chunks)
+                    add_chunks(new_chunks)
+
+
+        # Persist docs metadata (write-through registry)
+        registry.add(new_docs)
+    # Their analyses were just stored, so this only reads the new documents
+    field_index.refresh()
+    return document_ids, [p[0] for p in pending]
 
 
-        # Persist docs metadata
-        with open(DOCS_META_PATH, 'w', encoding='utf-8') as df:
-            json.dump(docs_meta, df, indent=2)
+@router.post('/ingest')
+async def ingest(files: list[UploadFile] = File(...), background: bool = Query(False)):
+    REQ_COUNTER.labels(endpoint='ingest').inc()
+    with LATENCY.labels(endpoint='ingest').time():
+        uploads = []
+        for f in files:
+            content_bytes = await f.read()
+            # Basic PDF validation by magic header and content-type
+            if not content_bytes.startswith(b"%PDF"):
+                return {'status': 'error', 'message': f'{f.filename} is not a PDF (missing %PDF header)'}
+            if f.content_type and 'pdf' not in (f.content_type or '').lower():
+                return {'status': 'error', 'message': f'{f.filename} content-type {f.content_type} not accepted'}
+            uploads.append((f.filename, f.content_type, content_bytes))
+
+
+        if background:
+            job_id = submit_ingest_job(uploads, lambda batch: _ingest_uploads(batch)[0])
+            return {'status': 'accepted', 'job_id': job_id, 'count': len(uploads)}
+        document_ids, _ = await asyncio.get_running_loop().run_in_executor(None, _ingest_uploads, uploads)
     return {'status': 'ok', 'document_ids': document_ids, 'count': len(document_ids)}
 
 
@@ -156,7 +178,7 @@ class IngestJsonRequest(BaseModel):
 
 
 @router.post('/ingest_json')
-async def ingest_json(payload: IngestJsonRequest):
+async def ingest_json(payload: IngestJsonRequest, background: bool = Query(False)):
     REQ_COUNTER.labels(endpoint='ingest').inc()
     with LATENCY.labels(endpoint='ingest').time():
         # Decode
@@ -171,122 +193,38 @@ async def ingest_json(payload: IngestJsonRequest):
             return {'status': 'error', 'message': 'only PDF files are accepted'}
 
 
-        # Ensure dirs
-        os.makedirs(DOCS_DIR, exist_ok=True)
-        os.makedirs(INDEX_DIR, exist_ok=True)
-
-
-        # Load corpus and docs
-        existing_chunks = []
-        if os.path.exists(CHUNKS_PATH):
-            try:
-                with open(CHUNKS_PATH, 'r', encoding='utf-8') as cf:
-                    existing_chunks = json.load(cf)
-            except Exception:
-                existing_chunks = []
-
-
-        existing_docs = []
-        if os.path.exists(DOCS_META_PATH):
-            try:
-                with open(DOCS_META_PATH, 'r', encoding='utf-8') as df:
-                    existing_docs = json.load(df)
-            except Exception:
-                existing_docs = []
-
-
-        next_id = (max([d.get('id', 0) for d in existing_docs]) + 1) if existing_docs else 1
-
-
-        # Duplicate detection via SHA256
-        sha256 = hashlib.sha256(file_bytes).hexdigest()
-        for d in existing_docs:
-            if d.get('sha256') == sha256:
-                return {'status': 'ok', 'document_ids': [d['id']], 'count': 1, 'message': 'duplicate detected'}
-
-
-        # Persist file and text
-        doc_id = next_id
-        pdf_path = os.path.join(DOCS_DIR, f'{doc_id}.pdf')
-        txt_path = os.path.join(DOCS_DIR, f'{doc_id}.txt')
-        with open(pdf_path, 'wb') as pf:
-            pf.write(file_bytes)
-
-
-        from src.app.core.extract import pdf_to_text, chunk_text_iter_with_spans
-        text = pdf_to_text(file_bytes)
-        with open(txt_path, 'w', encoding='utf-8') as tf:
-            tf.write(text)
-
-
-        # Chunk and limit
-        new_chunks = []
-        produced = 0
-        for ch in chunk_text_iter_with_spans(text):
-            ch['doc_id'] = doc_id
-            new_chunks.append(ch)
-            produced += 1
-            if produced >= settings.MAX_CHUNKS:
-                break
-
-
-        all_chunks = existing_chunks + new_chunks
-        if len(all_chunks) > settings.MAX_CHUNKS:
-            all_chunks = all_chunks[-settings.MAX_CHUNKS:]
-
-
-        # Rebuild index once (state is persisted internally)
-        from src.app.core.index_faiss import rebuild_index
-        rebuild_index(all_chunks)
-
-
-        # Append doc metadata
-        meta = {
-            'id': doc_id,
-            'filename': payload.filename,
-            'path_pdf': pdf_path,
-            'path_txt': txt_path,
-            'size_bytes': len(file_bytes),
-            'mime_type': 'application/pdf',
-            'created_at': datetime.datetime.utcnow().isoformat(),
-            'chunks_count': len(new_chunks),
-            'sha256': sha256,
-        }
-        existing_docs.append(meta)
-
-
-        with open(DOCS_META_PATH, 'w', encoding='utf-8') as df:
-            json.dump(existing_docs, df, ensure_ascii=False, indent=2)
-        with open(CHUNKS_PATH, 'w', encoding='utf-8') as cf:
-            json.dump(all_chunks, cf, ensure_ascii=False, indent=2)
+        uploads = [(payload.filename, 'application/pdf', file_bytes)]
+        if background:
+            job_id = submit_ingest_job(uploads, lambda batch: _ingest_uploads(batch, keep_newest=True)[0])
+            return {'status': 'accepted', 'job_id': job_id, 'count': 1}
+        # Over the cap, JSON ingest drops the oldest chunks rather than the newest
+        document_ids, new_ids = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: _ingest_uploads(uploads, keep_newest=True))
+        if not new_ids:
+            return {'status': 'ok', 'document_ids': document_ids, 'count': 1, 'message': 'duplicate detected'}
+        return {'status': 'ok', 'document_ids': document_ids, 'count': 1}
 
 
-        return {'status': 'ok', 'document_ids': [doc_id], 'count': 1}
+@router.get('/jobs/{job_id}')
+async def job_status(job_id: str):
+    REQ_COUNTER.labels(endpoint='jobs').inc()
+    job = get_job(job_id)
+    if job is None:
+        return {'status': 'error', 'message': 'job not found', 'job_id': job_id}
+    return {'status': 'ok', **job}
 
 
 # -------- Contract Field Extraction --------
 
 
 def _load_doc_text_by_id(doc_id: int) -> Optional[str]:
-    if not os.path.exists(DOCS_META_PATH):
-        return None
-    try:
-        with open(DOCS_META_PATH, 'r', encoding='utf-8') as df:
-            docs = json.load(df)
-    except Exception:
-        return None
-    if not isinstance(docs, list):
-        return None
-    for d in docs:
-        if d.get('id') == doc_id:
-            path_txt = d.get('path_txt')
-            if path_txt and os.path.exists(path_txt):
-                try:
-                    with open(path_txt, 'r', encoding='utf-8') as tf:
-                        return tf.read()
-                except Exception:
-                    return None
-    return None
+    return registry.load_text(doc_id)
+
+
+def _analysis_by_id(doc_id: int) -> Optional[dict]:
+    # Precomputed at ingest; recomputed from the text only when the rules changed
+    meta = registry.get(doc_id)
+    return analysis_store.get(meta) if meta else None
 
 
 
@@ -295,11 +233,10 @@ def _load_doc_text_by_id(doc_id: int) -> Optional[str]:
 async def extract_get(document_id: int = Query(...)):
     REQ_COUNTER.labels(endpoint='extract').inc()
     with LATENCY.labels(endpoint='extract').time():
-        text = _load_doc_text_by_id(document_id)
-        if not text:
+        analysis = _analysis_by_id(document_id)
+        if not analysis:
             return {'status': 'error', 'message': 'document not found or text unavailable', 'document_id': document_id}
-        fields = parse_fields(text)
-        return {'status': 'ok', 'document_id': document_id, **fields}
+        return {'status': 'ok', 'document_id': document_id, **analysis['fields']}
 
 
 class DocumentIdRequest(BaseModel):
@@ -311,13 +248,17 @@ async def extract_post(payload: DocumentIdRequest, use_llm: bool = Query(False))
     REQ_COUNTER.labels(endpoint='extract').inc()
     with LATENCY.labels(endpoint='extract').time():
         document_id = payload.document_id
-        text = _load_doc_text_by_id(document_id)
-        if not text:
-            return {'status': 'error', 'message': 'document not found or text unavailable', 'document_id': document_id}
         if use_llm:
-            fields = llm_extract_fields(text)
+            text = _load_doc_text_by_id(document_id)
+            meta = registry.get(document_id) or {}
+            # Blocking HTTP call: run it off the event loop (the shared client caps concurrency)
+            fields = await asyncio.get_running_loop().run_in_executor(
+                None, llm_extract_fields, text, meta.get('sha256')) if text else None
         else:
-            fields = parse_fields(text)
+            analysis = _analysis_by_id(document_id)
+            fields = analysis['fields'] if analysis else None
+        if fields is None:
+            return {'status': 'error', 'message': 'document not found or text unavailable', 'document_id': document_id}
         return {'status': 'ok', 'document_id': document_id, **fields}
 
 
@@ -326,16 +267,180 @@ async def audit_post(payload: DocumentIdRequest, use_llm: bool = Query(False)):
     REQ_COUNTER.labels(endpoint='audit').inc()
     with LATENCY.labels(endpoint='audit').time():
         document_id = payload.document_id
-        text = _load_doc_text_by_id(document_id)
-        if not text:
+        if use_llm:
+            text = _load_doc_text_by_id(document_id)
+            meta = registry.get(document_id) or {}
+            # Blocking HTTP call: run it off the event loop (the shared client caps concurrency)
+            findings = await asyncio.get_running_loop().run_in_executor(
+                None, llm_audit_risky_clauses, text, meta.get('sha256')) if text else None
+        else:
+            analysis = _analysis_by_id(document_id)
+            findings = analysis['findings'] if analysis else None
+        if findings is None:
             return {'status': 'error', 'message': 'document not found or text unavailable', 'document_id': document_id}
-        findings = llm_audit_risky_clauses(text) if use_llm else audit_risky_clauses(text)
         return {'status': 'ok', 'document_id': document_id, 'findings': findings}
 
 
-class AskRequest(BaseModel):
-    question: str
+@router.get('/documents/search')
+async def documents_search(governing_law: Optional[str] = Query(None), party: Optional[str] = Query(None),
+                           clause: Optional[str] = Query(None), severity: Optional[str] = Query(None),
+                           liability_cap_min: Optional[float] = Query(None), liability_cap_max: Optional[float] = Query(None),
+                           notice_days_min: Optional[int] = Query(None), notice_days_max: Optional[int] = Query(None),
+                           limit: int = Query(1000, ge=1)):
+    REQ_COUNTER.labels(endpoint='documents_search').inc()
+    with LATENCY.labels(endpoint='documents_search').time():
+        # A search first catches the index up with the registry, which can read
+        # (or recompute) analyses, so it runs off the event loop
+        result = await asyncio.get_running_loop().run_in_executor(None, lambda: field_index.search(
+            governing_law=governing_law, party=party, clause=clause, severity=severity,
+            liability_cap_min=liability_cap_min, liability_cap_max=liability_cap_max,
+            notice_days_min=notice_days_min, notice_days_max=notice_days_max))
+        return {'status': 'ok', 'count': len(result['document_ids']),
+                'document_ids': result['document_ids'][:limit], 'facets': result['facets']}
+
+
+class BulkDocumentsRequest(BaseModel):
+    # Explicit ids, or "all" for every registered document
+    document_ids: Union[list[int], Literal['all']] = 'all'
+
+
+def _bulk_ids(payload: BulkDocumentsRequest) -> list[int]:
+    if payload.document_ids == 'all':
+        return [d['id'] for d in registry.all_documents() if d.get('id') is not None]
+    return list(payload.document_ids)
+
+
+async def _stream_bulk(endpoint: str, doc_ids: list[int], audit: bool):
+    """One NDJSON line per document, shaped like the single-document response and
+    yielded as soon as its stored (or, when stale, recomputed) regex extraction/audit
+    is read on the process pool.
+    At most BULK_MAX_IN_FLIGHT documents are queued at once, so memory stays flat
+    however many ids are requested; a disconnect cancels the queued ones.
+    """
+    pool = get_process_pool()
+    remaining = iter(doc_ids)
+    pending: dict[asyncio.Future, int] = {}
+    try:
+        with LATENCY.labels(endpoint=endpoint).time():
+            while True:
+                for doc_id in remaining:
+                    meta = registry.get(doc_id)
+                    if not meta:
+                        yield json.dumps({'status': 'error', 'message': 'document not found or text unavailable', 'document_id': doc_id}) + '\n'
+                        continue
+                    pending[asyncio.wrap_future(pool.submit(analysis_store.get, meta))] = doc_id
+                    if len(pending) >= max(1, settings.BULK_MAX_IN_FLIGHT):
+                        break
+                if not pending:
+                    return
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for fut in done:
+                    doc_id = pending.pop(fut)
+                    try:
+                        analysis = fut.result()
+                    except Exception:
+                        logger.exception('bulk %s failed for document %s', endpoint, doc_id)
+                        analysis = None
+                    if analysis is None:
+                        line = {'status': 'error', 'message': 'document not found or text unavailable', 'document_id': doc_id}
+                    elif audit:
+                        line = {'status': 'ok', 'document_id': doc_id, 'findings': analysis['findings']}
+                    else:
+                        line = {'status': 'ok', 'document_id': doc_id, **analysis['fields']}
+                    yield json.dumps(line) + '\n'
+    finally:
+        for fut in pending:
+            fut.cancel()
+
+
+@router.post('/extract/bulk')
+async def extract_bulk(payload: BulkDocumentsRequest):
+    REQ_COUNTER.labels(endpoint='extract_bulk').inc()
+    return StreamingResponse(_stream_bulk('extract_bulk', _bulk_ids(payload), audit=False),
+                             media_type='application/x-ndjson')
+
+
+@router.post('/audit/bulk')
+async def audit_bulk(payload: BulkDocumentsRequest):
+    REQ_COUNTER.labels(endpoint='audit_bulk').inc()
+    return StreamingResponse(_stream_bulk('audit_bulk', _bulk_ids(payload), audit=True),
+                             media_type='application/x-ndjson')
+
+
+class AskOptions(BaseModel):
+    """Retrieval and answering options shared by /ask and /ask/batch."""
     force_rule: bool = False
+    # ANN search overrides (IVF / HNSW index types only)
+    nprobe: Optional[int] = Field(None, ge=1)
+    ef_search: Optional[int] = Field(None, ge=1)
+    # Retrieval filters: only these documents and/or documents ingested in
+    # [created_after, created_before); naive timestamps are UTC
+    document_ids: Optional[list[int]] = None
+    created_after: Optional[datetime.datetime] = None
+    created_before: Optional[datetime.datetime] = None
+
+
+class AskRequest(AskOptions):
+    question: str
+
+
+class AskBatchRequest(AskOptions):
+    questions: list[str]
+
+
+def _doc_filter(payload: AskOptions) -> Optional[frozenset]:
+    """Document ids retrieval may touch for this request, or None for the whole corpus."""
+    if payload.document_ids is None and payload.created_after is None and payload.created_before is None:
+        return None
+    selected = set(payload.document_ids) if payload.document_ids is not None else None
+    if payload.created_after is not None or payload.created_before is not None:
+        in_range = set(registry.ids_created_between(payload.created_after, payload.created_before))
+        selected = in_range if selected is None else selected & in_range
+    return frozenset(selected)
+
+
+def _answer(question: str, retrieved: list[dict], use_rule: bool) -> dict:
+    """Build the /ask response body for one question from its retrieved chunks."""
+    top_context = '\n'.join([r['text'] for r in retrieved])
+    llm_answer = None
+    reason = ''
+    if not use_rule and retrieved:
+        if settings.OPENAI_API_KEY:
+            # Placeholder LLM logic: concatenate top chunks
+            llm_answer = f"Synthesized answer based on context:\n{top_context[:1000]}"
+            reason = 'llm'
+        else:
+            llm_answer = None
+            reason = 'llm_not_configured'
+    if llm_answer is None:
+        # fallback rule engine (explicit or due to missing LLM)
+        corpus_chunks = [r['text'] for r in retrieved]
+        rule_ans = rule_engine_answer(question, corpus_chunks, sentence_indexes=[r.get('sentences') for r in retrieved])
+        reason = 'rule_fallback' if reason != 'llm' else reason
+        answer = rule_ans
+    else:
+        answer = llm_answer
+    match_score = 0.0
+    if retrieved:
+        best = max(retrieved, key=lambda r: r['score'])
+        match_score = best['score']
+    # Simple citations: doc_id and excerpt
+    citations = []
+    for r in retrieved[:3]:
+        citations.append({
+            'document_id': r.get('doc_id'),
+            'page': r.get('page'),
+            'char_start': r.get('start'),
+            'char_end': r.get('end'),
+            'evidence': r.get('text', '')[:200]
+        })
+    return {
+        'question': question,
+        'answer': answer,
+        'citations': citations,
+        'reason': reason,
+        'similarity_top': match_score,
+    }
 
 
 @router.post('/ask')
@@ -344,77 +449,68 @@ async def ask(payload: AskRequest, x_force_rule: str | None = Header(None)):
     with LATENCY.labels(endpoint='ask').time():
         question = payload.question
         use_rule = payload.force_rule or (x_force_rule == '1')
-        retrieved = query_index(question, top_k=settings.MAX_TOP_CHUNKS)
-        top_context = '\n'.join([r['text'] for r in retrieved])
-        llm_answer = None
-        reason = ''
-        if not use_rule and retrieved:
-            if settings.OPENAI_API_KEY:
-                # Placeholder LLM logic: concatenate top chunks
-                llm_answer = f"Synthesized answer based on context:\n{top_context[:1000]}"
-                reason = 'llm'
-            else:
-                llm_answer = None
-                reason = 'llm_not_configured'
-        if llm_answer is None:
-            # fallback rule engine (explicit or due to missing LLM)
-            corpus_chunks = [r['text'] for r in retrieved]
-            rule_ans = rule_engine_answer(question, corpus_chunks)
-            reason = 'rule_fallback' if reason != 'llm' else reason
-            answer = rule_ans
-        else:
-            answer = llm_answer
-        match_score = 0.0
-        if retrieved:
-            best = max(retrieved, key=lambda r: r['score'])
-            match_score = best['score']
-        # Simple citations: doc_id and excerpt
-        citations = []
-        for r in retrieved[:3]:
-            citations.append({
-                'document_id': r.get('doc_id'),
-                'page': r.get('page'),
-                'char_start': r.get('start'),
-                'char_end': r.get('end'),
-                'evidence': r.get('text', '')[:200]
-            })
-        return {
-            'question': question,
-            'answer': answer,
-            'citations': citations,
-            'reason': reason,
-            'similarity_top': match_score,
-        }
+        top_k = settings.MAX_TOP_CHUNKS
+        doc_ids = _doc_filter(payload)
+        retrieval_key = (normalise_question(question), top_k, payload.nprobe, payload.ef_search, doc_ids, index_generation())
+        answer_key = retrieval_key + (use_rule,)
+        cached = answer_cache.get(answer_key)
+        if cached is not None:
+            return dict(cached, question=question)
+        retrieved = retrieval_cache.get(retrieval_key)
+        if retrieved is None:
+            retrieved = await batcher.query(question, top_k, payload.nprobe, payload.ef_search, doc_ids)
+            retrieval_cache.put(retrieval_key, retrieved)
+        body = _answer(question, retrieved, use_rule)
+        answer_cache.put(answer_key, body)
+        return body
+
+
+def _answer_batch(questions: list[str], use_rule: bool, nprobe: Optional[int] = None,
+                  ef_search: Optional[int] = None, doc_ids: Optional[frozenset] = None) -> list[dict]:
+    retrieved = query_batch(questions, settings.MAX_TOP_CHUNKS, nprobe, ef_search, doc_ids)
+    return [_answer(q, r, use_rule) for q, r in zip(questions, retrieved)]
+
+
+@router.post('/ask/batch')
+async def ask_batch(payload: AskBatchRequest, x_force_rule: str | None = Header(None)):
+    """Answer many questions with one vectorizer transform and one multi-row index
+    search per segment; each result has the same shape as /ask.
+    """
+    REQ_COUNTER.labels(endpoint='ask_batch').inc()
+    with LATENCY.labels(endpoint='ask_batch').time():
+        questions = payload.questions
+        if not questions:
+            return {'status': 'error', 'message': 'no questions provided'}
+        if len(questions) > settings.ASK_BATCH_MAX_QUESTIONS:
+            return {'status': 'error', 'message': f'too many questions (max {settings.ASK_BATCH_MAX_QUESTIONS})'}
+        use_rule = payload.force_rule or (x_force_rule == '1')
+        # Retrieval and the rule engine are CPU-bound; keep them off the event loop
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(None, _answer_batch, questions, use_rule, payload.nprobe,
+                                             payload.ef_search, _doc_filter(payload))
+        return {'status': 'ok', 'count': len(results), 'results': results}
 
 
 @router.get('/audit')
 async def audit_summary():
     REQ_COUNTER.labels(endpoint='audit').inc()
     with LATENCY.labels(endpoint='audit').time():
-        doc_files = [f for f in os.listdir(DOCS_DIR) if f.lower().endswith('.pdf')]
-        chunk_count = 0
-        lengths = []
-        if os.path.exists(CHUNKS_PATH):
-            with open(CHUNKS_PATH, 'r', encoding='utf-8') as f:
-                chunks = json.load(f)
-                chunk_count = len(chunks)
-                for t in chunks[:500]:
-                    if isinstance(t, dict):
-                        lengths.append(len(t.get('text', '')))
-                    elif isinstance(t, str):
-                        lengths.append(len(t))
-                    else:
-                        lengths.append(0)
-        avg_len = sum(lengths) / len(lengths) if lengths else 0
+        # Maintained on ingest/reindex and persisted with the index: no corpus scan
+        stats = chunk_store.stats()
+        chunk_count = stats['chunks']
+        avg_len = stats['avg_length']
         potential_issues = []
         if avg_len < 200:
             potential_issues.append('Chunks may be too small, consider increasing CHUNK_SIZE.')
         if chunk_count == 0:
             potential_issues.append('No chunks ingested.')
         return {
-            'documents': len(doc_files),
+            'documents': registry.count(),
             'chunks': chunk_count,
             'avg_chunk_length': avg_len,
+            'chunk_length_histogram': stats['length_histogram'],
+            'chunks_per_document': stats['per_document'],
+            'index_size_bytes': index_size_bytes(),
             'issues': potential_issues
         }
 
@@ -435,6 +531,9 @@ async def ask_stream(question: str = Query(...)):
 
 @router.get('/metrics')
 async def metrics():
+    # Bring the corpus gauges up to date with writes from other worker processes
+    chunk_store.stats()
+    index_size_bytes()
     data = generate_latest()
     return PlainTextResponse(data.decode('utf-8'), media_type=CONTENT_TYPE_LATEST)
 
@@ -460,27 +559,22 @@ async def healthz():
     }
 
 
-@router.post('/reindex')
-async def reindex():
-    """Rebuild all chunks with span-aware metadata for existing docs and rebuild the index.
-    Use this to migrate legacy ingestions that lack `doc_id/start/end` in citations.
+def _reindex_documents() -> dict:
+    """Re-chunk every registered document's text and rebuild the index from scratch.
+    Blocking, and holds the ingest lock so an ingest cannot publish a delta
+    segment that the rebuild then drops.
     """
-    REQ_COUNTER.labels(endpoint='reindex').inc()
-    with LATENCY.labels(endpoint='reindex').time():
+    with _ingest_lock:
         # Load existing docs metadata
         if not os.path.exists(DOCS_META_PATH):
             return {'status': 'error', 'message': 'no docs metadata found'}
-        try:
-            with open(DOCS_META_PATH, 'r', encoding='utf-8') as df:
-                docs_meta = json.load(df)
-        except Exception:
-            return {'status': 'error', 'message': 'failed to read docs metadata'}
-        if not isinstance(docs_meta, list) or not docs_meta:
+        docs_meta = registry.all_documents()
+        if not docs_meta:
             return {'status': 'error', 'message': 'no documents to reindex'}
 
 
         # Build span-aware chunks for all docs
-        from src.app.core.extract import chunk_text_iter_with_spans
+        from src.app.core.extract import chunk_text_iter_with_spans, page_offsets_from_text
         all_chunks = []
         processed = 0
         for d in docs_meta:
@@ -493,7 +587,8 @@ async def reindex():
                     text = tf.read()
             except Exception:
                 continue
-            for ch in chunk_text_iter_with_spans(text):
+            page_offsets = d.get('page_offsets') or page_offsets_from_text(text)
+            for ch in chunk_text_iter_with_spans(text, page_offsets):
                 ch['doc_id'] = doc_id
                 all_chunks.append(ch)
                 if len(all_chunks) >= settings.MAX_CHUNKS:
@@ -508,8 +603,7 @@ async def reindex():
 
 
         # Persist chunks and rebuild index
-        with open(CHUNKS_PATH, 'w', encoding='utf-8') as cf:
-            json.dump(all_chunks, cf, ensure_ascii=False, indent=2)
+        chunk_store.replace(all_chunks)
         from src.app.core.index_faiss import rebuild_index
         rebuild_index(all_chunks)
 
@@ -517,4 +611,14 @@ async def reindex():
         return {'status': 'ok', 'documents_processed': processed, 'chunks_count': len(all_chunks)}
 
 
+@router.post('/reindex')
+async def reindex():
+    """Rebuild all chunks with span-aware metadata for existing docs and rebuild the index.
+    Use this to migrate legacy ingestions that lack `doc_id/start/end` in citations.
+    """
+    REQ_COUNTER.labels(endpoint='reindex').inc()
+    with LATENCY.labels(endpoint='reindex').time():
+        return await asyncio.get_running_loop().run_in_executor(None, _reindex_documents)
+
+
 
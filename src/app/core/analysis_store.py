@@ -0,0 +1,71 @@
+import os
+import json
+import threading
+from typing import Dict, Optional
+from .config import settings
+from .extract import analyse_text, rules_fingerprint
+
+
+INDEX_DIR = os.path.join(settings.DATA_DIR, 'index')
+ANALYSIS_DIR = os.path.join(INDEX_DIR, 'analysis')
+# Regex field extraction and audit findings computed once per document at ingest,
+# stored next to docs.json as analysis/<sha256>.json. A document's text never
+# changes, so a record stays valid until the rules do: each one carries the
+# rules_fingerprint() it was computed with, and a record with another fingerprint
+# is recomputed from the text (and rewritten) on its next read.
+
+
+os.makedirs(ANALYSIS_DIR, exist_ok=True)
+
+
+
+
+def _path(sha256: str) -> str:
+    return os.path.join(ANALYSIS_DIR, f'{sha256}.json')
+
+
+def save(sha256: str, record: Dict):
+    """Write one document's analysis (temp file + rename; concurrent writers of the
+    same sha256 write identical content, so the last rename wins harmlessly)."""
+    path = _path(sha256)
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as af:
+        json.dump(record, af, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load(sha256: str) -> Optional[Dict]:
+    """The stored analysis for `sha256` if it matches the current rules, else None."""
+    try:
+        with open(_path(sha256), 'r', encoding='utf-8') as af:
+            record = json.load(af)
+    except Exception:
+        return None
+    if not isinstance(record, dict) or record.get('fingerprint') != rules_fingerprint():
+        return None
+    return record
+
+
+def get(meta: Dict) -> Optional[Dict]:
+    """analyse_text() record for a registered document: the stored
+    record, or recomputed from its text and stored when missing or stale. None
+    when the text is unavailable. Module-level (picklable) for the process pool.
+    """
+    sha256 = meta.get('sha256')
+    record = load(sha256) if sha256 else None
+    if record is not None:
+        return record
+    path_txt = meta.get('path_txt')
+    if not path_txt:
+        return None
+    try:
+        with open(path_txt, 'r', encoding='utf-8') as tf:
+            text = tf.read()
+    except Exception:
+        return None
+    if not text:
+        return None
+    record = analyse_text(text)
+    if sha256:
+        save(sha256, record)
+    return record
@@ -0,0 +1,99 @@
+import asyncio
+from typing import Dict, List
+from prometheus_client import Histogram
+from .config import settings
+from . import index_faiss
+
+
+QUERY_BATCH_SIZE = Histogram('query_batch_size', 'Queries answered by one batched index search',
+                             buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+QUERY_BATCH_WAIT = Histogram('query_batch_wait_seconds', 'Time a query waited in the micro-batching queue',
+                             buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+
+
+# Micro-batching dispatcher in front of index_faiss.query(): concurrent callers
+# are queued, collected for up to QUERY_BATCH_WINDOW_MS (or QUERY_BATCH_MAX
+# queries) and answered by one query_batch() call. The queue is bound to the
+# event loop that created it and is recreated if a different loop shows up.
+_queue: asyncio.Queue | None = None
+_dispatcher: asyncio.Task | None = None
+_loop: asyncio.AbstractEventLoop | None = None
+
+
+
+
+def enabled() -> bool:
+    return settings.QUERY_BATCH_WINDOW_MS > 0
+
+
+def _ensure_dispatcher() -> asyncio.Queue:
+    global _queue, _dispatcher, _loop
+    loop = asyncio.get_running_loop()
+    if _loop is not loop or _dispatcher is None or _dispatcher.done():
+        _queue = asyncio.Queue()
+        _loop = loop
+        _dispatcher = loop.create_task(_dispatch(_queue))
+    return _queue
+
+
+async def _collect(queue: asyncio.Queue) -> List[tuple]:
+    loop = asyncio.get_running_loop()
+    batch = [await queue.get()]
+    deadline = loop.time() + settings.QUERY_BATCH_WINDOW_MS / 1000.0
+    while len(batch) < max(1, settings.QUERY_BATCH_MAX):
+        timeout = deadline - loop.time()
+        if timeout <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), timeout))
+        except asyncio.TimeoutError:
+            break
+    return batch
+
+
+async def _dispatch(queue: asyncio.Queue):
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = await _collect(queue)
+        started = loop.time()
+        QUERY_BATCH_SIZE.observe(len(batch))
+        by_options: Dict[tuple, List[tuple]] = {}
+        for item in batch:
+            QUERY_BATCH_WAIT.observe(started - item[3])
+            by_options.setdefault(item[1], []).append(item)
+        # One search per distinct (top_k, nprobe, ef_search, doc_ids)
+        for options, items in by_options.items():
+            try:
+                results = await loop.run_in_executor(None, index_faiss.query_batch, [i[0] for i in items], *options)
+            except Exception as e:
+                for item in items:
+                    if not item[2].done():
+                        item[2].set_exception(e)
+                continue
+            for item, result in zip(items, results):
+                if not item[2].done():
+                    item[2].set_result(result)
+
+
+
+
+async def query(question: str, top_k: int = 5, nprobe: int | None = None, ef_search: int | None = None,
+                doc_ids: frozenset | None = None) -> List[Dict]:
+    """index_faiss.query() through the micro-batcher when QUERY_BATCH_WINDOW_MS > 0,
+    otherwise a direct call. `doc_ids` must be hashable; queries are only batched
+    with others that carry the same filter.
+    """
+    if not enabled():
+        return index_faiss.query(question, top_k, nprobe, ef_search, doc_ids)
+    queue = _ensure_dispatcher()
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    queue.put_nowait((question, (top_k, nprobe, ef_search, doc_ids), future, loop.time()))
+    return await future
+
+
+def shutdown_batcher():
+    global _queue, _dispatcher, _loop
+    if _dispatcher is not None and not _dispatcher.done():
+        _dispatcher.cancel()
+    _queue = _dispatcher = _loop = None
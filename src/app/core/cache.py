@@ -0,0 +1,73 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from prometheus_client import Counter
+from .config import settings
+
+
+CACHE_HITS = Counter('ask_cache_hits_total', 'Ask cache hits', ['cache'])
+CACHE_MISSES = Counter('ask_cache_misses_total', 'Ask cache misses', ['cache'])
+CACHE_EVICTIONS = Counter('ask_cache_evictions_total', 'Ask cache entries dropped for size or TTL', ['cache'])
+
+
+_WS = re.compile(r'\s+')
+
+
+class LRUCache:
+    """Thread-safe LRU cache with a per-entry TTL. Size 0 disables it."""
+
+    def __init__(self, name: str, max_size: int, ttl_seconds: float):
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if self.max_size <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < now:
+                del self._entries[key]
+                CACHE_EVICTIONS.labels(cache=self.name).inc()
+                entry = None
+            if entry is None:
+                CACHE_MISSES.labels(cache=self.name).inc()
+                return None
+            self._entries.move_to_end(key)
+        CACHE_HITS.labels(cache=self.name).inc()
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                CACHE_EVICTIONS.labels(cache=self.name).inc()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def normalise_question(question: str) -> str:
+    """Case, surrounding whitespace and trailing ?/./! do not change retrieval
+    or the rule engine's keywords, so they are folded out of cache keys.
+    """
+    return _WS.sub(' ', question).strip().rstrip('?.! ').lower()
+
+
+# Keys carry the index generation, so any ingest, merge or reindex makes older
+# entries unreachable; they age out through LRU/TTL.
+retrieval_cache = LRUCache('retrieval', settings.ASK_CACHE_SIZE, settings.ASK_CACHE_TTL_SECONDS)
+answer_cache = LRUCache('answer', settings.ASK_CACHE_SIZE, settings.ASK_CACHE_TTL_SECONDS)
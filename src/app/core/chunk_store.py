@@ -0,0 +1,251 @@
+import os
+import json
+import bisect
+import struct
+import threading
+from typing import Dict, Iterator, List, Optional
+from prometheus_client import Gauge
+from .config import settings
+from .file_lock import FileLock
+
+
+INDEX_DIR = os.path.join(settings.DATA_DIR, 'index')
+LOG_PATH = os.path.join(INDEX_DIR, 'chunks.jsonl')
+OFFSETS_PATH = os.path.join(INDEX_DIR, 'chunks.idx')
+LEGACY_JSON_PATH = os.path.join(INDEX_DIR, 'chunks.json')
+STATS_PATH = os.path.join(INDEX_DIR, 'chunk_stats.json')
+# Append-only chunk log: chunks.jsonl has one compact JSON record per chunk and
+# chunks.idx the byte offset of each record (little-endian uint64), so the count
+# is a file size and any chunk is one seek away. Ingest only appends; the log is
+# rewritten only by reindex or when the MAX_CHUNKS cap drops old chunks.
+_OFFSET = struct.Struct('<Q')
+# Corpus statistics kept in step with the log: chunk count, total text length, a
+# chunk length histogram and chunks per document. append() adds the new chunks'
+# contribution and replace() recounts what it writes, then chunk_stats.json is
+# rewritten; 'log_bytes' ties it to the log it describes, so stats read after a
+# crash between the two (or another process's write) are rebuilt from the log once.
+# Bucket i counts chunks shorter than LENGTH_BUCKETS[i]; the last one is open.
+LENGTH_BUCKETS = (100, 200, 400, 700, 1000, 1500, 2000)
+CHUNKS_GAUGE = Gauge('corpus_chunks', 'Chunks in the chunk log')
+CHUNK_LENGTH_GAUGE = Gauge('corpus_avg_chunk_length', 'Mean chunk text length (characters)')
+CHUNK_LENGTH_BUCKETS = Gauge('corpus_chunk_length_chunks', 'Chunks per text length bucket', ['bucket'])
+
+
+_lock = threading.RLock()
+# Held (with _lock) by writers, so worker processes never append over each other
+_write_lock = FileLock(os.path.join(INDEX_DIR, 'chunks.lock'))
+_migrated = False
+_stats: Optional[Dict] = None
+
+
+os.makedirs(INDEX_DIR, exist_ok=True)
+
+
+
+
+def _encode(chunk) -> bytes:
+    return (json.dumps(chunk, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def _offset_at(idx_file, i: int) -> int:
+    idx_file.seek(i * _OFFSET.size)
+    return _OFFSET.unpack(idx_file.read(_OFFSET.size))[0]
+
+
+def _committed_end() -> int:
+    """Byte length of the log covered by the offset index (ignores a torn tail)."""
+    n = count()
+    if n == 0:
+        return 0
+    with open(OFFSETS_PATH, 'rb') as idx_file, open(LOG_PATH, 'rb') as log_file:
+        last = _offset_at(idx_file, n - 1)
+        log_file.seek(last)
+        return last + len(log_file.readline())
+
+
+def _write_all(chunks: Iterator, log_path: str, offsets_path: str) -> int:
+    written = 0
+    with open(log_path, 'wb') as log_file, open(offsets_path, 'wb') as idx_file:
+        pos = 0
+        for chunk in chunks:
+            record = _encode(chunk)
+            idx_file.write(_OFFSET.pack(pos))
+            log_file.write(record)
+            pos += len(record)
+            written += 1
+    return written
+
+
+def bucket_labels() -> List[str]:
+    return [f'<{edge}' for edge in LENGTH_BUCKETS] + [f'>={LENGTH_BUCKETS[-1]}']
+
+
+def _chunk_length(chunk) -> int:
+    if isinstance(chunk, dict):
+        return len(chunk.get('text', ''))
+    if isinstance(chunk, str):
+        return len(chunk)
+    return 0
+
+
+def _empty_stats() -> Dict:
+    return {'chunks': 0, 'total_length': 0, 'length_histogram': [0] * (len(LENGTH_BUCKETS) + 1),
+            'per_document': {}, 'log_bytes': 0}
+
+
+def _add_stats(stats: Dict, chunks) -> Dict:
+    histogram, per_document = stats['length_histogram'], stats['per_document']
+    for chunk in chunks:
+        length = _chunk_length(chunk)
+        stats['chunks'] += 1
+        stats['total_length'] += length
+        histogram[bisect.bisect_right(LENGTH_BUCKETS, length)] += 1
+        doc_id = chunk.get('doc_id') if isinstance(chunk, dict) else None
+        if doc_id is not None:
+            per_document[str(doc_id)] = per_document.get(str(doc_id), 0) + 1
+    return stats
+
+
+def _publish_stats(stats: Dict):
+    """Persist `stats` for the log as it is now and mirror it into the gauges."""
+    global _stats
+    stats['log_bytes'] = _committed_end()
+    tmp_path = STATS_PATH + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as sf:
+        json.dump(stats, sf)
+    os.replace(tmp_path, STATS_PATH)
+    _stats = stats
+    CHUNKS_GAUGE.set(stats['chunks'])
+    CHUNK_LENGTH_GAUGE.set(stats['total_length'] / stats['chunks'] if stats['chunks'] else 0)
+    for label, n in zip(bucket_labels(), stats['length_histogram']):
+        CHUNK_LENGTH_BUCKETS.labels(bucket=label).set(n)
+
+
+def _load_stats() -> Optional[Dict]:
+    try:
+        with open(STATS_PATH, 'r', encoding='utf-8') as sf:
+            stats = json.load(sf)
+    except Exception:
+        return None
+    if not isinstance(stats, dict) or len(stats.get('length_histogram') or []) != len(LENGTH_BUCKETS) + 1:
+        return None
+    return stats
+
+
+def _current_stats() -> Dict:
+    """The stats of the committed log: in memory, else chunk_stats.json, else one
+    pass over the log. Callers hold _lock."""
+    signature = (count(), _committed_end())
+    if _stats is not None and (_stats['chunks'], _stats['log_bytes']) == signature:
+        return _stats
+    stats = _load_stats()
+    if stats is None or (stats['chunks'], stats.get('log_bytes')) != signature:
+        stats = _add_stats(_empty_stats(), iter_chunks())
+    _publish_stats(stats)
+    return stats
+
+
+def stats() -> Dict:
+    """Chunk count, total and mean text length, length histogram (bucket_labels()
+    order) and chunks per document id, without reading the log."""
+    ensure_migrated()
+    with _lock:
+        current = _current_stats()
+        return {
+            'chunks': current['chunks'],
+            'total_length': current['total_length'],
+            'avg_length': current['total_length'] / current['chunks'] if current['chunks'] else 0,
+            'length_histogram': dict(zip(bucket_labels(), current['length_histogram'])),
+            'per_document': dict(current['per_document']),
+        }
+
+
+def ensure_migrated():
+    """Convert a legacy chunks.json array into the log on first use."""
+    global _migrated
+    if _migrated:
+        return
+    with _lock, _write_lock:
+        if not _migrated and not os.path.exists(OFFSETS_PATH):
+            chunks = []
+            if os.path.exists(LEGACY_JSON_PATH):
+                try:
+                    with open(LEGACY_JSON_PATH, 'r', encoding='utf-8') as lf:
+                        chunks = json.load(lf)
+                except Exception:
+                    chunks = []
+            replace(chunks if isinstance(chunks, list) else [])
+        _migrated = True
+
+
+
+
+def count() -> int:
+    ensure_migrated()
+    try:
+        return os.path.getsize(OFFSETS_PATH) // _OFFSET.size
+    except OSError:
+        return 0
+
+
+def append(chunks: List[Dict]) -> int:
+    """Append chunks to the log; cost depends only on len(chunks). Returns the new count."""
+    ensure_migrated()
+    with _lock, _write_lock:
+        current = _current_stats()
+        end = _committed_end()
+        with open(LOG_PATH, 'r+b') as log_file, open(OFFSETS_PATH, 'ab') as idx_file:
+            log_file.truncate(end)
+            log_file.seek(end)
+            pos = end
+            offsets = []
+            for chunk in chunks:
+                record = _encode(chunk)
+                log_file.write(record)
+                offsets.append(_OFFSET.pack(pos))
+                pos += len(record)
+            log_file.flush()
+            os.fsync(log_file.fileno())
+            # Offsets go last: a crash before this point leaves only an ignored tail
+            idx_file.write(b''.join(offsets))
+        _publish_stats(_add_stats(current, chunks))
+        return count()
+
+
+def replace(chunks: List[Dict]):
+    """Rewrite the whole log (reindex, cap truncation, migration)."""
+    with _lock, _write_lock:
+        log_tmp, idx_tmp = LOG_PATH + '.tmp', OFFSETS_PATH + '.tmp'
+        _write_all(iter(chunks), log_tmp, idx_tmp)
+        # Empty the offsets first so a crash between the two renames reads as an
+        # empty log (recoverable via /reindex) rather than offsets into the wrong data
+        if os.path.exists(OFFSETS_PATH):
+            open(OFFSETS_PATH, 'wb').close()
+        os.replace(log_tmp, LOG_PATH)
+        os.replace(idx_tmp, OFFSETS_PATH)
+        _publish_stats(_add_stats(_empty_stats(), chunks))
+
+
+def get(i: int) -> Optional[Dict]:
+    if i < 0 or i >= count():
+        return None
+    with open(OFFSETS_PATH, 'rb') as idx_file, open(LOG_PATH, 'rb') as log_file:
+        log_file.seek(_offset_at(idx_file, i))
+        return json.loads(log_file.readline())
+
+
+def iter_chunks(start: int = 0, limit: Optional[int] = None) -> Iterator[Dict]:
+    """Stream chunks in order from `start`, reading one line at a time."""
+    n = count()
+    if limit is not None:
+        n = min(n, start + limit)
+    if start >= n:
+        return
+    with open(OFFSETS_PATH, 'rb') as idx_file, open(LOG_PATH, 'rb') as log_file:
+        log_file.seek(_offset_at(idx_file, start))
+        for _ in range(start, n):
+            yield json.loads(log_file.readline())
+
+
+def read_all() -> List[Dict]:
+    return list(iter_chunks())
@@ -6,6 +6,8 @@ load_dotenv()
 
 
 class Settings:
+    # Root for docs/ and index/ (defaults to src/data next to the app package)
+    DATA_DIR: str = os.getenv('DATA_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data'))
     # Tuned defaults for better context: ~700 chars with ~14% overlap
     CHUNK_SIZE: int = int(os.getenv('CHUNK_SIZE', '700'))
     CHUNK_OVERLAP: int = int(os.getenv('CHUNK_OVERLAP', '100'))
@@ -15,6 +17,14 @@ class Settings:
     # LLM provider (Groq)
     GROQ_API_KEY: str | None = os.getenv('GROQ_API_KEY')
     GROQ_MODEL: str = os.getenv('GROQ_MODEL', 'llama-3.1-70b-versatile')
+    # Shared LLM client: API endpoint override (e.g. a local stand-in), requests in
+    # flight per process, per-request timeout and retries; LLM_CACHE_ENABLED=0
+    # turns off the on-disk response cache (index/llm_cache)
+    GROQ_BASE_URL: str | None = os.getenv('GROQ_BASE_URL')
+    LLM_MAX_CONCURRENCY: int = int(os.getenv('LLM_MAX_CONCURRENCY', '4'))
+    LLM_TIMEOUT_SECONDS: float = float(os.getenv('LLM_TIMEOUT_SECONDS', '30'))
+    LLM_MAX_RETRIES: int = int(os.getenv('LLM_MAX_RETRIES', '2'))
+    LLM_CACHE_ENABLED: int = int(os.getenv('LLM_CACHE_ENABLED', '1'))
     OPENAI_API_KEY: str | None = os.getenv('OPENAI_API_KEY')
     LOG_LEVEL: str = os.getenv('LOG_LEVEL', 'INFO')
     MAX_TOP_CHUNKS: int = int(os.getenv('MAX_TOP_CHUNKS', '5'))
@@ -22,7 +32,59 @@ class Settings:
     RULE_ENGINE_QUERY_PARAM: str = 'force_rule'
     MAX_RAW_CHARS: int = int(os.getenv('MAX_RAW_CHARS', '2000000'))  # 2M characters (~2MB)
     MAX_CHUNKS: int = int(os.getenv('MAX_CHUNKS', '20000'))  # safety cap
+    # Optional micro-batching of concurrent /ask retrievals: wait up to
+    # QUERY_BATCH_WINDOW_MS (0 disables) or QUERY_BATCH_MAX queries, then search once
+    QUERY_BATCH_WINDOW_MS: float = float(os.getenv('QUERY_BATCH_WINDOW_MS', '0'))
+    QUERY_BATCH_MAX: int = int(os.getenv('QUERY_BATCH_MAX', '64'))
+    # /ask result caches (retrieval and final answer), keyed on the normalised
+    # question, top_k, force_rule and index generation; size 0 disables
+    ASK_CACHE_SIZE: int = int(os.getenv('ASK_CACHE_SIZE', '1024'))
+    ASK_CACHE_TTL_SECONDS: float = float(os.getenv('ASK_CACHE_TTL_SECONDS', '300'))
+    # Upper bound on questions accepted by one POST /ask/batch
+    ASK_BATCH_MAX_QUESTIONS: int = int(os.getenv('ASK_BATCH_MAX_QUESTIONS', '1000'))
     CHUNK_BATCH_SIZE: int = int(os.getenv('CHUNK_BATCH_SIZE', '1000'))
+    # Size of the process pool used for CPU-bound PDF extraction/chunking
+    WORKER_PROCESSES: int = int(os.getenv('WORKER_PROCESSES', str(min(4, os.cpu_count() or 1))))
+    # Threads running background ingest jobs (/ingest?background=true)
+    INGEST_JOB_WORKERS: int = int(os.getenv('INGEST_JOB_WORKERS', '2'))
+    # Documents queued on the process pool at once by POST /extract/bulk and /audit/bulk
+    BULK_MAX_IN_FLIGHT: int = int(os.getenv('BULK_MAX_IN_FLIGHT', '16'))
+    # Retrieval backend: 'faiss' (dense, normalised rows) or 'sparse' (CSR matrix, never densified)
+    INDEX_BACKEND: str = os.getenv('INDEX_BACKEND', 'faiss')
+    # Vectorizer: 'tfidf' (vocabulary fitted per segment) or 'hashing' (stateless,
+    # HASHING_N_FEATURES buckets, CSR rows, IDF from corpus-wide document frequencies)
+    INDEX_VECTORIZER: str = os.getenv('INDEX_VECTORIZER', 'tfidf')
+    HASHING_N_FEATURES: int = int(os.getenv('HASHING_N_FEATURES', str(2 ** 18)))
+    # Dense search per segment: 'flat' (exact), 'ivf' (IVF-Flat) or 'hnsw'. Segments
+    # smaller than FAISS_ANN_MIN_CHUNKS are always searched exactly.
+    FAISS_INDEX_TYPE: str = os.getenv('FAISS_INDEX_TYPE', 'flat')
+    FAISS_ANN_MIN_CHUNKS: int = int(os.getenv('FAISS_ANN_MIN_CHUNKS', '10000'))
+    FAISS_IVF_NLIST: int = int(os.getenv('FAISS_IVF_NLIST', '0'))  # 0 = 4*sqrt(rows)
+    FAISS_NPROBE: int = int(os.getenv('FAISS_NPROBE', '16'))
+    FAISS_HNSW_M: int = int(os.getenv('FAISS_HNSW_M', '32'))
+    FAISS_HNSW_EF_CONSTRUCTION: int = int(os.getenv('FAISS_HNSW_EF_CONSTRUCTION', '80'))
+    FAISS_EF_SEARCH: int = int(os.getenv('FAISS_EF_SEARCH', '64'))
+    # Compact vectors. FAISS_INDEX_TYPE may also be a quantised index ('sq8', 'sq4',
+    # 'sqfp16', 'pq', 'ivfpq' with FAISS_PQ_M sub-quantisers) whose codes replace
+    # matrix.npy. Vocabulary capping applies to every TF-IDF segment; min_df pruning
+    # and the TruncatedSVD projection (INDEX_SVD_DIM, 0 disables) to segments of
+    # at least FAISS_ANN_MIN_CHUNKS rows. INDEX_DENSE_DTYPE=float16 halves the vectors;
+    # exact segments keep them as a FAISS fp16 flat index (SQfp16 codes, no slower
+    # than float32), since widening a float16 matrix per query costs ~8x in latency.
+    FAISS_PQ_M: int = int(os.getenv('FAISS_PQ_M', '32'))
+    TFIDF_MAX_FEATURES: int = int(os.getenv('TFIDF_MAX_FEATURES', '0'))  # 0 = unbounded
+    TFIDF_MIN_DF: int = int(os.getenv('TFIDF_MIN_DF', '1'))
+    INDEX_SVD_DIM: int = int(os.getenv('INDEX_SVD_DIM', '0'))
+    INDEX_DENSE_DTYPE: str = os.getenv('INDEX_DENSE_DTYPE', 'float32')
+    # Segmented index: ingest appends a delta segment; a background merge folds
+    # INDEX_MERGE_FACTOR adjacent segments once more than INDEX_MAX_SEGMENTS exist.
+    INDEX_MAX_SEGMENTS: int = int(os.getenv('INDEX_MAX_SEGMENTS', '8'))
+    INDEX_MERGE_FACTOR: int = int(os.getenv('INDEX_MERGE_FACTOR', '4'))
+    # Index GC: segments referenced by the newest INDEX_KEEP_GENERATIONS manifests
+    # are kept for readers still opening an older version; unreferenced segment
+    # dirs younger than INDEX_GC_GRACE_SECONDS may belong to an uncommitted write.
+    INDEX_KEEP_GENERATIONS: int = int(os.getenv('INDEX_KEEP_GENERATIONS', '3'))
+    INDEX_GC_GRACE_SECONDS: int = int(os.getenv('INDEX_GC_GRACE_SECONDS', '600'))
 
 
 settings = Settings()
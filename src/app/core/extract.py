@@ -1,19 +1,70 @@
 import io
-from pdfminer.high_level import extract_text
+import bisect
+import hashlib
+import heapq
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+from pdfminer.pdfpage import PDFPage
 import re
-from typing import List, Dict, Optional
-import json
+from typing import List, Dict, Optional, Iterator
 
 
-def pdf_to_text(file_bytes: bytes) -> str:
-    bio = io.BytesIO(file_bytes)
-    text = extract_text(bio)
+def iter_pdf_pages(file_bytes: bytes) -> Iterator[str]:
+    """Yield extracted text page by page, holding one page layout in memory at a time.
+    Concatenating the pages gives exactly what pdfminer's extract_text returns.
+    """
+    rsrcmgr = PDFResourceManager()
+    out = io.StringIO()
+    device = TextConverter(rsrcmgr, out, laparams=LAParams())
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
+    try:
+        for page in PDFPage.get_pages(io.BytesIO(file_bytes)):
+            interpreter.process_page(page)
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate(0)
+    finally:
+        device.close()
+
+
+def pdf_to_text_with_pages(file_bytes: bytes) -> tuple[str, List[int]]:
+    """Extract text plus the character offset at which each page starts."""
+    pages: List[str] = []
+    page_offsets: List[int] = []
+    pos = 0
+    for page_text in iter_pdf_pages(file_bytes):
+        page_offsets.append(pos)
+        pages.append(page_text)
+        pos += len(page_text)
+    text = ''.join(pages)
     if not text or not text.strip():
         try:
-            return file_bytes.decode('utf-8', 'ignore')
+            return file_bytes.decode('utf-8', 'ignore'), [0]
         except Exception:
-            return text or ""
-    return text
+            return text or "", [0]
+    return text, page_offsets
+
+
+def pdf_to_text(file_bytes: bytes) -> str:
+    return pdf_to_text_with_pages(file_bytes)[0]
+
+
+def page_offsets_from_text(text: str) -> List[int]:
+    """Recover page offsets from the form feeds pdfminer writes after each page
+    (for documents ingested before offsets were recorded).
+    """
+    offsets = [0]
+    pos = text.find('\f')
+    while pos != -1 and pos + 1 < len(text):
+        offsets.append(pos + 1)
+        pos = text.find('\f', pos + 1)
+    return offsets
+
+
+def page_for_offset(page_offsets: List[int], offset: int) -> int:
+    """1-based page number containing character `offset`."""
+    return max(1, bisect.bisect_right(page_offsets, offset))
 from .config import settings
 
 
@@ -27,11 +78,9 @@ def chunk_text(text: str):
         end = min(len(text), start + size)
         result.append(text[start:end])
         produced += 1
-        if produced >= settings.MAX_CHUNKS:
+        if produced >= settings.MAX_CHUNKS or end >= len(text):
             break
         start = max(0, end - overlap)
-        if start >= len(text):
-            break
     return result
 def chunk_text_iter(text: str):
     size = settings.CHUNK_SIZE
@@ -42,48 +91,133 @@ def chunk_text_iter(text: str):
         end = min(len(text), start + size)
         yield text[start:end]
         produced += 1
-        if produced >= settings.MAX_CHUNKS:
+        if produced >= settings.MAX_CHUNKS or end >= len(text):
             break
         start = max(0, end - overlap)
-        if start >= len(text):
-            break
 
 
-def chunk_text_iter_with_spans(text: str):
+def chunk_text_iter_with_spans(text: str, page_offsets: Optional[List[int]] = None):
+    """Yield {'start', 'end', 'text'} chunks; with `page_offsets` each chunk also
+    gets the 1-based 'page' its start falls on (bisected, not rescanned).
+    """
     size = settings.CHUNK_SIZE
     overlap = settings.CHUNK_OVERLAP
     start = 0
     produced = 0
     while start < len(text):
         end = min(len(text), start + size)
-        yield {'start': start, 'end': end, 'text': text[start:end]}
+        ch = {'start': start, 'end': end, 'text': text[start:end]}
+        if page_offsets:
+            ch['page'] = page_for_offset(page_offsets, start)
+        yield ch
         produced += 1
-        if produced >= settings.MAX_CHUNKS:
+        if produced >= settings.MAX_CHUNKS or end >= len(text):
             break
         start = max(0, end - overlap)
-        if start >= len(text):
-            break
+
+
+def extract_and_chunk(file_bytes: bytes) -> tuple[str, List[Dict], List[int], Dict]:
+    """Extract text, span/page-aware chunks, page offsets and the regex field/audit
+    analysis (analyse_text) for one PDF.
+    Module-level (picklable) so /ingest can run it on the worker process pool.
+    """
+    text, page_offsets = pdf_to_text_with_pages(file_bytes)
+    return text, list(chunk_text_iter_with_spans(text, page_offsets)), page_offsets, analyse_text(text)
 
 
 # Contract field extraction utilities
 
 
+# Anchored field extraction. Every field pattern starts with a literal keyword
+# (its anchor), so a pattern can only match where its anchor occurs. The text is
+# case-folded once, anchors are located with str.find and the full pattern is
+# only tried (anchored, on the original text) at those positions: the first
+# success is the leftmost re.search match, and 'signatories' collects all
+# non-overlapping matches like re.finditer.
+# The two party patterns have unbounded lazy bodies that scan to the end of the
+# text when they fail; once one fails after its prefix matched (no " and " / ";"
+# left), it cannot match at any later anchor either, so it is not tried again.
+# Bump when a field or risk pattern (or the analyse_text record) changes, so
+# stored analyses are recomputed
+RULES_VERSION = 3
+_FIELD_RULES = [
+    # name, anchors (lowercase), pattern, prefix after which a failure is final
+    ('parties_between', ('between',), re.compile(r"between\s+(.*?)\s+and\s+(.*?)(?:[,.\n]|$)", re.IGNORECASE | re.DOTALL),
+     re.compile(r"between\s", re.IGNORECASE)),
+    ('parties_list', ('partie',), re.compile(r"parties?\s*:\s*(.*?)\s*;\s*(.*?)\s*(?:[\n]|$)", re.IGNORECASE | re.DOTALL),
+     re.compile(r"parties?\s*:", re.IGNORECASE)),
+    ('effective_date', ('effective',), re.compile(r"effective\s+date\s*[:\-]?\s*([A-Za-z]{3,9}\s+\d{1,2},\s*\d{4}|\d{4}-\d{2}-\d{2}|\d{2}/\d{2}/\d{4})", re.IGNORECASE), None),
+    ('term', ('term',), re.compile(r"\bterm\b\s*[:\-]?\s*([A-Za-z0-9\s]{1,80})\b", re.IGNORECASE), None),
+    ('governing_law', ('governing',), re.compile(r"governing\s+law\s*[:\-]?\s*([A-Za-z\s]{1,80})", re.IGNORECASE), None),
+    ('payment_terms', ('payment',), re.compile(r"payment\s+terms?\s*[:\-]?\s*([\s\S]{0,500})\n", re.IGNORECASE), None),
+    ('termination', ('termination',), re.compile(r"termination\s*[:\-]?\s*([\s\S]{0,500})\n", re.IGNORECASE), None),
+    ('auto_renewal', ('auto',), re.compile(r"auto[-\s]?renew(al)?\s*[:\-]?\s*(yes|no|true|false|enabled|disabled)", re.IGNORECASE), None),
+    ('confidentiality', ('confidentiality',), re.compile(r"confidentiality\s*[:\-]?\s*([\s\S]{0,400})\n", re.IGNORECASE), None),
+    ('indemnity', ('indemnity',), re.compile(r"indemnity\s*[:\-]?\s*([\s\S]{0,400})\n", re.IGNORECASE), None),
+    ('liability_cap', ('liability',), re.compile(r"liability\s+cap\s*[:\-]?\s*([\$€£]?\s?\d{1,3}(?:[,\s]?\d{3})*(?:\.\d{2})?)\s*([A-Za-z]{3})?", re.IGNORECASE), None),
+]
+_SIGNATORY_ANCHORS = ('signatory:', 'signer:', 'by:')
+_SIGNATORY_PATTERN = re.compile(r"\b(Signatory|Signer|By):\s*([A-Za-z .'-]+)\s*,\s*(Title|Designation):\s*([A-Za-z .'-]+)", re.IGNORECASE)
+# Characters re.IGNORECASE equates with an ASCII letter other than its two cases.
+# Folding them first keeps text.lower() one character per character (U+0130 is
+# the only code point whose lower() is longer), so offsets carry over.
+_CASE_FOLD = str.maketrans({'\u0130': 'i', '\u0131': 'i', '\u017f': 's', '\u212a': 'k'})
+_PARTY_ROLE = re.compile(r"\(\s*[‘’'\"]?(Client|Customer|Vendor|Supplier|Party)[’’'\"]?\s*\)", re.IGNORECASE)
+_TRAILING_SEP = re.compile(r"[\s,]+$")
+
+
+def _clean_party(s: str) -> str:
+    s = s.strip()
+    # Remove role labels in parentheses like ("Client"), (Vendor)
+    s = _PARTY_ROLE.sub("", s)
+    # Trim trailing commas and whitespace
+    s = _TRAILING_SEP.sub("", s)
+    return s
+
+
+def _fold(text: str) -> str:
+    if not text.isascii() and any(chr(c) in text for c in _CASE_FOLD):
+        text = text.translate(_CASE_FOLD)
+    return text.lower()
+
+
+def _anchor_hits(folded: str, anchors: tuple) -> Iterator[int]:
+    """Ascending offsets where any of `anchors` occurs in the folded text."""
+    def occurrences(anchor: str) -> Iterator[int]:
+        pos = folded.find(anchor)
+        while pos != -1:
+            yield pos
+            pos = folded.find(anchor, pos + 1)
+    if len(anchors) == 1:
+        return occurrences(anchors[0])
+    return heapq.merge(*(occurrences(a) for a in anchors))
+
+
+def _scan_fields(text: str) -> tuple[Dict[str, Optional[re.Match]], List[re.Match]]:
+    """The first match of every field pattern (None when it has none), plus all
+    non-overlapping signatory matches. Full patterns only run at anchor hits.
+    """
+    folded = _fold(text)
+    found: Dict[str, Optional[re.Match]] = {}
+    for name, anchors, pattern, final in _FIELD_RULES:
+        found[name] = None
+        for pos in _anchor_hits(folded, anchors):
+            m = pattern.match(text, pos)
+            if m is not None:
+                found[name] = m
+                break
+            if final is not None and final.match(text, pos):
+                break
+    signatories = list(_matches_at(_SIGNATORY_PATTERN, text, _anchor_hits(folded, _SIGNATORY_ANCHORS)))
+    return found, signatories
+
+
 def extract_fields(text: str) -> Dict:
+    found, signatory_matches = _scan_fields(text)
+
     parties: List[str] = []
-    def _clean_party(s: str) -> str:
-        s = s.strip()
-        # Remove role labels in parentheses like ("Client"), (Vendor)
-        s = re.sub(r"\(\s*[‘’'\"]?(Client|Customer|Vendor|Supplier|Party)[’’'\"]?\s*\)", "", s, flags=re.IGNORECASE)
-        # Trim trailing commas and whitespace
-        s = re.sub(r"[\s,]+$", "", s)
-        return s
-    parties_patterns = [
-        # Capture lazily until 'and', across newlines, then stop at comma/period/newline/end
-        r"between\s+(.*?)\s+and\s+(.*?)(?:[,.\n]|$)",
-        r"parties?\s*:\s*(.*?)\s*;\s*(.*?)\s*(?:[\n]|$)"
-    ]
-    for pat in parties_patterns:
-        m = re.search(pat, text, flags=re.IGNORECASE | re.DOTALL)
+    for name in ('parties_between', 'parties_list'):
+        m = found.get(name)
         if m:
             p1 = _clean_party(m.group(1))
             p2 = _clean_party(m.group(2))
@@ -91,94 +225,43 @@ def extract_fields(text: str) -> Dict:
                 parties = [p1, p2]
                 break
 
+    def group(name: str, i: int = 1) -> Optional[str]:
+        m = found.get(name)
+        return m.group(i).strip() if m else None
 
-    eff_date: Optional[str] = None
-    m = re.search(r"effective\s+date\s*[:\-]?\s*([A-Za-z]{3,9}\s+\d{1,2},\s*\d{4}|\d{4}-\d{2}-\d{2}|\d{2}/\d{2}/\d{4})", text, re.IGNORECASE)
-    if m:
-        eff_date = m.group(1).strip()
-
-
-    term: Optional[str] = None
-    m = re.search(r"\bterm\b\s*[:\-]?\s*([A-Za-z0-9\s]{1,80})\b", text, re.IGNORECASE)
-    if m:
-        term = m.group(1).strip()
-
-
-    gov_law: Optional[str] = None
-    m = re.search(r"governing\s+law\s*[:\-]?\s*([A-Za-z\s]{1,80})", text, re.IGNORECASE)
-    if m:
-        gov_law = m.group(1).strip()
-
-
-    payment_terms: Optional[str] = None
-    m = re.search(r"payment\s+terms?\s*[:\-]?\s*([\s\S]{0,500})\n", text, re.IGNORECASE)
-    if m:
-        payment_terms = m.group(1).strip()
-
-
-    termination: Optional[str] = None
-    m = re.search(r"termination\s*[:\-]?\s*([\s\S]{0,500})\n", text, re.IGNORECASE)
-    if m:
-        termination = m.group(1).strip()
-
-
-    auto_renewal: Optional[str] = None
-    m = re.search(r"auto[-\s]?renew(al)?\s*[:\-]?\s*(yes|no|true|false|enabled|disabled)", text, re.IGNORECASE)
-    if m:
-        auto_renewal = m.group(2).strip().lower()
-
-
-    confidentiality: Optional[str] = None
-    m = re.search(r"confidentiality\s*[:\-]?\s*([\s\S]{0,400})\n", text, re.IGNORECASE)
-    if m:
-        confidentiality = m.group(1).strip()
-
-
-    indemnity: Optional[str] = None
-    m = re.search(r"indemnity\s*[:\-]?\s*([\s\S]{0,400})\n", text, re.IGNORECASE)
-    if m:
-        indemnity = m.group(1).strip()
-
-
+    auto_renewal = group('auto_renewal', 2)
+    if auto_renewal is not None:
+        auto_renewal = auto_renewal.lower()
     liability_cap: Optional[Dict[str, Optional[str]]] = None
-    m = re.search(r"liability\s+cap\s*[:\-]?\s*([\$€£]?\s?\d{1,3}(?:[,\s]?\d{3})*(?:\.\d{2})?)\s*([A-Za-z]{3})?", text, re.IGNORECASE)
+    m = found.get('liability_cap')
     if m:
-        amount = m.group(1).replace(' ', '')
-        currency = m.group(2)
-        liability_cap = { 'amount': amount, 'currency': currency }
-
-
-    signatories: List[Dict[str, str]] = []
-    for m in re.finditer(r"\b(Signatory|Signer|By):\s*([A-Za-z .'-]+)\s*,\s*(Title|Designation):\s*([A-Za-z .'-]+)", text, re.IGNORECASE):
-        signatories.append({'name': m.group(2).strip(), 'title': m.group(4).strip()})
-
+        liability_cap = {'amount': m.group(1).replace(' ', ''), 'currency': m.group(2)}
 
     return {
         'parties': parties,
-        'effective_date': eff_date,
-        'term': term,
-        'governing_law': gov_law,
-        'payment_terms': payment_terms,
-        'termination': termination,
+        'effective_date': group('effective_date'),
+        'term': group('term'),
+        'governing_law': group('governing_law'),
+        'payment_terms': group('payment_terms'),
+        'termination': group('termination'),
         'auto_renewal': auto_renewal,
-        'confidentiality': confidentiality,
-        'indemnity': indemnity,
+        'confidentiality': group('confidentiality'),
+        'indemnity': group('indemnity'),
         'liability_cap': liability_cap,
-        'signatories': signatories,
+        'signatories': [{'name': m.group(2).strip(), 'title': m.group(4).strip()} for m in signatory_matches],
     }
 
 
-def llm_extract_fields(text: str) -> Dict:
-    """Use an LLM (OpenAI) to extract contract fields.
-    Falls back to regex if API key is not configured or on error.
+def llm_extract_fields(text: str, doc_sha256: Optional[str] = None) -> Dict:
+    """Use an LLM (Groq, via the shared client in llm.py) to extract contract fields.
+    `doc_sha256` keys the response cache. Falls back to regex if API key is not
+    configured or on error.
     """
     from .config import settings
     if not settings.GROQ_API_KEY:
         return extract_fields(text)
     try:
-        # Lazy import Groq SDK
-        from groq import Groq
-        client = Groq(api_key=settings.GROQ_API_KEY)
+        from .llm import chat_json
         system_prompt = (
             "You extract structured contract metadata. Return strict JSON with keys: "
             "parties (array of strings), effective_date, term, governing_law, payment_terms, "
@@ -188,16 +271,7 @@ def llm_extract_fields(text: str) -> Dict:
         user_prompt = (
             "Contract text:\n" + text[:20000] + "\n\nReturn only JSON, no prose."
         )
-        resp = client.chat.completions.create(
-            model=settings.GROQ_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0,
-        )
-        content = resp.choices[0].message.content
-        data = json.loads(content)
+        data = chat_json(system_prompt, user_prompt, doc_sha256)
         # ensure all expected keys exist
         for k in [
             'parties','effective_date','term','governing_law','payment_terms','termination',
@@ -208,22 +282,108 @@ def llm_extract_fields(text: str) -> Dict:
         return extract_fields(text)
 
 
+# Risk patterns for audit_risky_clauses, in reporting order: (clause, severity,
+# anchors, pattern, tail). Like the field patterns they start with a literal
+# keyword, so each is matched (non-overlapping, like re.finditer) only at its
+# anchors' offsets in the folded text, instead of re-scanning the whole text per
+# pattern. Patterns with a [^\n]{0,300}? window backtrack through the whole line
+# when they fail; their `tail` is (prefix, literal): the literal must follow the
+# window's shortest prefix within the line the prefix ends on (or, after \s+,
+# just past its end), so anchors without it are skipped unmatched. The prefix is
+# matched first because some (auto\s?renew, hold\s+harmless) can wrap onto the
+# next line; it leaves out trailing \w* so a tail inside the same word counts.
+_AUTO_RENEWAL_NOTICE = re.compile(r"auto[-\s]?renew\w*[^\n]{0,300}?notice[^\n]{0,80}?(\d{1,2})\s*day", re.IGNORECASE)
+_AUTO_RENEWAL_TAIL = (re.compile(r"auto[-\s]?renew"), 'notice')
+_RISK_RULES = [
+    # Unlimited liability indicators
+    ('unlimited_liability', 'high', ('unlimited',), re.compile(r"unlimited\s+liability", re.IGNORECASE), None),
+    ('unlimited_liability', 'high', ('without',), re.compile(r"without\s+limit\s+of\s+liability", re.IGNORECASE), None),
+    ('unlimited_liability', 'high', ('no',), re.compile(r"no\s+cap\s+on\s+liability", re.IGNORECASE), None),
+    ('unlimited_liability', 'high', ('liability',), re.compile(r"liability\s+shall\s+not\s+be\s+limited", re.IGNORECASE), None),
+    # Broad indemnity indicators (non-exhaustive)
+    ('broad_indemnity', 'medium', ('indemnif',), re.compile(r"indemnif\w+[^\n]{0,300}?(any|all)\s+claims", re.IGNORECASE), (re.compile(r"indemnif\w"), 'claims')),
+    ('broad_indemnity', 'medium', ('indemnif',), re.compile(r"indemnif\w+[^\n]{0,300}?third\s+parties", re.IGNORECASE), (re.compile(r"indemnif\w"), 'parties')),
+    ('broad_indemnity', 'medium', ('hold',), re.compile(r"hold\s+harmless[^\n]{0,300}?(any|all)\s+losses", re.IGNORECASE), (re.compile(r"hold\s+harmless"), 'losses')),
+    ('broad_indemnity', 'medium', ('defend',), re.compile(r"defend\s+and\s+indemnif\w+", re.IGNORECASE), None),
+]
+_LIABILITY_CAP_AMOUNT = re.compile(r"liability\s+cap[^\n]{0,150}?([\$€£]?\s?\d{1,3}(?:[,\s]?\d{3})*(?:\.\d{2})?)\s*([A-Za-z]{3})?", re.IGNORECASE)
+_LIABILITY_CAP = re.compile(r"liability\s+cap", re.IGNORECASE)
+_SPACE_RUN = re.compile(r"\s*")
+
+
+def _matches_at(pattern: re.Pattern, text: str, positions: Iterator[int]) -> Iterator[re.Match]:
+    """Non-overlapping matches of `pattern` starting at ascending `positions`;
+    re.finditer's matches when the positions cover every place it can match.
+    """
+    resume = 0
+    for pos in positions:
+        if pos < resume:
+            continue
+        m = pattern.match(text, pos)
+        if m is not None:
+            yield m
+            resume = m.end()
+
+
+def _tail_follows(folded: str, pos: int, tail: tuple) -> bool:
+    """Whether the window prefix of `tail` matches at `pos` and its literal occurs
+    in the folded line from the prefix's end, or right after the whitespace run
+    that ends it: necessary for a window pattern to match at `pos`.
+    """
+    prefix, literal = tail
+    m = prefix.match(folded, pos)
+    if m is None:
+        return False
+    pos = m.end()
+    eol = folded.find('\n', pos)
+    if eol == -1:
+        return folded.find(literal, pos) != -1
+    return folded.find(literal, pos, eol) != -1 or folded.startswith(literal, _SPACE_RUN.match(folded, eol).end())
+
+
+def _period_offsets(text: str) -> List[int]:
+    """Ascending offsets of every '.', the sentence boundaries of audit evidence."""
+    offsets = []
+    pos = text.find('.')
+    while pos != -1:
+        offsets.append(pos)
+        pos = text.find('.', pos + 1)
+    return offsets
+
+
 def audit_risky_clauses(text: str) -> List[Dict]:
     findings: List[Dict] = []
 
 
     # Normalize for robust matching
     normalized = text
+    folded = _fold(normalized)
+    hits: Dict[tuple, List[int]] = {}
+    periods: List[List[int]] = []
+
+
+    def anchored(pattern: re.Pattern, anchors: tuple, tail: Optional[tuple] = None) -> Iterator[re.Match]:
+        if anchors not in hits:
+            hits[anchors] = list(_anchor_hits(folded, anchors))
+        positions = hits[anchors]
+        if tail is not None:
+            positions = [pos for pos in positions if _tail_follows(folded, pos, tail)]
+        return _matches_at(pattern, normalized, positions)
 
 
     def add_finding(kind: str, severity: str, match: re.Match, note: Optional[str] = None):
-        # Expand evidence to sentence window for better context
+        # Expand evidence to sentence window for better context: the last '.'
+        # before the match and the first one from its end, found by bisecting
+        # the document's period offsets (built once, on the first finding)
         start = match.start()
         end = match.end()
-        left = normalized.rfind('.', 0, start)
-        right = normalized.find('.', end)
-        left = 0 if left == -1 else left + 1
-        right = len(normalized) if right == -1 else right + 1
+        if not periods:
+            periods.append(_period_offsets(normalized))
+        dots = periods[0]
+        i = bisect.bisect_left(dots, start)
+        j = bisect.bisect_left(dots, end)
+        left = dots[i - 1] + 1 if i > 0 else 0
+        right = dots[j] + 1 if j < len(dots) else len(normalized)
         span_text = normalized[left:right].strip()
         findings.append({
             'clause': kind,
@@ -237,7 +397,7 @@ def audit_risky_clauses(text: str) -> List[Dict]:
 
     # Auto-renewal with < threshold days notice (configurable)
     from .config import settings
-    for m in re.finditer(r"auto[-\s]?renew\w*[^\n]{0,300}?notice[^\n]{0,80}?(\d{1,2})\s*day", normalized, re.IGNORECASE):
+    for m in anchored(_AUTO_RENEWAL_NOTICE, ('auto',), _AUTO_RENEWAL_TAIL):
         try:
             days = int(m.group(1))
             if days < settings.NOTICE_DAYS_THRESHOLD:
@@ -246,35 +406,16 @@ def audit_risky_clauses(text: str) -> List[Dict]:
             continue
 
 
-    # Unlimited liability indicators
-    unlimited_patterns = [
-        r"unlimited\s+liability",
-        r"without\s+limit\s+of\s+liability",
-        r"no\s+cap\s+on\s+liability",
-        r"liability\s+shall\s+not\s+be\s+limited"
-    ]
-    for pat in unlimited_patterns:
-        for m in re.finditer(pat, normalized, re.IGNORECASE):
-            add_finding('unlimited_liability', 'high', m)
-
-
-    # Broad indemnity indicators (non-exhaustive)
-    broad_indemnity_patterns = [
-        r"indemnif\w+[^\n]{0,300}?(any|all)\s+claims",
-        r"indemnif\w+[^\n]{0,300}?third\s+parties",
-        r"hold\s+harmless[^\n]{0,300}?(any|all)\s+losses",
-        r"defend\s+and\s+indemnif\w+"
-    ]
-    for pat in broad_indemnity_patterns:
-        for m in re.finditer(pat, normalized, re.IGNORECASE):
-            add_finding('broad_indemnity', 'medium', m)
+    for kind, severity, anchors, pattern, tail in _RISK_RULES:
+        for m in anchored(pattern, anchors, tail):
+            add_finding(kind, severity, m)
 
 
     # Liability cap overly high or missing currency (heuristic)
-    m = re.search(r"liability\s+cap[^\n]{0,150}?([\$€£]?\s?\d{1,3}(?:[,\s]?\d{3})*(?:\.\d{2})?)\s*([A-Za-z]{3})?", normalized, re.IGNORECASE)
+    m = next(anchored(_LIABILITY_CAP_AMOUNT, ('liability',)), None)
     if not m:
         # If liability cap section missing, flag informational
-        for mm in re.finditer(r"liability\s+cap", normalized, re.IGNORECASE):
+        for mm in anchored(_LIABILITY_CAP, ('liability',)):
             add_finding('liability_cap_unclear', 'low', mm, note='Liability cap referenced but not found')
     else:
         amount_raw = m.group(1).replace(' ', '')
@@ -290,16 +431,37 @@ def audit_risky_clauses(text: str) -> List[Dict]:
     return findings
 
 
-def llm_audit_risky_clauses(text: str) -> List[Dict]:
+def auto_renewal_notice_days(text: str) -> List[int]:
+    """Notice periods (days) of every auto-renewal clause the audit inspects,
+    whether or not they are under NOTICE_DAYS_THRESHOLD."""
+    folded = _fold(text)
+    positions = [pos for pos in _anchor_hits(folded, ('auto',)) if _tail_follows(folded, pos, _AUTO_RENEWAL_TAIL)]
+    return [int(m.group(1)) for m in _matches_at(_AUTO_RENEWAL_NOTICE, text, positions)]
+
+
+def rules_fingerprint() -> str:
+    """Identifies the regex rules and audit thresholds a stored analysis was made with."""
+    key = f'{RULES_VERSION}:{settings.NOTICE_DAYS_THRESHOLD}:{settings.LIABILITY_CAP_THRESHOLD}'
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+
+def analyse_text(text: str) -> Dict:
+    """Regex fields, audit findings and auto-renewal notice days for one document,
+    tagged with rules_fingerprint()."""
+    return {'fingerprint': rules_fingerprint(), 'fields': extract_fields(text), 'findings': audit_risky_clauses(text),
+            'notice_days': auto_renewal_notice_days(text)}
+
+
+def llm_audit_risky_clauses(text: str, doc_sha256: Optional[str] = None) -> List[Dict]:
     """Use an LLM to detect risky clauses and return findings with severity and evidence spans.
-    Falls back to regex audit when API is unavailable or errors.
+    `doc_sha256` keys the response cache. Falls back to regex audit when API is
+    unavailable or errors.
     """
     from .config import settings
     if not settings.GROQ_API_KEY:
         return audit_risky_clauses(text)
     try:
-        from groq import Groq
-        client = Groq(api_key=settings.GROQ_API_KEY)
+        from .llm import chat_json
         system_prompt = (
             "You are a contract risk auditor. Identify risky clauses: "
             "auto-renewal with short notice (<" + str(settings.NOTICE_DAYS_THRESHOLD) + " days), "
@@ -311,16 +473,7 @@ def llm_audit_risky_clauses(text: str) -> List[Dict]:
         user_prompt = (
             "Text to audit (first 20k chars):\n" + text[:20000] + "\n\nReturn only JSON for 'findings'."
         )
-        resp = client.chat.completions.create(
-            model=settings.GROQ_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0,
-        )
-        content = resp.choices[0].message.content
-        data = json.loads(content)
+        data = chat_json(system_prompt, user_prompt, doc_sha256)
         if isinstance(data, dict) and 'findings' in data:
             findings = data['findings']
         elif isinstance(data, list):
@@ -0,0 +1,149 @@
+import re
+import bisect
+import threading
+from typing import Dict, List, Optional, Set
+from . import analysis_store, registry
+from .extract import rules_fingerprint
+
+
+# Process-wide secondary index over the stored analyses (analysis_store) of every
+# registered document, for corpus-wide field/finding queries:
+#   - term postings (lowercase word -> doc ids) for governing law and parties
+#   - sorted (value, doc id) lists for liability cap amounts and notice days,
+#     so a range is two bisects
+#   - facet sets (value -> doc ids) for finding clause type and severity
+# Documents are indexed incrementally as the registry grows (registry order is
+# ingest order, so only the new tail is read); a rules fingerprint change drops
+# the index and rebuilds it from the recomputed analyses. Catching up can read
+# (or recompute) every analysis, so it runs off the event loop: warm() at
+# startup, refresh() after each ingest, and searches on an executor thread.
+TERM_FIELDS = ('governing_law', 'parties')
+RANGE_FIELDS = ('liability_cap', 'notice_days')
+FACET_FIELDS = ('clause', 'severity')
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+_terms: Dict[str, Dict[str, Set[int]]] = {}
+_ranges: Dict[str, List[tuple]] = {}
+_facets: Dict[str, Dict[str, Set[int]]] = {}
+_doc_ids: Set[int] = set()
+_seen = 0
+_fingerprint: Optional[str] = None
+_lock = threading.RLock()
+
+
+
+
+def _reset(fingerprint: Optional[str]):
+    global _terms, _ranges, _facets, _doc_ids, _seen, _fingerprint
+    _terms = {f: {} for f in TERM_FIELDS}
+    _ranges = {f: [] for f in RANGE_FIELDS}
+    _facets = {f: {} for f in FACET_FIELDS}
+    _doc_ids = set()
+    _seen = 0
+    _fingerprint = fingerprint
+
+
+def _words(value: str) -> Set[str]:
+    return set(_WORD.findall(value.lower()))
+
+
+def cap_amount(liability_cap: Optional[Dict]) -> Optional[float]:
+    """Numeric value of an extracted liability cap ('$1,000,000.00' -> 1000000.0)."""
+    amount = re.sub(r'[^0-9.]', '', (liability_cap or {}).get('amount') or '')
+    try:
+        return float(amount)
+    except ValueError:
+        return None
+
+
+def _add(doc_id: int, record: Dict):
+    fields = record.get('fields') or {}
+    terms = {'governing_law': fields.get('governing_law') or '', 'parties': ' '.join(fields.get('parties') or [])}
+    for field, value in terms.items():
+        for word in _words(value):
+            _terms[field].setdefault(word, set()).add(doc_id)
+    # Range lists are re-sorted once per refresh batch, not per document
+    amount = cap_amount(fields.get('liability_cap'))
+    if amount is not None:
+        _ranges['liability_cap'].append((amount, doc_id))
+    for days in set(record.get('notice_days') or []):
+        _ranges['notice_days'].append((days, doc_id))
+    for finding in record.get('findings') or []:
+        for field in FACET_FIELDS:
+            if finding.get(field):
+                _facets[field].setdefault(finding[field], set()).add(doc_id)
+    _doc_ids.add(doc_id)
+
+
+def _refresh():
+    global _seen
+    fingerprint = rules_fingerprint()
+    count = registry.count()
+    # The registry only grows; a shorter one means docs.json was replaced
+    if fingerprint != _fingerprint or count < _seen:
+        _reset(fingerprint)
+    if count == _seen:
+        return
+    docs = registry.all_documents()
+    for meta in docs[_seen:]:
+        doc_id = meta.get('id')
+        record = analysis_store.get(meta) if doc_id is not None else None
+        if record is not None:
+            _add(doc_id, record)
+    for values in _ranges.values():
+        values.sort()
+    _seen = len(docs)
+
+
+def refresh():
+    """Index the documents registered since the last refresh. Blocking."""
+    with _lock:
+        _refresh()
+
+
+def warm():
+    """Build the index on a background thread, so the first search after startup
+    does not wait for every stored analysis to be read."""
+    threading.Thread(target=refresh, name='field-index-warm', daemon=True).start()
+
+
+def _in_range(field: str, low: Optional[float], high: Optional[float]) -> Set[int]:
+    values = _ranges[field]
+    lo = 0 if low is None else bisect.bisect_left(values, (low,))
+    hi = len(values) if high is None else bisect.bisect_right(values, (high, float('inf')))
+    return {doc_id for _, doc_id in values[lo:hi]}
+
+
+def search(governing_law: Optional[str] = None, party: Optional[str] = None,
+           clause: Optional[str] = None, severity: Optional[str] = None,
+           liability_cap_min: Optional[float] = None, liability_cap_max: Optional[float] = None,
+           notice_days_min: Optional[int] = None, notice_days_max: Optional[int] = None) -> Dict:
+    """Ids of documents matching every given filter (term filters need all of the
+    value's words; ranges are inclusive), plus finding facet counts over them."""
+    with _lock:
+        _refresh()
+        candidates: List[Set[int]] = []
+        for field, value in (('governing_law', governing_law), ('parties', party)):
+            if value is not None:
+                words = _words(value)
+                candidates.extend(_terms[field].get(w, set()) for w in words)
+                if not words:
+                    candidates.append(set())
+        for field, value in (('clause', clause), ('severity', severity)):
+            if value is not None:
+                candidates.append(_facets[field].get(value, set()))
+        for field, low, high in (('liability_cap', liability_cap_min, liability_cap_max),
+                                 ('notice_days', notice_days_min, notice_days_max)):
+            if low is not None or high is not None:
+                candidates.append(_in_range(field, low, high))
+        candidates.sort(key=len)
+        matched = set(candidates[0]) if candidates else set(_doc_ids)
+        for ids in candidates[1:]:
+            matched &= ids
+            if not matched:
+                break
+        facets = {field: {value: len(ids & matched) for value, ids in _facets[field].items()}
+                  for field in FACET_FIELDS}
+        return {'document_ids': sorted(matched),
+                'facets': {field: {v: n for v, n in counts.items() if n} for field, counts in facets.items()}}
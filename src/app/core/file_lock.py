@@ -0,0 +1,46 @@
+import os
+import fcntl
+import threading
+
+
+class FileLock:
+    """Exclusive lock shared by every process on the host, for read-modify-write
+    sequences on files under DATA_DIR (e.g. with `uvicorn --workers`): an
+    fcntl.flock on `path`, plus a thread lock because flock is per open file, not
+    per thread. Re-entrant within a thread; the lock file is created on first use
+    and never removed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                except BaseException:
+                    os.close(fd)
+                    raise
+            except BaseException:
+                self._thread_lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            fd, self._fd = self._fd, None
+            try:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+        self._thread_lock.release()
+        return False
@@ -0,0 +1,24 @@
+from typing import List
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+
+
+# Stateless vectorizer for INDEX_VECTORIZER=hashing. Kept out of index_faiss so the
+# spawned worker processes that hash chunk batches don't import FAISS.
+
+
+
+
+def hashing_vectorizer(n_features: int) -> HashingVectorizer:
+    """Raw term counts over a fixed number of hash buckets, tokenised like the
+    TF-IDF mode (lowercase, English stop words). IDF and L2 normalisation are
+    applied at query time from corpus-wide document frequencies.
+    """
+    return HashingVectorizer(n_features=n_features, stop_words='english', alternate_sign=False,
+                             norm=None, dtype=np.float32)
+
+
+def hash_texts(texts: List[str], n_features: int) -> sparse.csr_matrix:
+    """Hash one batch of chunk texts; runs on the shared process pool."""
+    return hashing_vectorizer(n_features).transform(texts).tocsr()
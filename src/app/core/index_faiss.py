@@ -1,147 +1,1001 @@
 import os
+import json
+import heapq
+import shutil
+import threading
+import time
+import uuid
+import logging
 import numpy as np
 import faiss
-from sklearn.feature_extraction.text import TfidfVectorizer
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
+from sklearn.preprocessing import normalize
+from sklearn.decomposition import TruncatedSVD
 from joblib import dump, load
-from typing import List, Dict, Iterable
+from prometheus_client import Gauge
+from itertools import repeat
+from typing import List, Dict, Iterable, Optional
+from .config import settings
+from .file_lock import FileLock
+from .hashing import hashing_vectorizer, hash_texts
+from .rule_engine import build_sentence_index
+from .workers import get_process_pool
 
 
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data')
+DATA_DIR = settings.DATA_DIR
 DOCS_DIR = os.path.join(DATA_DIR, 'docs')
 INDEX_DIR = os.path.join(DATA_DIR, 'index')
+# Legacy single-index layout (read once and carried over as a segment)
 VECTORIZER_PATH = os.path.join(INDEX_DIR, 'vectorizer.joblib')
 MATRIX_PATH = os.path.join(INDEX_DIR, 'matrix.npy')
 FAISS_INDEX_PATH = os.path.join(INDEX_DIR, 'faiss.index')
 CHUNK_MAP_PATH = os.path.join(INDEX_DIR, 'chunk_texts.joblib')
 CHUNK_META_PATH = os.path.join(INDEX_DIR, 'chunk_meta.joblib')
+# Segmented layout: segments/<seg_id>/ holds one segment as flat arrays that are
+# opened with mmap, so loading is a few open() calls and every worker process
+# shares the same pages through the OS page cache:
+#   matrix.npy                   dense backend, L2-normalised float32 rows
+#   csr_{data,indices,indptr,shape}.npy   sparse backend, CSR components
+#   texts.bin + texts_offsets.npy         chunk texts as one UTF-8 blob, n+1 offsets
+#   meta_{doc_id,start,end,page}.npy      chunk metadata as int64 (-1 for None)
+#   sentence_runs{.bin,_offsets.npy}     build_sentence_index() text per chunk
+# Older segment dirs (chunk_texts.joblib, chunk_meta.joblib, faiss.index,
+# matrix.npz) are still read; their JSON sentences.bin is not, so the rule
+# engine indexes their chunks on the fly.
+# Segment dirs are written under <seg_id>.tmp and renamed into place, so a dir
+# without the suffix is always complete.
+SEGMENTS_DIR = os.path.join(INDEX_DIR, 'segments')
+TMP_SUFFIX = '.tmp'
+# Versioned manifests: manifests/<generation>.json records the segment list of
+# each committed generation; segments.json is the pointer readers follow and is
+# only ever replaced by an atomic rename.
+MANIFESTS_DIR = os.path.join(INDEX_DIR, 'manifests')
+MANIFEST_PATH = os.path.join(INDEX_DIR, 'segments.json')
+LEGACY_SEGMENT_ID = 'legacy'
+# Index types that hold compressed codes; their segments keep no matrix.npy
+QUANTISED_INDEX_TYPES = ('sq8', 'sq4', 'sqfp16', 'pq', 'ivfpq')
+# Rows widened to float32 at a time when exact search runs over float16 storage
+EXACT_BLOCK_ROWS = 65536
+# FAISS scalar quantisers only take their SIMD path when the dimension is a
+# multiple of 8 (~6x faster); their vectors are zero-padded to one
+SQ_DIM_MULTIPLE = 8
 
 
-_vectorizer: TfidfVectorizer | None = None
-_matrix: np.ndarray | None = None
-_index: faiss.IndexFlatIP | None = None
-_chunk_texts: List[str] = []
-_chunk_meta: List[Dict] = []
+logger = logging.getLogger(__name__)
+
+
+META_FIELDS = ('doc_id', 'start', 'end', 'page')
+
+
+class MappedTexts:
+    """Read-only sequence of chunk texts backed by a UTF-8 blob and an offsets array."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self):
+        return max(0, len(self._offsets) - 1)
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]]).decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class MappedMeta:
+    """Read-only sequence of chunk metadata dicts backed by fixed-width int64 columns."""
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self._columns = columns
+
+    def __len__(self):
+        return len(self._columns['doc_id'])
+
+    def column(self, name: str) -> np.ndarray:
+        return self._columns[name]
+
+    def __getitem__(self, i: int) -> Dict:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        out = {}
+        for name in META_FIELDS:
+            v = int(self._columns[name][i])
+            out[name] = None if v < 0 else v
+        return out
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class Segment:
+    """Immutable slice of the corpus with its own TF-IDF vocabulary.
+    Dense segments score the normalised matrix with an exact inner-product kNN,
+    or search an IVF/HNSW FAISS index when one was built; sparse segments keep the L2-normalised
+    CSR matrix and score with a sparse dot product instead. Hashed segments
+    (INDEX_VECTORIZER=hashing) have no vocabulary: they keep raw term counts in
+    CSR form and are weighted by the snapshot's corpus-wide IDF at query time.
+    """
+
+    def __init__(self, seg_id: str, vectorizer: TfidfVectorizer | HashingVectorizer | None,
+                 matrix: np.ndarray | sparse.csr_matrix | None,
+                 index: faiss.IndexFlatIP | None, chunk_texts: List[str], chunk_meta: List[Dict],
+                 projection: TruncatedSVD | None = None, sentence_index: List[str] | None = None):
+        self.seg_id = seg_id
+        self.vectorizer = vectorizer
+        # Optional TruncatedSVD applied after the vectorizer (INDEX_SVD_DIM)
+        self.projection = projection
+        self.matrix = matrix
+        self.index = index
+        self.chunk_texts = chunk_texts
+        self.chunk_meta = chunk_meta
+        # build_sentence_index() of each chunk; None for older segments
+        self.sentence_index = sentence_index
+        self._doc_ranges: Dict[int, List[tuple]] | None = None
+        self._doc_freq: np.ndarray | None = None
+
+    def __len__(self):
+        return len(self.chunk_texts)
+
+    def is_hashed(self) -> bool:
+        return isinstance(self.vectorizer, HashingVectorizer)
+
+    def doc_freq(self) -> np.ndarray:
+        """Number of chunks containing each hash bucket (hashed segments only).
+        A CSR row lists each column once, so this is a bincount of the column indices.
+        """
+        if self._doc_freq is None:
+            self._doc_freq = np.bincount(np.asarray(self.matrix.indices),
+                                         minlength=self.vectorizer.n_features).astype(np.int64)
+        return self._doc_freq
+
+    def doc_rows(self, doc_ids: Iterable[int]) -> np.ndarray:
+        """Local row numbers of the chunks that belong to `doc_ids`, in row order."""
+        if self._doc_ranges is None:
+            self._doc_ranges = self._build_doc_ranges()
+        spans = sorted(r for d in doc_ids for r in self._doc_ranges.get(d, ()))
+        if not spans:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([np.arange(start, end, dtype=np.int64) for start, end in spans])
+
+    def _build_doc_ranges(self) -> Dict[int, List[tuple]]:
+        # A document's chunks are appended together, so each doc_id is one run
+        # of rows (occasionally a few); store the runs as (start, end) pairs.
+        if isinstance(self.chunk_meta, MappedMeta):
+            col = np.asarray(self.chunk_meta.column('doc_id'))
+        else:
+            col = np.array([m.get('doc_id') if m.get('doc_id') is not None else -1 for m in self.chunk_meta], dtype=np.int64)
+        col = col[:len(self)]
+        ranges: Dict[int, List[tuple]] = {}
+        if not len(col):
+            return ranges
+        bounds = np.flatnonzero(col[1:] != col[:-1]) + 1
+        starts = [0] + bounds.tolist()
+        ends = bounds.tolist() + [len(col)]
+        for start, end in zip(starts, ends):
+            doc_id = int(col[start])
+            if doc_id >= 0:
+                ranges.setdefault(doc_id, []).append((start, end))
+        return ranges
+
+    def sentences(self, i: int) -> Optional[str]:
+        """Chunk i's precomputed rule-engine sentence index, if the segment has one.
+        Returned as stored; rule_engine_answer reads only the parts it needs.
+        """
+        if self.sentence_index is None or i >= len(self.sentence_index):
+            return None
+        return self.sentence_index[i]
+
+    def chunks(self) -> Iterable[Dict]:
+        """Yield the segment's chunks as dicts (text plus metadata), e.g. for merges."""
+        for i, text in enumerate(self.chunk_texts):
+            chunk = dict(self.chunk_meta[i]) if i < len(self.chunk_meta) else {}
+            chunk['text'] = text
+            yield chunk
+
+    def search(self, question: str, top_k: int, nprobe: int | None = None, ef_search: int | None = None,
+               rows: np.ndarray | None = None, weights: tuple | None = None) -> List[tuple]:
+        """Return (local_index, score) pairs for the best matches in this segment."""
+        return self.search_batch([question], top_k, nprobe, ef_search, rows, weights)[0]
+
+    def search_batch(self, questions: List[str], top_k: int, nprobe: int | None = None,
+                     ef_search: int | None = None, rows: np.ndarray | None = None,
+                     weights: tuple | None = None) -> List[List[tuple]]:
+        """search() for many questions: one transform and one multi-row search.
+        `nprobe` / `ef_search` override the IVF / HNSW defaults for this call.
+        `rows` (sorted local row numbers, see doc_rows()) limits the search to
+        those rows: they are scored exactly, or through an ID selector on the
+        ANN index when there are at least FAISS_ANN_MIN_CHUNKS of them.
+        `weights` is IndexSnapshot.hashed_weights() for hashed segments; without
+        it the segment's own document frequencies are used.
+        """
+        if self.vectorizer is None or not self.chunk_texts or not questions:
+            return [[] for _ in questions]
+        if rows is not None and not len(rows):
+            return [[] for _ in questions]
+        if self.is_hashed():
+            if weights is None:
+                weights = IndexSnapshot(0, [self]).hashed_weights(self)
+            return self._search_hashed(questions, top_k, rows, weights)
+        if sparse.issparse(self.matrix):
+            return self._search_sparse(questions, top_k, rows)
+        if self.index is None and self.matrix is None:
+            return [[] for _ in questions]
+        q_mat = self.vectorizer.transform(questions)
+        q_mat = (self.projection.transform(q_mat) if self.projection is not None else q_mat.toarray()).astype('float32')
+        q_norm = np.linalg.norm(q_mat, axis=1, keepdims=True)
+        q_norm[q_norm == 0] = 1.0
+        q_mat = q_mat / q_norm
+        if self.index is not None and self.index.d > q_mat.shape[1]:
+            q_mat = np.pad(q_mat, ((0, 0), (0, self.index.d - q_mat.shape[1])))
+        use_index = self.index is not None and (
+            rows is None or self.matrix is None or len(rows) >= max(1, settings.FAISS_ANN_MIN_CHUNKS))
+        if use_index and rows is not None and not _accepts_selector(self.index):
+            use_index = False
+        if use_index:
+            # The selector must outlive the search call that references it
+            sel = faiss.IDSelectorBatch(rows) if rows is not None else None
+            D, I = self.index.search(q_mat, top_k, params=_search_params(self.index, nprobe, ef_search, sel))
+        else:
+            # Exact inner-product search straight over the (memory-mapped) matrix,
+            # or over just the selected rows of it; without a matrix (IndexPQ, which
+            # rejects an ID selector) the selected rows are decoded from their codes
+            if self.matrix is None:
+                matrix = self.index.reconstruct_batch(rows)
+            else:
+                matrix = self.matrix if rows is None else np.ascontiguousarray(self.matrix[rows])
+            k = min(top_k, matrix.shape[0])
+            if k <= 0:
+                return [[] for _ in questions]
+            D, I = _exact_knn(q_mat, matrix, k)
+            if rows is not None:
+                I = np.where(I >= 0, rows[np.maximum(I, 0)], -1)
+        n = len(self.chunk_texts)
+        return [[(i, float(s)) for i, s in zip(ids, scores) if 0 <= i < n]
+                for ids, scores in zip(I.tolist(), D.tolist())]
+
+    def _search_sparse(self, questions: List[str], top_k: int, rows: np.ndarray | None = None) -> List[List[tuple]]:
+        # Rows and queries are already L2-normalised by TfidfVectorizer, so the
+        # sparse dot product is the cosine similarity FAISS would return.
+        q_mat = self.vectorizer.transform(questions).astype('float32')
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        return _top_k_columns(np.asarray((matrix @ q_mat.T).todense()), top_k, rows)
+
+    def _search_hashed(self, questions: List[str], top_k: int, rows: np.ndarray | None,
+                       weights: tuple) -> List[List[tuple]]:
+        # Cosine of the IDF-weighted vectors: with q' = normalize(q * idf), a row d
+        # scores (d * idf) . q' / |d * idf|, and |d * idf| comes precomputed in weights.
+        idf, norms = weights
+        q_mat = normalize(sparse.csr_matrix(self.vectorizer.transform(questions).multiply(idf)))
+        q_mat = sparse.csr_matrix(q_mat.multiply(idf))
+        matrix = self.matrix
+        if rows is not None:
+            matrix, norms = matrix[rows], norms[rows]
+        all_scores = np.asarray((matrix @ q_mat.T).todense()) / norms[:, None]
+        return _top_k_columns(all_scores, top_k, rows)
+
+
+def _accepts_selector(index) -> bool:
+    """Whether index.search() takes SearchParameters with an ID selector."""
+    return not isinstance(index, faiss.IndexPQ)
+
+
+def _exact_knn(q_mat: np.ndarray, matrix: np.ndarray, k: int) -> tuple:
+    """Inner-product kNN over the rows of `matrix`; float16 matrices are widened
+    to float32 EXACT_BLOCK_ROWS rows at a time and the per-block results merged.
+    Only the selected rows of a filtered search (or a float16 matrix.npy written
+    before exact float16 segments moved to an fp16 flat index) take that path.
+    """
+    if matrix.dtype == np.float32:
+        return faiss.knn(q_mat, matrix, k, metric=faiss.METRIC_INNER_PRODUCT)
+    D_all = I_all = None
+    for start in range(0, matrix.shape[0], EXACT_BLOCK_ROWS):
+        block = np.asarray(matrix[start:start + EXACT_BLOCK_ROWS], dtype=np.float32)
+        D, I = faiss.knn(q_mat, block, min(k, block.shape[0]), metric=faiss.METRIC_INNER_PRODUCT)
+        I = I + start
+        if D_all is not None:
+            D, I = np.hstack([D_all, D]), np.hstack([I_all, I])
+        order = np.argsort(-D, axis=1, kind='stable')[:, :k]
+        D_all, I_all = np.take_along_axis(D, order, axis=1), np.take_along_axis(I, order, axis=1)
+    return D_all, I_all
+
+
+def _top_k_columns(all_scores: np.ndarray, top_k: int, rows: np.ndarray | None = None) -> List[List[tuple]]:
+    """Per column of a (rows x questions) score matrix, the top_k (row, score)
+    pairs by descending score; `rows` maps positions back to segment rows.
+    """
+    k = min(top_k, all_scores.shape[0])
+    if k <= 0:
+        return [[] for _ in range(all_scores.shape[1])]
+    out = []
+    for col in range(all_scores.shape[1]):
+        scores = all_scores[:, col]
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        ids = top if rows is None else rows[top]
+        out.append([(int(i), float(s)) for i, s in zip(ids, scores[top])])
+    return out
+
+
+class IndexSnapshot:
+    """Immutable view of the committed segments at one index generation."""
+
+    def __init__(self, generation: int, segments: Iterable[Segment], size_bytes: Optional[int] = None):
+        self.generation = generation
+        self.segments = tuple(segments)
+        # On-disk bytes of the segments, from the manifest (None for older ones)
+        self.size_bytes = size_bytes
+        self._idf: Dict[int, np.ndarray] = {}
+        self._row_norms: Dict[str, np.ndarray] = {}
+
+    def hashed_weights(self, seg: Segment) -> tuple:
+        """(idf, row_norms) for a hashed segment: smoothed IDF over every hashed
+        segment's document frequencies (as TfidfVectorizer computes it) and the
+        L2 norms of the segment's IDF-weighted rows. Computed on first use and
+        kept for the life of the snapshot; each segment caches its own counts, so
+        a new generation only sums them rather than rescanning the corpus.
+        """
+        n_features = seg.vectorizer.n_features
+        idf = self._idf.get(n_features)
+        if idf is None:
+            df = np.zeros(n_features, dtype=np.int64)
+            n = 0
+            for s in self.segments:
+                if s.is_hashed() and s.vectorizer.n_features == n_features:
+                    df += s.doc_freq()
+                    n += len(s)
+            idf = np.log((1 + n) / (1 + df)) + 1
+            self._idf[n_features] = idf
+        norms = self._row_norms.get(seg.seg_id)
+        if norms is None:
+            norms = np.sqrt(np.asarray(seg.matrix.multiply(seg.matrix) @ (idf * idf)).ravel())
+            norms[norms == 0] = 1.0
+            self._row_norms[seg.seg_id] = norms
+        return idf, norms
+
+
+# Resident index: replaced wholesale (never mutated) when a new generation is loaded
+_snapshot = IndexSnapshot(0, [])
+_manifest_signature: tuple | None = None
+_lock = threading.RLock()
+# Taken (after _lock) around every load-then-commit, so worker processes never
+# publish a generation built from a stale segment list and drop each other's segments
+_commit_lock = FileLock(os.path.join(INDEX_DIR, 'segments.lock'))
+# Segment files never change once saved, so their size is summed once per segment
+_segment_sizes: Dict[str, int] = {}
+INDEX_SIZE_GAUGE = Gauge('index_size_bytes', 'On-disk bytes of the committed index segments')
+_merge_thread: threading.Thread | None = None
 
 
 os.makedirs(DOCS_DIR, exist_ok=True)
 os.makedirs(INDEX_DIR, exist_ok=True)
+os.makedirs(SEGMENTS_DIR, exist_ok=True)
+os.makedirs(MANIFESTS_DIR, exist_ok=True)
+
+
+
+
+def _segment_dir(seg_id: str) -> str:
+    return os.path.join(SEGMENTS_DIR, seg_id)
+
+
+def _build_segment(chunks: List[Dict]) -> Segment:
+    # Accept list of dicts {'text':..., 'doc_id':..., 'start':..., 'end':..., 'page':...}
+    chunk_meta = [c if isinstance(c, dict) else {'text': str(c)} for c in chunks]
+    chunk_texts = [m.get('text', '') for m in chunk_meta]
+    seg = Segment(uuid.uuid4().hex[:12], None, None, None, chunk_texts, chunk_meta,
+                  sentence_index=[build_sentence_index(t) for t in chunk_texts])
+    if settings.INDEX_VECTORIZER == 'hashing':
+        # No vocabulary to fit: the segment stands alone and is always CSR
+        seg.vectorizer = hashing_vectorizer(settings.HASHING_N_FEATURES)
+        seg.matrix = _hash_chunk_texts(chunk_texts, settings.HASHING_N_FEATURES)
+        return seg
+    n = len(chunk_texts)
+    # Compaction that needs enough rows to be meaningful (min_df pruning, SVD)
+    # applies from FAISS_ANN_MIN_CHUNKS rows, like the ANN index itself
+    large = n >= max(1, settings.FAISS_ANN_MIN_CHUNKS)
+    vectorizer = TfidfVectorizer(stop_words='english', **_vocabulary_limits(large))
+    try:
+        mat = vectorizer.fit_transform(chunk_texts)
+    except ValueError:
+        # Empty vocabulary (blank or stop-word-only chunks): keep the chunks so
+        # global chunk numbering stays aligned, but nothing is searchable.
+        return seg
+    seg.vectorizer = vectorizer
+    if settings.INDEX_BACKEND == 'sparse':
+        # TfidfVectorizer rows are already L2-normalised; keep them as CSR
+        seg.matrix = sparse.csr_matrix(mat, dtype=np.float32)
+        return seg
+    # Convert to dense (projected to INDEX_SVD_DIM straight from the sparse
+    # matrix when enabled); normalize for inner product
+    n_components = min(settings.INDEX_SVD_DIM, mat.shape[1] - 1, n - 1) if large else 0
+    if n_components >= 1:
+        seg.projection = TruncatedSVD(n_components=n_components, random_state=0)
+        dense = seg.projection.fit_transform(mat).astype('float32')
+    else:
+        dense = mat.toarray().astype('float32')
+    norms = np.linalg.norm(dense, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    seg.matrix = np.ascontiguousarray(dense / norms, dtype=np.float32)
+    seg.index = build_ann_index(seg.matrix)
+    if seg.index is None and settings.INDEX_DENSE_DTYPE == 'float16' and seg.matrix.shape[1]:
+        # Exact search over half-size rows: FAISS scans the fp16 codes directly,
+        # where widening a float16 matrix.npy per query was ~8x slower than float32
+        seg.index = faiss.index_factory(_pad_dim(seg.matrix).shape[1], 'SQfp16', faiss.METRIC_INNER_PRODUCT)
+        seg.index.add(_pad_dim(seg.matrix))
+        seg.matrix = None
+    elif seg.index is not None and settings.FAISS_INDEX_TYPE in QUANTISED_INDEX_TYPES:
+        # The codes replace the matrix; filtered searches go through an ID selector,
+        # or decode the selected rows where the index takes none (pq)
+        seg.matrix = None
+    elif settings.INDEX_DENSE_DTYPE == 'float16':
+        # Kept beside an ANN index only for small filtered searches, which widen
+        # just their selected rows
+        seg.matrix = seg.matrix.astype(np.float16)
+    return seg
+
+
+def _vocabulary_limits(large: bool) -> Dict:
+    limits = {}
+    if settings.TFIDF_MAX_FEATURES > 0:
+        limits['max_features'] = settings.TFIDF_MAX_FEATURES
+    if large and settings.TFIDF_MIN_DF > 1:
+        limits['min_df'] = settings.TFIDF_MIN_DF
+    return limits
+
+
+def _hash_chunk_texts(texts: List[str], n_features: int) -> sparse.csr_matrix:
+    """Hash chunk texts in CHUNK_BATCH_SIZE batches, in parallel on the process
+    pool when there is more than one batch.
+    """
+    batch = max(1, settings.CHUNK_BATCH_SIZE)
+    if len(texts) <= batch:
+        return hash_texts(texts, n_features)
+    batches = [texts[i:i + batch] for i in range(0, len(texts), batch)]
+    parts = list(get_process_pool().map(hash_texts, batches, repeat(n_features)))
+    return sparse.vstack(parts, format='csr', dtype=np.float32)
+
+
+def build_ann_index(matrix: np.ndarray):
+    """Approximate index over normalised rows per FAISS_INDEX_TYPE, or None for
+    exact search (flat, or fewer rows than FAISS_ANN_MIN_CHUNKS).
+    """
+    kind = settings.FAISS_INDEX_TYPE
+    n, dim = matrix.shape
+    if kind == 'flat' or n < max(1, settings.FAISS_ANN_MIN_CHUNKS) or dim == 0:
+        return None
+    if kind == 'ivf':
+        # ~39 training points per centroid is FAISS's own lower bound
+        nlist = settings.FAISS_IVF_NLIST or int(4 * np.sqrt(n))
+        nlist = max(1, min(nlist, n // 39 or 1))
+        index = faiss.index_factory(dim, f'IVF{nlist},Flat', faiss.METRIC_INNER_PRODUCT)
+        index.train(matrix)
+    elif kind == 'hnsw':
+        index = faiss.index_factory(dim, f'HNSW{settings.FAISS_HNSW_M},Flat', faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = settings.FAISS_HNSW_EF_CONSTRUCTION
+    elif kind in ('sq8', 'sq4', 'sqfp16'):
+        matrix = _pad_dim(matrix)
+        index = faiss.index_factory(matrix.shape[1], 'SQ' + kind[2:], faiss.METRIC_INNER_PRODUCT)
+        index.train(matrix)
+    elif kind in ('pq', 'ivfpq'):
+        # m sub-quantisers must divide dim (pick the largest that does, so use
+        # INDEX_SVD_DIM for a sensible dim); 2**nbits centroids need as many rows
+        m = max(d for d in range(1, max(1, min(settings.FAISS_PQ_M, dim)) + 1) if dim % d == 0)
+        nbits = max(1, min(8, int(np.log2(n))))
+        if kind == 'pq':
+            spec = f'PQ{m}x{nbits}'
+        else:
+            nlist = settings.FAISS_IVF_NLIST or int(4 * np.sqrt(n))
+            spec = f'IVF{max(1, min(nlist, n // 39 or 1))},PQ{m}x{nbits}'
+        index = faiss.index_factory(dim, spec, faiss.METRIC_INNER_PRODUCT)
+        index.train(matrix)
+    else:
+        raise ValueError(f'unknown FAISS_INDEX_TYPE {kind!r}')
+    index.add(matrix)
+    _apply_default_search_params(index)
+    return index
+
+
+def _pad_dim(matrix: np.ndarray) -> np.ndarray:
+    """`matrix` with zero columns appended up to a multiple of SQ_DIM_MULTIPLE
+    (inner products are unchanged; queries are padded to the index's d)."""
+    pad = -matrix.shape[1] % SQ_DIM_MULTIPLE
+    return np.pad(matrix, ((0, 0), (0, pad))) if pad else matrix
+
+
+def _apply_default_search_params(index):
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = settings.FAISS_NPROBE
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = settings.FAISS_EF_SEARCH
+
+
+def _search_params(index, nprobe: int | None, ef_search: int | None, sel=None):
+    """Per-request FAISS search parameters, or None to use the index defaults.
+    `sel` is an optional faiss.IDSelector restricting which ids may be returned.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and (nprobe or sel is not None):
+        return faiss.SearchParametersIVF(nprobe=int(nprobe or ivf.nprobe), sel=sel)
+    if isinstance(index, faiss.IndexHNSW) and (ef_search or sel is not None):
+        return faiss.SearchParametersHNSW(efSearch=int(ef_search or index.hnsw.efSearch), sel=sel)
+    if sel is not None:
+        return faiss.SearchParameters(sel=sel)
+    return None
+
+
+def _read_index(path: str):
+    try:
+        index = faiss.read_index(path, faiss.IO_FLAG_MMAP)
+    except RuntimeError:
+        index = faiss.read_index(path)
+    _apply_default_search_params(index)
+    return index
+
+
+def _fsync_path(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _save_segment(seg: Segment):
+    """Write the segment to a scratch dir, flush it and rename it into place."""
+    final_dir = _segment_dir(seg.seg_id)
+    seg_dir = final_dir + TMP_SUFFIX
+    shutil.rmtree(seg_dir, ignore_errors=True)
+    os.makedirs(seg_dir)
+    _write_segment_files(seg, seg_dir)
+    for name in os.listdir(seg_dir):
+        _fsync_path(os.path.join(seg_dir, name))
+    os.rename(seg_dir, final_dir)
+    _fsync_path(SEGMENTS_DIR)
+
+
+def _write_segment_files(seg: Segment, seg_dir: str):
+    if seg.vectorizer is not None:
+        dump(seg.vectorizer, os.path.join(seg_dir, 'vectorizer.joblib'))
+    if seg.projection is not None:
+        dump(seg.projection, os.path.join(seg_dir, 'svd.joblib'))
+    if sparse.issparse(seg.matrix):
+        mat = seg.matrix.tocsr()
+        np.save(os.path.join(seg_dir, 'csr_data.npy'), mat.data)
+        np.save(os.path.join(seg_dir, 'csr_indices.npy'), mat.indices)
+        np.save(os.path.join(seg_dir, 'csr_indptr.npy'), mat.indptr)
+        np.save(os.path.join(seg_dir, 'csr_shape.npy'), np.array(mat.shape, dtype=np.int64))
+    elif seg.matrix is not None:
+        np.save(os.path.join(seg_dir, 'matrix.npy'), seg.matrix)
+    if seg.index is not None:
+        faiss.write_index(seg.index, os.path.join(seg_dir, 'faiss.index'))
+    _write_blob(seg_dir, 'texts', seg.chunk_texts)
+    if seg.sentence_index is not None:
+        _write_blob(seg_dir, 'sentence_runs', seg.sentence_index)
+    metas = [seg.chunk_meta[i] if i < len(seg.chunk_meta) else {} for i in range(len(seg.chunk_texts))]
+    for name in META_FIELDS:
+        col = [m.get(name) for m in metas]
+        np.save(os.path.join(seg_dir, f'meta_{name}.npy'), np.array([-1 if v is None else v for v in col], dtype=np.int64))
+
+
+def _write_blob(seg_dir: str, name: str, strings: Iterable[str]):
+    """Write strings as <name>.bin (one UTF-8 blob) plus <name>_offsets.npy (n+1 offsets)."""
+    encoded = [t.encode('utf-8') for t in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    with open(os.path.join(seg_dir, f'{name}.bin'), 'wb') as tf:
+        tf.write(b''.join(encoded))
+    np.save(os.path.join(seg_dir, f'{name}_offsets.npy'), offsets)
+
+
+def _mmap(path: str) -> np.ndarray:
+    return np.load(path, mmap_mode='r')
+
+
+def _mmap_blob(seg_dir: str, name: str) -> Optional[MappedTexts]:
+    blob_path = os.path.join(seg_dir, f'{name}.bin')
+    offsets_path = os.path.join(seg_dir, f'{name}_offsets.npy')
+    if not os.path.exists(offsets_path):
+        return None
+    # np.memmap refuses empty files; an all-empty blob has nothing to map
+    blob = np.memmap(blob_path, dtype=np.uint8, mode='r') if os.path.getsize(blob_path) else np.zeros(0, dtype=np.uint8)
+    return MappedTexts(blob, _mmap(offsets_path))
+
+
+def _load_segment(seg_id: str) -> Optional[Segment]:
+    seg_dir = _segment_dir(seg_id)
+    offsets_path = os.path.join(seg_dir, 'texts_offsets.npy')
+    if not os.path.exists(offsets_path):
+        return _load_joblib_segment(seg_id)
+    vec_path = os.path.join(seg_dir, 'vectorizer.joblib')
+    mat_path = os.path.join(seg_dir, 'matrix.npy')
+    idx_path = os.path.join(seg_dir, 'faiss.index')
+    svd_path = os.path.join(seg_dir, 'svd.joblib')
+    shape_path = os.path.join(seg_dir, 'csr_shape.npy')
+    matrix = None
+    if os.path.exists(shape_path):
+        matrix = sparse.csr_matrix(
+            (_mmap(os.path.join(seg_dir, 'csr_data.npy')),
+             _mmap(os.path.join(seg_dir, 'csr_indices.npy')),
+             _mmap(os.path.join(seg_dir, 'csr_indptr.npy'))),
+            shape=tuple(int(x) for x in np.load(shape_path)), copy=False)
+    elif os.path.exists(mat_path):
+        matrix = _mmap(mat_path)
+    meta = MappedMeta({name: _mmap(os.path.join(seg_dir, f'meta_{name}.npy')) for name in META_FIELDS})
+    return Segment(
+        seg_id,
+        load(vec_path) if os.path.exists(vec_path) else None,
+        matrix,
+        _read_index(idx_path) if os.path.exists(idx_path) else None,
+        _mmap_blob(seg_dir, 'texts'),
+        meta,
+        load(svd_path) if os.path.exists(svd_path) else None,
+        _mmap_blob(seg_dir, 'sentence_runs'),
+    )
+
+
+def _load_joblib_segment(seg_id: str) -> Optional[Segment]:
+    # Segment dirs written before the mmap layout
+    seg_dir = _segment_dir(seg_id)
+    texts_path = os.path.join(seg_dir, 'chunk_texts.joblib')
+    if not os.path.exists(texts_path):
+        return None
+    vec_path = os.path.join(seg_dir, 'vectorizer.joblib')
+    mat_path = os.path.join(seg_dir, 'matrix.npy')
+    sparse_path = os.path.join(seg_dir, 'matrix.npz')
+    idx_path = os.path.join(seg_dir, 'faiss.index')
+    meta_path = os.path.join(seg_dir, 'chunk_meta.joblib')
+    if os.path.exists(sparse_path):
+        matrix = sparse.load_npz(sparse_path).tocsr()
+    else:
+        matrix = np.load(mat_path) if os.path.exists(mat_path) else None
+    return Segment(
+        seg_id,
+        load(vec_path) if os.path.exists(vec_path) else None,
+        matrix,
+        faiss.read_index(idx_path) if os.path.exists(idx_path) else None,
+        load(texts_path),
+        load(meta_path) if os.path.exists(meta_path) else [],
+    )
+
+
+def _load_legacy_segment() -> Optional[Segment]:
+    paths = [VECTORIZER_PATH, MATRIX_PATH, FAISS_INDEX_PATH, CHUNK_MAP_PATH]
+    if not all(os.path.exists(p) for p in paths):
+        return None
+    return Segment(
+        LEGACY_SEGMENT_ID,
+        load(VECTORIZER_PATH),
+        np.load(MATRIX_PATH),
+        faiss.read_index(FAISS_INDEX_PATH),
+        load(CHUNK_MAP_PATH),
+        load(CHUNK_META_PATH) if os.path.exists(CHUNK_META_PATH) else [],
+    )
+
+
+def _stat_signature(path: str) -> tuple | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _read_manifest(path: str = MANIFEST_PATH) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as mf:
+        manifest = json.load(mf)
+    return {'generation': int(manifest.get('generation', 0)), 'segments': list(manifest.get('segments', [])),
+            'bytes': manifest.get('bytes')}
+
+
+def _write_json_atomic(path: str, payload: Dict):
+    tmp_path = path + TMP_SUFFIX
+    with open(tmp_path, 'w', encoding='utf-8') as mf:
+        json.dump(payload, mf)
+        mf.flush()
+        os.fsync(mf.fileno())
+    os.replace(tmp_path, path)
+
+
+def _commit(segments: List[Segment]):
+    """Persist any new segments, record the next generation's manifest, publish
+    it by renaming the segments.json pointer and swap in the new snapshot.
+    """
+    global _snapshot, _manifest_signature
+    for seg in segments:
+        if not os.path.isdir(_segment_dir(seg.seg_id)):
+            _save_segment(seg)
+    on_disk = _read_manifest()
+    generation = max(_snapshot.generation, on_disk['generation'] if on_disk else 0) + 1
+    size_bytes = sum(_segment_bytes(s.seg_id) for s in segments)
+    manifest = {'generation': generation, 'segments': [s.seg_id for s in segments], 'bytes': size_bytes}
+    _write_json_atomic(os.path.join(MANIFESTS_DIR, f'{generation:012d}.json'), manifest)
+    _write_json_atomic(MANIFEST_PATH, manifest)
+    _fsync_path(INDEX_DIR)
+    _snapshot = IndexSnapshot(generation, segments, size_bytes)
+    _manifest_signature = _stat_signature(MANIFEST_PATH)
+    INDEX_SIZE_GAUGE.set(size_bytes)
+    _collect_garbage()
+
+
+def _collect_garbage():
+    """Drop manifests older than the newest INDEX_KEEP_GENERATIONS and the segment
+    dirs none of the kept manifests reference. Readers that already opened a
+    collected segment keep their mapping; the files go once they let go of it.
+    """
+    keep = max(1, settings.INDEX_KEEP_GENERATIONS)
+    names = sorted(n for n in os.listdir(MANIFESTS_DIR) if n.endswith('.json'))
+    live = {s.seg_id for s in _snapshot.segments}
+    for path in [MANIFEST_PATH] + [os.path.join(MANIFESTS_DIR, n) for n in names[-keep:]]:
+        try:
+            manifest = _read_manifest(path)
+        except (OSError, ValueError):
+            continue
+        if manifest is not None:
+            live.update(manifest['segments'])
+    for name in names[:-keep]:
+        try:
+            os.remove(os.path.join(MANIFESTS_DIR, name))
+        except OSError:
+            pass
+    # Young dirs may be another worker's segment that is saved but not yet committed
+    cutoff = time.time() - settings.INDEX_GC_GRACE_SECONDS
+    for name in os.listdir(SEGMENTS_DIR):
+        path = os.path.join(SEGMENTS_DIR, name)
+        if name in live:
+            continue
+        try:
+            if os.path.getmtime(path) > cutoff:
+                continue
+        except OSError:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
 
 
 
 
 def save_state():
-    if _vectorizer is not None:
-        dump(_vectorizer, VECTORIZER_PATH)
-    if _matrix is not None:
-        np.save(MATRIX_PATH, _matrix)
-    if _index is not None:
-        faiss.write_index(_index, FAISS_INDEX_PATH)
-    dump(_chunk_texts, CHUNK_MAP_PATH)
-    dump(_chunk_meta, CHUNK_META_PATH)
+    with _lock, _commit_lock:
+        _commit(list(load_state().segments))
 
 
 
 
-def load_state():
-    global _vectorizer, _matrix, _index, _chunk_texts, _chunk_meta
-    if os.path.exists(VECTORIZER_PATH):
-        _vectorizer = load(VECTORIZER_PATH)
-    if os.path.exists(MATRIX_PATH):
-        _matrix = np.load(MATRIX_PATH)
-    if os.path.exists(FAISS_INDEX_PATH):
-        _index = faiss.read_index(FAISS_INDEX_PATH)
-    if os.path.exists(CHUNK_MAP_PATH):
-        _chunk_texts = load(CHUNK_MAP_PATH)
-    if os.path.exists(CHUNK_META_PATH):
-        _chunk_meta = load(CHUNK_META_PATH)
+def load_state(force: bool = False) -> IndexSnapshot:
+    """Return the current index snapshot, reloading only when a new generation was committed.
+    The check is one stat() of the manifest; unchanged segments are reused from memory.
+    Callers keep the snapshot they got, so a concurrent reload never changes it under them.
+    """
+    global _snapshot, _manifest_signature
+    signature = _stat_signature(MANIFEST_PATH)
+    if not force and signature is not None and signature == _manifest_signature:
+        return _snapshot
+    with _lock:
+        if not force and signature is not None and signature == _manifest_signature:
+            return _snapshot
+        manifest = _read_manifest()
+        if manifest is None:
+            legacy_loaded = _snapshot.segments and _snapshot.segments[0].seg_id == LEGACY_SEGMENT_ID
+            if force or not legacy_loaded:
+                legacy = _load_legacy_segment()
+                _snapshot = IndexSnapshot(0, [legacy] if legacy is not None else [])
+        elif force or manifest['generation'] != _snapshot.generation:
+            loaded = {} if force else {s.seg_id: s for s in _snapshot.segments}
+            segments = []
+            for seg_id in manifest['segments']:
+                try:
+                    seg = loaded.get(seg_id) or _load_segment(seg_id)
+                except OSError:
+                    seg = None
+                if seg is None:
+                    # Never serve a partial generation: keep the current snapshot
+                    # and retry on the next call
+                    logger.warning('Index generation %s references missing segment %s', manifest['generation'], seg_id)
+                    return _snapshot
+                segments.append(seg)
+            _snapshot = IndexSnapshot(manifest['generation'], segments, manifest['bytes'])
+        _manifest_signature = signature
+        return _snapshot
+
+
+def generation() -> int:
+    """Generation of the committed index; bumps on every ingest, merge and rebuild."""
+    return load_state().generation
+
+
+def chunk_count() -> int:
+    return sum(len(s) for s in load_state().segments)
+
+
+def _footprint_component(name: str) -> str:
+    if name.startswith(('matrix.', 'csr_')):
+        return 'vectors'
+    if name == 'faiss.index':
+        return 'ann_index'
+    if name.startswith(('texts', 'chunk_texts')):
+        return 'texts'
+    if name.startswith('sentence'):
+        return 'sentences'
+    if name.startswith(('meta_', 'chunk_meta')):
+        return 'meta'
+    return 'vectorizer'
+
+
+def _segment_bytes(seg_id: str) -> int:
+    if seg_id not in _segment_sizes:
+        seg_dir = _segment_dir(seg_id)
+        names = os.listdir(seg_dir) if os.path.isdir(seg_dir) else []
+        _segment_sizes[seg_id] = sum(os.path.getsize(os.path.join(seg_dir, n)) for n in names)
+    return _segment_sizes[seg_id]
+
+
+def index_size_bytes() -> int:
+    """On-disk bytes of the committed generation's segments: recorded in its
+    manifest at commit time, summed from the segment files for older manifests."""
+    snapshot = load_state()
+    if snapshot.size_bytes is None:
+        snapshot.size_bytes = sum(_segment_bytes(s.seg_id) for s in snapshot.segments)
+    INDEX_SIZE_GAUGE.set(snapshot.size_bytes)
+    return snapshot.size_bytes
+
+
+def memory_footprint() -> Dict[str, int]:
+    """Bytes per component of the current snapshot's segment files, i.e. what the
+    mapped arrays take once fully paged in. Vectorizers and SVD projections are
+    unpickled onto the heap and take more than their file size there.
+    """
+    totals = {'vectors': 0, 'ann_index': 0, 'texts': 0, 'sentences': 0, 'meta': 0, 'vectorizer': 0}
+    for seg in load_state().segments:
+        seg_dir = _segment_dir(seg.seg_id)
+        if not os.path.isdir(seg_dir):
+            continue
+        for name in os.listdir(seg_dir):
+            totals[_footprint_component(name)] += os.path.getsize(os.path.join(seg_dir, name))
+    return totals
 
 
 
 
 def rebuild_index(chunks: List[Dict]):
-    global _vectorizer, _matrix, _index, _chunk_texts, _chunk_meta
-    # Accept list of dicts {'text':..., 'doc_id':..., 'start':..., 'end':..., 'page':...}
-    _chunk_meta = [c if isinstance(c, dict) else {'text': str(c)} for c in chunks]
-    _chunk_texts = [m.get('text', '') for m in _chunk_meta]
-    if not _chunk_texts:
-        _vectorizer = None
-        _matrix = None
-        _index = None
-        save_state()
-        return
-    _vectorizer = TfidfVectorizer(stop_words='english')
-    mat = _vectorizer.fit_transform(_chunk_texts)
-    # Convert to dense; normalize for inner product
-    dense = mat.toarray().astype('float32')
-    norms = np.linalg.norm(dense, axis=1, keepdims=True)
-    norms[norms == 0] = 1.0
-    dense = dense / norms
-    _matrix = dense
-    _index = faiss.IndexFlatIP(dense.shape[1])
-    _index.add(dense)
-    save_state()
+    """Replace the whole index with a single segment fitted on `chunks`."""
+    seg = _build_segment(chunks) if chunks else None
+    if seg is not None:
+        # Serve the saved, memory-mapped copy rather than the freshly built arrays
+        _save_segment(seg)
+        seg = _load_segment(seg.seg_id)
+    with _lock, _commit_lock:
+        load_state()
+        _commit([seg] if seg is not None else [])
 
 
 def add_chunks(chunks_iter: Iterable[Dict]):
-    """Incrementally add chunks to index without loading all into RAM at once.
-    If index/vectorizer not initialized, will initialize using first batch.
+    """Append chunks as a new delta segment, searchable as soon as this returns.
+    Only the new chunks are vectorized, so the cost follows the upload size rather
+    than the corpus size; segments are folded together later by a background merge.
     """
-    global _vectorizer, _matrix, _index, _chunk_texts, _chunk_meta
-    load_state()
     new_chunks = list(chunks_iter)
     if not new_chunks:
         return
-    if _vectorizer is None or _index is None or _matrix is None or not _chunk_texts:
-        rebuild_index(new_chunks)
-        return
-    combined_meta = _chunk_meta + [c if isinstance(c, dict) else {'text': str(c)} for c in new_chunks]
-    combined_texts = [m.get('text', '') for m in combined_meta]
-    vec = TfidfVectorizer(stop_words='english')
-    mat = vec.fit_transform(combined_texts)
-    dense = mat.toarray().astype('float32')
-    norms = np.linalg.norm(dense, axis=1, keepdims=True)
-    norms[norms == 0] = 1.0
-    dense = dense / norms
-    _vectorizer = vec
-    _matrix = dense
-    _index = faiss.IndexFlatIP(dense.shape[1])
-    _index.add(dense)
-    _chunk_texts = combined_texts
-    _chunk_meta = combined_meta
-    save_state()
+    seg = _build_segment(new_chunks)
+    _save_segment(seg)
+    seg = _load_segment(seg.seg_id)
+    with _lock, _commit_lock:
+        _commit(list(load_state().segments) + [seg])
+    _schedule_merge()
 
 
 
 
-def query(question: str, top_k: int = 5) -> List[Dict]:
-    load_state()
-    if _vectorizer is None or _index is None or _matrix is None or not _chunk_texts:
+def _pick_merge_window(segments: List[Segment]) -> List[str]:
+    if len(segments) <= settings.INDEX_MAX_SEGMENTS:
         return []
-    q_vec = _vectorizer.transform([question]).toarray().astype('float32')
-    q_norm = np.linalg.norm(q_vec, axis=1, keepdims=True)
-    q_norm[q_norm == 0] = 1.0
-    q_vec = q_vec / q_norm
-    D, I = _index.search(q_vec, top_k)
-    scores = D[0].tolist()
-    idxs = I[0].tolist()
-    results = []
-    for rank, (i, s) in enumerate(zip(idxs, scores)):
-        if i < 0 or i >= len(_chunk_texts):
-            continue
-        meta = _chunk_meta[i] if i < len(_chunk_meta) else {}
-        out = {'chunk_index': i, 'text': _chunk_texts[i], 'score': float(s)}
-        out.update({
-            'doc_id': meta.get('doc_id'),
-            'page': meta.get('page'),
-            'start': meta.get('start'),
-            'end': meta.get('end'),
-        })
-        results.append(out)
-    return results
+    factor = min(max(2, settings.INDEX_MERGE_FACTOR), len(segments))
+    # Adjacent segments only, so global chunk order is preserved
+    sizes = [len(s) for s in segments]
+    start = min(range(len(segments) - factor + 1), key=lambda p: sum(sizes[p:p + factor]))
+    return [s.seg_id for s in segments[start:start + factor]]
+
+
+def merge_segments() -> bool:
+    """Fold one window of adjacent segments into a single segment.
+    Returns False when the merge policy has nothing to do or the window changed meanwhile.
+    """
+    segments = list(load_state().segments)
+    window = _pick_merge_window(segments)
+    if not window:
+        return False
+    by_id = {s.seg_id: s for s in segments}
+    merged = _build_segment([c for seg_id in window for c in by_id[seg_id].chunks()])
+    _save_segment(merged)
+    merged = _load_segment(merged.seg_id)
+    with _lock, _commit_lock:
+        current = list(load_state().segments)
+        ids = [s.seg_id for s in current]
+        pos = ids.index(window[0]) if window[0] in ids else -1
+        if pos < 0 or ids[pos:pos + len(window)] != window:
+            # A rebuild or another merge replaced these segments first
+            shutil.rmtree(_segment_dir(merged.seg_id), ignore_errors=True)
+            return False
+        _commit(current[:pos] + [merged] + current[pos + len(window):])
+    return True
+
+
+def _merge_until_within_policy():
+    while merge_segments():
+        pass
 
 
+def _schedule_merge():
+    global _merge_thread
+    with _lock:
+        if len(_snapshot.segments) <= settings.INDEX_MAX_SEGMENTS:
+            return
+        if _merge_thread is not None and _merge_thread.is_alive():
+            return
+        _merge_thread = threading.Thread(target=_merge_until_within_policy, name='index-merge', daemon=True)
+        _merge_thread.start()
 
 
+def wait_for_merges(timeout: float | None = None):
+    thread = _merge_thread
+    if thread is not None:
+        thread.join(timeout)
 
 
 
+
+def query(question: str, top_k: int = 5, nprobe: int | None = None, ef_search: int | None = None,
+          doc_ids: Optional[Iterable[int]] = None) -> List[Dict]:
+    """Search every segment and merge the per-segment top-k by score.
+    With `doc_ids`, only those documents' rows are searched.
+    """
+    return query_batch([question], top_k, nprobe, ef_search, doc_ids)[0]
+
+
+def query_batch(questions: List[str], top_k: int = 5, nprobe: int | None = None,
+                ef_search: int | None = None, doc_ids: Optional[Iterable[int]] = None) -> List[List[Dict]]:
+    """query() for many questions against one snapshot: each segment runs a
+    single transform and a single multi-row search for the whole batch.
+    Segments holding none of `doc_ids` are skipped without vectorizing.
+    """
+    snapshot = load_state()
+    doc_ids = None if doc_ids is None else set(doc_ids)
+    candidates = [[] for _ in questions]
+    base = 0
+    for seg in snapshot.segments:
+        rows = None if doc_ids is None else seg.doc_rows(doc_ids)
+        if rows is not None and not len(rows):
+            base += len(seg)
+            continue
+        weights = snapshot.hashed_weights(seg) if seg.is_hashed() else None
+        for q, hits in enumerate(seg.search_batch(questions, top_k, nprobe, ef_search, rows, weights)):
+            for i, s in hits:
+                candidates[q].append((s, base + i, seg, i))
+        base += len(seg)
+    return [[_result(*c) for c in heapq.nlargest(top_k, cands, key=lambda c: c[0])] for cands in candidates]
+
+
+def _result(score: float, global_i: int, seg: Segment, i: int) -> Dict:
+    meta = seg.chunk_meta[i] if i < len(seg.chunk_meta) else {}
+    out = {'chunk_index': global_i, 'text': seg.chunk_texts[i], 'score': score}
+    out.update({
+        'doc_id': meta.get('doc_id'),
+        'page': meta.get('page'),
+        'start': meta.get('start'),
+        'end': meta.get('end'),
+        'sentences': seg.sentences(i),
+    })
+    return out
@@ -0,0 +1,232 @@
+import os
+import json
+import fcntl
+import threading
+import time
+import uuid
+import logging
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from prometheus_client import Gauge, Histogram
+from .config import settings
+
+
+JOBS_DIR = os.path.join(settings.DATA_DIR, 'jobs')
+# Each process holds an exclusive flock on jobs/owners/<owner>.lock for its whole
+# life and stamps its jobs with that owner, so recover_interrupted_jobs() can
+# tell a job another live worker is running from one whose process is gone.
+OWNERS_DIR = os.path.join(JOBS_DIR, 'owners')
+
+
+INGEST_QUEUE_DEPTH = Gauge('ingest_jobs_queued', 'Background ingest jobs waiting for a worker')
+INGEST_JOB_DURATION = Histogram('ingest_job_duration_seconds', 'Background ingest job run time', ['status'])
+INGEST_JOB_WAIT = Histogram('ingest_job_wait_seconds', 'Time a background ingest job spent queued')
+
+
+logger = logging.getLogger(__name__)
+
+
+_jobs: Dict[str, Dict] = {}
+_jobs_lock = threading.Lock()
+_executor: ThreadPoolExecutor | None = None
+_owner = uuid.uuid4().hex
+_owner_fd: Optional[int] = None
+
+
+os.makedirs(JOBS_DIR, exist_ok=True)
+
+
+
+
+def _now() -> str:
+    return datetime.datetime.utcnow().isoformat() + 'Z'
+
+
+def _job_dir(job_id: str) -> str:
+    return os.path.join(JOBS_DIR, job_id)
+
+
+def _public(job: Dict) -> Dict:
+    return {k: v for k, v in job.items() if k not in ('files', 'owner')}
+
+
+def _owner_lock_path(owner: str) -> str:
+    return os.path.join(OWNERS_DIR, f'{os.path.basename(owner)}.lock')
+
+
+def _claim_owner() -> str:
+    """This process's owner id, its lock taken on first use and held until exit."""
+    global _owner_fd
+    with _jobs_lock:
+        if _owner_fd is None:
+            os.makedirs(OWNERS_DIR, exist_ok=True)
+            fd = os.open(_owner_lock_path(_owner), os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            _owner_fd = fd
+        return _owner
+
+
+def _owner_alive(owner: Optional[str]) -> bool:
+    if not owner:
+        return False
+    try:
+        fd = os.open(_owner_lock_path(owner), os.O_RDWR)
+    except OSError:
+        return False
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+    # Nobody holds it any more: the owning process exited
+    try:
+        os.remove(_owner_lock_path(owner))
+    except OSError:
+        pass
+    return False
+
+
+def _save(job: Dict):
+    # Write-through so any worker process can answer GET /jobs/{id}
+    with _jobs_lock:
+        snapshot = dict(job)
+    path = os.path.join(_job_dir(snapshot['job_id']), 'job.json')
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as jf:
+        json.dump(snapshot, jf)
+    os.replace(tmp_path, path)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _jobs_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, settings.INGEST_JOB_WORKERS), thread_name_prefix='ingest-job')
+        return _executor
+
+
+
+
+def submit_ingest_job(uploads: List[tuple], handler: Callable[[List[tuple]], List[int]]) -> str:
+    """Spool the raw PDFs to disk and queue `handler(uploads)` on the job worker pool.
+    `handler` receives the same [(filename, content_type, content_bytes)] list and
+    returns the resulting document_ids.
+    """
+    job_id = uuid.uuid4().hex
+    job_dir = _job_dir(job_id)
+    os.makedirs(job_dir, exist_ok=True)
+    files = []
+    for n, (filename, content_type, content_bytes) in enumerate(uploads):
+        path = os.path.join(job_dir, f'{n}.pdf')
+        with open(path, 'wb') as pf:
+            pf.write(content_bytes)
+        files.append({'filename': filename, 'content_type': content_type, 'path': path})
+    job = {
+        'job_id': job_id,
+        'state': 'queued',
+        'document_ids': [],
+        'error': None,
+        'created_at': _now(),
+        'started_at': None,
+        'finished_at': None,
+        'files': files,
+        'owner': _claim_owner(),
+    }
+    with _jobs_lock:
+        _jobs[job_id] = job
+    _save(job)
+    INGEST_QUEUE_DEPTH.inc()
+    _get_executor().submit(_run, job_id, handler, time.monotonic())
+    return job_id
+
+
+def _run(job_id: str, handler: Callable[[List[tuple]], List[int]], queued_at: float):
+    INGEST_QUEUE_DEPTH.dec()
+    started = time.monotonic()
+    INGEST_JOB_WAIT.observe(started - queued_at)
+    with _jobs_lock:
+        job = _jobs[job_id]
+        job['state'] = 'running'
+        job['started_at'] = _now()
+    _save(job)
+    try:
+        uploads = []
+        for f in job['files']:
+            with open(f['path'], 'rb') as pf:
+                uploads.append((f['filename'], f['content_type'], pf.read()))
+        document_ids = handler(uploads)
+        with _jobs_lock:
+            job['state'] = 'done'
+            job['document_ids'] = document_ids
+    except Exception as e:
+        logger.exception('Ingest job %s failed', job_id)
+        with _jobs_lock:
+            job['state'] = 'failed'
+            job['error'] = str(e)
+    with _jobs_lock:
+        job['finished_at'] = _now()
+    INGEST_JOB_DURATION.labels(status=job['state']).observe(time.monotonic() - started)
+    if job['state'] == 'done':
+        # The documents now live under DOCS_DIR; drop the spooled copies
+        for f in job['files']:
+            try:
+                os.remove(f['path'])
+            except OSError:
+                pass
+    _save(job)
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            return _public(dict(job))
+    path = os.path.join(_job_dir(os.path.basename(job_id)), 'job.json')
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as jf:
+            return _public(json.load(jf))
+    except Exception:
+        return None
+
+
+def recover_interrupted_jobs() -> int:
+    """Mark spooled jobs left 'queued' or 'running' by a process that is gone as
+    failed, so GET /jobs/{id} stops reporting them as pending. Their spooled PDFs
+    are kept, like any failed job's, and the upload has to be resubmitted: the
+    handler it was queued with did not survive the restart. Jobs of live workers
+    are left alone. Returns the number of jobs marked.
+    """
+    marked = 0
+    for job_id in sorted(os.listdir(JOBS_DIR)):
+        path = os.path.join(_job_dir(job_id), 'job.json')
+        if job_id == os.path.basename(OWNERS_DIR) or not os.path.exists(path):
+            continue
+        with _jobs_lock:
+            if job_id in _jobs:
+                continue
+        try:
+            with open(path, 'r', encoding='utf-8') as jf:
+                job = json.load(jf)
+        except Exception:
+            continue
+        if job.get('state') not in ('queued', 'running') or _owner_alive(job.get('owner')):
+            continue
+        job['state'] = 'failed'
+        job['error'] = 'interrupted: the service stopped before the job finished; resubmit the upload'
+        job['finished_at'] = _now()
+        _save(job)
+        logger.warning('Ingest job %s was interrupted by a restart; marked failed', job_id)
+        marked += 1
+    return marked
+
+
+def shutdown_job_workers():
+    global _executor
+    with _jobs_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
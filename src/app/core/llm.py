@@ -0,0 +1,114 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Any, Optional
+from prometheus_client import Counter
+from .config import settings
+
+
+INDEX_DIR = os.path.join(settings.DATA_DIR, 'index')
+CACHE_DIR = os.path.join(INDEX_DIR, 'llm_cache')
+# Shared Groq client for the LLM extract/audit paths. One SDK client per process
+# (rebuilt only when its settings change) keeps its HTTP connection pool warm; a
+# semaphore bounds in-flight requests to LLM_MAX_CONCURRENCY and every request is
+# bounded by LLM_TIMEOUT_SECONDS. Parsed responses are cached on disk under
+# llm_cache/<key>.json, keyed by (document sha256, prompt hash, model), so asking
+# again about the same document with the same prompt never leaves the process.
+# GROQ_BASE_URL points the client at another endpoint, e.g. a local stand-in.
+LLM_REQUESTS = Counter('llm_requests_total', 'LLM chat completions sent', ['outcome'])
+LLM_CACHE_HITS = Counter('llm_cache_hits_total', 'LLM responses served from the on-disk cache')
+
+
+_client = None
+_client_key: Optional[tuple] = None
+_semaphore: Optional[threading.BoundedSemaphore] = None
+_lock = threading.Lock()
+
+
+
+
+def _get_client():
+    """(client, semaphore) for the current settings, created on first use."""
+    global _client, _client_key, _semaphore
+    key = (settings.GROQ_API_KEY, settings.GROQ_BASE_URL, settings.LLM_TIMEOUT_SECONDS,
+           settings.LLM_MAX_RETRIES, settings.LLM_MAX_CONCURRENCY)
+    with _lock:
+        if _client is None or _client_key != key:
+            # Lazy import: the SDK is only needed when an API key is configured
+            import httpx
+            from groq import Groq
+            limit = max(1, settings.LLM_MAX_CONCURRENCY)
+            http_client = httpx.Client(
+                timeout=settings.LLM_TIMEOUT_SECONDS,
+                limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit),
+            )
+            if _client is not None:
+                _client.close()
+            _client = Groq(api_key=settings.GROQ_API_KEY, base_url=settings.GROQ_BASE_URL,
+                           timeout=settings.LLM_TIMEOUT_SECONDS, max_retries=settings.LLM_MAX_RETRIES,
+                           http_client=http_client)
+            _semaphore = threading.BoundedSemaphore(limit)
+            _client_key = key
+        return _client, _semaphore
+
+
+def cache_key(doc_sha256: str, system_prompt: str, user_prompt: str, model: str) -> str:
+    prompt_hash = hashlib.sha256(f'{system_prompt}\0{user_prompt}'.encode('utf-8')).hexdigest()
+    return hashlib.sha256(f'{doc_sha256}:{prompt_hash}:{model}'.encode('utf-8')).hexdigest()
+
+
+def _cache_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f'{key}.json')
+
+
+def _cache_get(key: str) -> Optional[Any]:
+    try:
+        with open(_cache_path(key), 'r', encoding='utf-8') as cf:
+            return json.load(cf)['response']
+    except Exception:
+        return None
+
+
+def _cache_put(key: str, response: Any):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _cache_path(key)
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as cf:
+        json.dump({'response': response}, cf, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def chat_json(system_prompt: str, user_prompt: str, doc_sha256: Optional[str] = None) -> Any:
+    """Parsed JSON content of a temperature-0 chat completion with GROQ_MODEL.
+    `doc_sha256` identifies the document the prompt is about (defaults to a hash of
+    the user prompt); only responses that parse as JSON are cached. Raises on
+    transport errors, timeouts and unparseable content so callers can fall back.
+    """
+    model = settings.GROQ_MODEL
+    doc_sha256 = doc_sha256 or hashlib.sha256(user_prompt.encode('utf-8')).hexdigest()
+    key = cache_key(doc_sha256, system_prompt, user_prompt, model)
+    if settings.LLM_CACHE_ENABLED:
+        cached = _cache_get(key)
+        if cached is not None:
+            LLM_CACHE_HITS.inc()
+            return cached
+    client, semaphore = _get_client()
+    with semaphore:
+        try:
+            resp = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+                temperature=0,
+            )
+        except Exception:
+            LLM_REQUESTS.labels(outcome='error').inc()
+            raise
+    LLM_REQUESTS.labels(outcome='ok').inc()
+    data = json.loads(resp.choices[0].message.content)
+    if settings.LLM_CACHE_ENABLED:
+        _cache_put(key, data)
+    return data
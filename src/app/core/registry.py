@@ -0,0 +1,152 @@
+import os
+import json
+import bisect
+import datetime
+import threading
+from typing import Dict, List, Optional
+from .config import settings
+from .file_lock import FileLock
+
+
+INDEX_DIR = os.path.join(settings.DATA_DIR, 'index')
+DOCS_META_PATH = os.path.join(INDEX_DIR, 'docs.json')
+
+
+# Process-wide document registry over docs.json: loaded once, O(1) lookups by id
+# and sha256. Writes from this process go through add(); writes from other worker
+# processes are picked up by a cheap stat() check on docs.json before each read;
+# add() re-reads and rewrites it under a file lock, so concurrent adds from
+# different processes never drop each other's documents.
+_docs: List[Dict] = []
+_by_id: Dict[int, Dict] = {}
+_by_sha256: Dict[str, Dict] = {}
+# (created_at as UTC datetime, id) sorted by time, for date-range filters
+_by_created: List[tuple] = []
+_next_id = 1
+_signature: tuple | None = None
+_lock = threading.RLock()
+_write_lock = FileLock(os.path.join(INDEX_DIR, 'docs.lock'))
+
+
+os.makedirs(INDEX_DIR, exist_ok=True)
+
+
+
+
+def _stat_signature() -> tuple | None:
+    try:
+        st = os.stat(DOCS_META_PATH)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _utc(ts: datetime.datetime) -> datetime.datetime:
+    # Naive timestamps are taken as UTC, matching how created_at is written
+    return ts.replace(tzinfo=datetime.timezone.utc) if ts.tzinfo is None else ts.astimezone(datetime.timezone.utc)
+
+
+def _parse_created_at(value) -> Optional[datetime.datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        return _utc(datetime.datetime.fromisoformat(value.replace('Z', '+00:00')))
+    except ValueError:
+        return None
+
+
+def _index(docs: List[Dict]):
+    global _docs, _by_id, _by_sha256, _by_created, _next_id
+    _docs = docs
+    _by_id = {d['id']: d for d in docs if d.get('id') is not None}
+    _by_sha256 = {d['sha256']: d for d in docs if d.get('sha256')}
+    created = ((_parse_created_at(d.get('created_at')), d['id']) for d in _by_id.values())
+    _by_created = sorted((ts, doc_id) for ts, doc_id in created if ts is not None)
+    _next_id = max(_by_id, default=0) + 1
+
+
+def _refresh():
+    global _signature
+    signature = _stat_signature()
+    if signature == _signature:
+        return
+    docs: List[Dict] = []
+    if signature is not None:
+        try:
+            with open(DOCS_META_PATH, 'r', encoding='utf-8') as df:
+                loaded = json.load(df)
+            docs = loaded if isinstance(loaded, list) else []
+        except Exception:
+            docs = []
+    _index(docs)
+    _signature = signature
+
+
+
+
+def get(doc_id: int) -> Optional[Dict]:
+    with _lock:
+        _refresh()
+        return _by_id.get(doc_id)
+
+
+def get_by_sha256(sha256: str) -> Optional[Dict]:
+    with _lock:
+        _refresh()
+        return _by_sha256.get(sha256)
+
+
+def all_documents() -> List[Dict]:
+    with _lock:
+        _refresh()
+        return list(_docs)
+
+
+def ids_created_between(after: Optional[datetime.datetime] = None,
+                        before: Optional[datetime.datetime] = None) -> List[int]:
+    """Ids of documents with after <= created_at < before (either bound optional)."""
+    with _lock:
+        _refresh()
+        lo = 0 if after is None else bisect.bisect_left(_by_created, (_utc(after),))
+        hi = len(_by_created) if before is None else bisect.bisect_left(_by_created, (_utc(before),))
+        return [doc_id for _, doc_id in _by_created[lo:hi]]
+
+
+def count() -> int:
+    with _lock:
+        _refresh()
+        return len(_docs)
+
+
+def next_id() -> int:
+    with _lock:
+        _refresh()
+        return _next_id
+
+
+def add(metas: List[Dict]):
+    """Register new documents and write docs.json through (temp file + rename)."""
+    global _signature
+    if not metas:
+        return
+    with _lock, _write_lock:
+        _refresh()
+        docs = _docs + list(metas)
+        tmp_path = DOCS_META_PATH + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as df:
+            json.dump(docs, df, indent=2)
+        os.replace(tmp_path, DOCS_META_PATH)
+        _index(docs)
+        _signature = _stat_signature()
+
+
+def load_text(doc_id: int) -> Optional[str]:
+    meta = get(doc_id)
+    path_txt = meta.get('path_txt') if meta else None
+    if not path_txt or not os.path.exists(path_txt):
+        return None
+    try:
+        with open(path_txt, 'r', encoding='utf-8') as tf:
+            return tf.read()
+    except Exception:
+        return None
@@ -1,26 +1,95 @@
 from collections import Counter
+from typing import Dict, List, Optional
 import re
 
 
 KEYWORD_PATTERN = re.compile(r'[A-Za-z]{4,}')
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+# Keywords are 4+ ASCII letters, so one can only occur inside a run of 4+ letters
+# of the lowercased sentence; those runs are all a sentence index has to keep.
+TOKEN_PATTERN = re.compile(r'[a-z]{4,}')
 
 
-def rule_engine_answer(question: str, corpus_chunks: list[str], max_sentences: int = 5):
+
+
+def build_sentence_index(chunk: str) -> str:
+    """Sentence boundaries and keyword postings for one chunk, built at ingest time.
+    Three lines: the chunk's distinct lowercase 4+ letter runs (space-separated),
+    each run's bitmask (hex) of the sentences it occurs in, and the flattened
+    [start, end) offsets of each stripped, non-empty sentence (split as
+    rule_engine_answer always has). Kept as text and read lazily: a keyword is
+    found with str.find on the runs line, and only the masks and spans it hits
+    are converted.
+    """
+    spans = []
+    postings: Dict[str, int] = {}
+    seps = list(SENTENCE_SPLIT.finditer(chunk))
+    starts = [0] + [m.end() for m in seps]
+    ends = [m.start() for m in seps] + [len(chunk)]
+    for start, end in zip(starts, ends):
+        piece = chunk[start:end]
+        stripped = piece.strip()
+        if not stripped:
+            continue
+        lead = len(piece) - len(piece.lstrip())
+        bit = 1 << (len(spans) // 2)
+        spans.extend((start + lead, start + lead + len(stripped)))
+        for token in set(TOKEN_PATTERN.findall(piece.lower())):
+            postings[token] = postings.get(token, 0) | bit
+    return '\n'.join((' '.join(postings), ' '.join(f'{bits:x}' for bits in postings.values()),
+                      ' '.join(map(str, spans))))
+
+
+def _keyword_mask(runs: str, masks: List[str], w: str) -> int:
+    # Runs hold no spaces, so each occurrence of w lies inside one run; its index
+    # is the number of separators before it. One hit per run is enough.
+    mask = 0
+    pos = runs.find(w)
+    while pos != -1:
+        mask |= int(masks[runs.count(' ', 0, pos)], 16)
+        pos = runs.find(' ', pos)
+        if pos == -1:
+            break
+        pos = runs.find(w, pos)
+    return mask
+
+
+def rule_engine_answer(question: str, corpus_chunks: list[str], max_sentences: int = 5,
+                       sentence_indexes: Optional[List[Optional[str]]] = None):
     """Simple heuristic rule engine: keyword overlap + frequency scoring.
     Returns top sentences containing most frequent question keywords.
+    `sentence_indexes` are the chunks' precomputed build_sentence_index() entries
+    (None where missing); without them each chunk is indexed on the fly.
     """
     keywords = KEYWORD_PATTERN.findall(question.lower())
     if not keywords:
         return 'No actionable keywords found.'
     freq = Counter(keywords)
     scored = []
-    for chunk in corpus_chunks:
-        sentences = re.split(r'(?<=[.!?])\s+', chunk)
-        for s in sentences:
-            s_lower = s.lower()
-            score = sum(freq[w] for w in keywords if w in s_lower)
-            if score > 0:
-                scored.append((score, s.strip()))
+    for n, chunk in enumerate(corpus_chunks):
+        index = sentence_indexes[n] if sentence_indexes is not None and n < len(sentence_indexes) else None
+        if index is None:
+            index = build_sentence_index(chunk)
+        runs, masks, spans = index.split('\n')
+        scores: Dict[int, int] = {}
+        mask_list = None
+        for w, count in freq.items():
+            if w not in runs:
+                continue
+            if mask_list is None:
+                mask_list = masks.split(' ')
+            # A sentence contains w when one of its letter runs does; every
+            # occurrence of w in the question adds freq[w]
+            mask = _keyword_mask(runs, mask_list, w)
+            while mask:
+                low = mask & -mask
+                i = low.bit_length() - 1
+                scores[i] = scores.get(i, 0) + count * count
+                mask ^= low
+        if scores:
+            bounds = spans.split(' ')
+            for i in sorted(scores):
+                scored.append((scores[i], chunk[int(bounds[2 * i]):int(bounds[2 * i + 1])]))
     scored.sort(key=lambda x: x[0], reverse=True)
     unique = []
     seen = set()
@@ -33,8 +102,3 @@ def rule_engine_answer(question: str, corpus_chunks: list[str], max_sentences: i
     if not unique:
         return 'No rule-based match.'
     return '\n'.join(unique)
-
-
-
-
-
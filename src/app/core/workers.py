@@ -0,0 +1,32 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from .config import settings
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Shared, bounded process pool for CPU-bound extraction work (created on first use).
+    Uses spawn so workers don't inherit FAISS/OpenMP threads from the server process.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=max(1, settings.WORKER_PROCESSES),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _pool
+
+
+def shutdown_process_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
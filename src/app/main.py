@@ -1,6 +1,10 @@
 from fastapi import FastAPI, Request
 from .api.routes import router
 from .core.logging import configure_logging
+from .core.workers import shutdown_process_pool
+from .core.jobs import recover_interrupted_jobs, shutdown_job_workers
+from .core.batcher import shutdown_batcher
+from .core import field_index
 import time
 import logging
 
@@ -28,6 +32,15 @@ async def log_requests(request: Request, call_next):
 @app.on_event('startup')
 async def startup_event():
     logging.getLogger(__name__).info('Service started')
+    recover_interrupted_jobs()
+    field_index.warm()
+
+
+@app.on_event('shutdown')
+async def shutdown_event():
+    shutdown_batcher()
+    shutdown_job_workers()
+    shutdown_process_pool()
 
 
 app.include_router(router)
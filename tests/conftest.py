@@ -0,0 +1,21 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+
+# Keep test runs away from the committed src/data corpus
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='pdfqa-test-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def isolated_registry(monkeypatch, tmp_path):
+    """The document registry, emptied and writing to tmp_path/docs.json."""
+    from src.app.core import registry
+    monkeypatch.setattr(registry, 'DOCS_META_PATH', str(tmp_path / 'docs.json'))
+    for name, value in [('_signature', None), ('_docs', []), ('_by_id', {}), ('_by_sha256', {}),
+                        ('_by_created', []), ('_next_id', 1)]:
+        monkeypatch.setattr(registry, name, value)
+    return registry
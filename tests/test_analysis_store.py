@@ -0,0 +1,26 @@
+from src.app.core import analysis_store
+from src.app.core.config import settings
+
+
+def test_analysis_is_stored_and_recomputed_when_rules_change(monkeypatch, tmp_path):
+    monkeypatch.setattr(analysis_store, 'ANALYSIS_DIR', str(tmp_path))
+    txt = tmp_path / '1.txt'
+    txt.write_text('Governing Law: Delaware\nThis auto-renews unless notice of 20 days is given\n', encoding='utf-8')
+    meta = {'id': 1, 'sha256': 'cafe', 'path_txt': str(txt)}
+
+    record = analysis_store.get(meta)
+    assert record['fields']['governing_law'].startswith('Delaware')
+    assert [f['clause'] for f in record['findings']] == ['auto_renewal_short_notice']
+    assert (tmp_path / 'cafe.json').exists()
+
+    # Stored records are served without touching the text again
+    txt.write_text('Governing Law: Ohio\n', encoding='utf-8')
+    assert analysis_store.get(meta) == record
+
+    # A threshold change invalidates the record; it is recomputed and rewritten
+    monkeypatch.setattr(settings, 'NOTICE_DAYS_THRESHOLD', 10)
+    assert analysis_store.load('cafe') is None
+    record = analysis_store.get(meta)
+    assert record['fields']['governing_law'].startswith('Ohio')
+    assert analysis_store.load('cafe') == record
+    assert analysis_store.get({'id': 2, 'sha256': 'none', 'path_txt': str(tmp_path / 'missing.txt')}) is None
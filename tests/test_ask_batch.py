@@ -0,0 +1,26 @@
+from fastapi.testclient import TestClient
+
+from src.app.main import app
+from src.app.core import index_faiss
+
+
+client = TestClient(app)
+
+
+def test_batch_answers_match_single_ask():
+    index_faiss.rebuild_index([
+        {'text': 'The governing law is the State of Delaware.', 'doc_id': 1, 'start': 0, 'end': 43, 'page': 1},
+        {'text': 'Payment is due within thirty days of invoice.', 'doc_id': 1, 'start': 43, 'end': 88, 'page': 2},
+    ])
+    index_faiss.add_chunks([{'text': 'Either party may terminate with ninety days notice.', 'doc_id': 2, 'start': 0, 'end': 51}])
+    questions = ['What is the governing law?', 'When is payment due?', 'How can a party terminate?', 'zzzz']
+    data = client.post('/ask/batch', json={'questions': questions}).json()
+    assert data['status'] == 'ok' and data['count'] == len(questions)
+    for q, result in zip(questions, data['results']):
+        assert result == client.post('/ask', json={'question': q}).json()
+    assert data['results'][1]['citations'][0]['page'] == 2
+
+
+def test_batch_rejects_empty_list():
+    data = client.post('/ask/batch', json={'questions': []}).json()
+    assert data['status'] == 'error'
@@ -0,0 +1,31 @@
+from fastapi.testclient import TestClient
+
+from src.app.main import app
+from src.app.core import index_faiss, registry
+
+
+client = TestClient(app)
+
+
+def test_ask_filters_by_document_and_created_at(isolated_registry):
+    registry.add([
+        {'id': 1, 'sha256': 'a', 'created_at': '2026-01-10T09:00:00Z'},
+        {'id': 2, 'sha256': 'b', 'created_at': '2026-03-02T12:00:00Z'},
+    ])
+    index_faiss.rebuild_index([
+        {'text': 'The governing law is the State of Delaware.', 'doc_id': 1, 'start': 0, 'end': 43},
+        {'text': 'The governing law is England and Wales.', 'doc_id': 2, 'start': 0, 'end': 39},
+    ])
+    question = 'What is the governing law?'
+
+    def cited(**filters):
+        body = client.post('/ask', json={'question': question, **filters}).json()
+        return {c['document_id'] for c in body['citations']}
+
+    assert cited() == {1, 2}
+    assert cited(document_ids=[2]) == {2}
+    assert cited(created_after='2026-02-01T00:00:00') == {2}
+    assert cited(created_before='2026-02-01T00:00:00Z') == {1}
+    assert cited(document_ids=[1], created_after='2026-02-01T00:00:00') == set()
+    batch = client.post('/ask/batch', json={'questions': [question], 'document_ids': [1]}).json()
+    assert {c['document_id'] for c in batch['results'][0]['citations']} == {1}
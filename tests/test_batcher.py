@@ -0,0 +1,29 @@
+import asyncio
+
+from prometheus_client import REGISTRY
+
+from src.app.core import batcher, index_faiss
+from src.app.core.config import settings
+
+
+def test_concurrent_queries_share_one_batched_search(monkeypatch):
+    monkeypatch.setattr(settings, 'QUERY_BATCH_WINDOW_MS', 20)
+    monkeypatch.setattr(settings, 'QUERY_BATCH_MAX', 64)
+    index_faiss.rebuild_index([
+        {'text': 'The governing law is the State of Delaware.', 'doc_id': 1, 'start': 0, 'end': 43},
+        {'text': 'Payment is due within thirty days of invoice.', 'doc_id': 2, 'start': 0, 'end': 45},
+    ])
+    questions = ['governing law', 'payment due', 'Delaware', 'invoice'] * 4
+    before = REGISTRY.get_sample_value('query_batch_size_count') or 0
+
+    async def run():
+        try:
+            return await asyncio.gather(*(batcher.query(q, top_k=1) for q in questions))
+        finally:
+            batcher.shutdown_batcher()
+
+    results = asyncio.run(run())
+    assert results == [index_faiss.query(q, top_k=1) for q in questions]
+    batches = REGISTRY.get_sample_value('query_batch_size_count') - before
+    assert 1 <= batches < len(questions)
+    assert REGISTRY.get_sample_value('query_batch_wait_seconds_count') >= len(questions)
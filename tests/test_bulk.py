@@ -0,0 +1,33 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from src.app.main import app
+from src.app.core import registry
+
+
+client = TestClient(app)
+
+
+def _lines(resp):
+    return [json.loads(line) for line in resp.text.splitlines() if line]
+
+
+def test_bulk_extract_and_audit_stream_ndjson(isolated_registry, tmp_path):
+    metas = []
+    for doc_id, law in [(1, 'Delaware'), (2, 'Ohio')]:
+        txt = tmp_path / f'{doc_id}.txt'
+        txt.write_text(f'Governing Law: {law}\nThe Supplier accepts unlimited liability.\n', encoding='utf-8')
+        metas.append({'id': doc_id, 'sha256': f'bulk-{doc_id}', 'path_txt': str(txt)})
+    registry.add(metas)
+
+    resp = client.post('/extract/bulk', json={'document_ids': [2, 1, 99]})
+    assert resp.headers['content-type'].startswith('application/x-ndjson')
+    by_id = {line['document_id']: line for line in _lines(resp)}
+    assert by_id[1]['status'] == 'ok' and by_id[1]['governing_law'].startswith('Delaware')
+    assert by_id[2]['governing_law'].startswith('Ohio')
+    assert by_id[99]['status'] == 'error'
+
+    lines = _lines(client.post('/audit/bulk', json={'document_ids': 'all'}))
+    assert sorted(line['document_id'] for line in lines) == [1, 2]
+    assert all(line['findings'][0]['clause'] == 'unlimited_liability' for line in lines)
@@ -0,0 +1,45 @@
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from src.app.main import app
+from src.app.core import index_faiss
+from src.app.core.cache import LRUCache, normalise_question
+
+
+client = TestClient(app)
+
+
+def _sample(name, cache):
+    return REGISTRY.get_sample_value(name, {'cache': cache}) or 0
+
+
+def test_lru_evicts_oldest_and_expires():
+    cache = LRUCache('test', max_size=2, ttl_seconds=60)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None and cache.get('a') == 1 and cache.get('c') == 3
+    expired = LRUCache('test', max_size=2, ttl_seconds=-1)
+    expired.put('a', 1)
+    assert expired.get('a') is None and len(expired) == 0
+    assert _sample('ask_cache_evictions_total', 'test') == 2
+
+
+def test_ask_cache_hits_until_index_generation_changes():
+    assert normalise_question('  What is the  Governing LAW? ') == 'what is the governing law'
+    index_faiss.rebuild_index([{'text': 'The governing law is the State of Delaware.', 'doc_id': 1, 'start': 0, 'end': 43}])
+    hits = _sample('ask_cache_hits_total', 'answer')
+    first = client.post('/ask', json={'question': 'What is the governing law?'}).json()
+    second = client.post('/ask', json={'question': 'what is the governing law'}).json()
+    assert _sample('ask_cache_hits_total', 'answer') == hits + 1
+    assert second['question'] == 'what is the governing law'
+    assert {k: v for k, v in second.items() if k != 'question'} == {k: v for k, v in first.items() if k != 'question'}
+    # A forced rule-engine answer is cached separately
+    client.post('/ask', json={'question': 'What is the governing law?', 'force_rule': True})
+    assert _sample('ask_cache_hits_total', 'answer') == hits + 1
+    # Ingest bumps the generation, so the next ask misses and sees the new chunk
+    index_faiss.add_chunks([{'text': 'Governing law: England and Wales.', 'doc_id': 2, 'start': 0, 'end': 33}])
+    third = client.post('/ask', json={'question': 'What is the governing law?'}).json()
+    assert _sample('ask_cache_hits_total', 'answer') == hits + 1
+    assert {c['document_id'] for c in third['citations']} == {1, 2}
@@ -0,0 +1,59 @@
+import json
+
+from src.app.core import chunk_store
+
+
+def _reset(tmp_path, monkeypatch):
+    monkeypatch.setattr(chunk_store, 'LOG_PATH', str(tmp_path / 'chunks.jsonl'))
+    monkeypatch.setattr(chunk_store, 'OFFSETS_PATH', str(tmp_path / 'chunks.idx'))
+    monkeypatch.setattr(chunk_store, 'LEGACY_JSON_PATH', str(tmp_path / 'chunks.json'))
+    monkeypatch.setattr(chunk_store, 'STATS_PATH', str(tmp_path / 'chunk_stats.json'))
+    monkeypatch.setattr(chunk_store, '_migrated', False)
+    monkeypatch.setattr(chunk_store, '_stats', None)
+
+
+def test_migrates_legacy_json_then_appends(tmp_path, monkeypatch):
+    _reset(tmp_path, monkeypatch)
+    legacy = [{'text': f'chunk {i}', 'doc_id': 1, 'start': i, 'end': i + 1} for i in range(3)]
+    (tmp_path / 'chunks.json').write_text(json.dumps(legacy, indent=2), encoding='utf-8')
+    assert chunk_store.count() == 3
+    assert chunk_store.append([{'text': 'naïve “quoted”\nline', 'doc_id': 2}]) == 4
+    assert chunk_store.get(3)['text'] == 'naïve “quoted”\nline'
+    assert [c['text'] for c in chunk_store.iter_chunks(start=1, limit=2)] == ['chunk 1', 'chunk 2']
+    assert chunk_store.read_all()[:3] == legacy
+
+
+def test_torn_tail_is_ignored_on_next_append(tmp_path, monkeypatch):
+    _reset(tmp_path, monkeypatch)
+    chunk_store.append([{'text': 'a'}])
+    with open(chunk_store.LOG_PATH, 'ab') as f:
+        f.write(b'{"text": "half-writ')
+    chunk_store.append([{'text': 'b'}])
+    assert [c['text'] for c in chunk_store.read_all()] == ['a', 'b']
+
+
+def test_stats_follow_append_and_replace(tmp_path, monkeypatch):
+    _reset(tmp_path, monkeypatch)
+    chunk_store.append([{'text': 'x' * 50, 'doc_id': 1}, {'text': 'y' * 150, 'doc_id': 1}])
+    chunk_store.append([{'text': 'z' * 800, 'doc_id': 2}])
+    stats = chunk_store.stats()
+    assert stats['chunks'] == 3 and stats['total_length'] == 1000
+    assert stats['per_document'] == {'1': 2, '2': 1}
+    assert stats['length_histogram']['<100'] == 1 and stats['length_histogram']['<200'] == 1
+    assert stats['length_histogram']['<1000'] == 1
+
+    # Persisted: a fresh process reads chunk_stats.json instead of the log
+    monkeypatch.setattr(chunk_store, '_stats', None)
+    monkeypatch.setattr(chunk_store, 'iter_chunks', lambda *a, **k: iter(()))
+    assert chunk_store.stats() == stats
+    monkeypatch.undo()
+
+    _reset(tmp_path, monkeypatch)
+    chunk_store.replace([{'text': 'w' * 300, 'doc_id': 3}])
+    stats = chunk_store.stats()
+    assert stats['chunks'] == 1 and stats['per_document'] == {'3': 1} and stats['avg_length'] == 300
+
+    # Stats that don't describe the log (e.g. a crash before they were written) are rebuilt
+    (tmp_path / 'chunk_stats.json').write_text('{}', encoding='utf-8')
+    monkeypatch.setattr(chunk_store, '_stats', None)
+    assert chunk_store.stats()['chunks'] == 1
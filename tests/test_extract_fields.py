@@ -0,0 +1,59 @@
+from src.app.core.extract import extract_fields
+
+
+CONTRACT = (
+    'This Agreement is made between Acme Corp ("Client") and Beta LLC (Vendor), effective now.\n'
+    'Effective Date: March 3, 2024\n'
+    'Term: 12 months\n'
+    'Governing Law: Delaware\n'
+    'Payment terms: net 30\n'
+    'Termination: either party with notice\n'
+    'Auto-renewal: Yes\n'
+    'Liability cap: $1,000,000 USD\n'
+    'By: Jane Doe, Title: CEO\n'
+    'Signer: Bob Roe, Designation: CFO\n'
+)
+
+
+def test_extract_fields_finds_every_field():
+    fields = extract_fields(CONTRACT)
+    assert fields['parties'] == ['Acme Corp', 'Beta LLC']
+    assert fields['effective_date'] == 'March 3, 2024'
+    assert fields['governing_law'].startswith('Delaware')
+    assert fields['payment_terms'].startswith('net 30')
+    assert fields['auto_renewal'] == 'yes'
+    assert fields['liability_cap'] == {'amount': '$1,000,000', 'currency': 'USD'}
+    assert [s['name'] for s in fields['signatories']] == ['Jane Doe', 'Bob Roe']
+
+
+def test_extract_fields_party_fallback_and_case_folding():
+    # "between" with no " and " after it falls back to the Parties: list
+    text = 'Notes between sections\nParties: Acme; Beta\nGOVERNING LAW: Ohio\nLIABİLITY CAP: 500 EUR\n'
+    fields = extract_fields(text)
+    assert fields['parties'] == ['Acme', 'Beta']
+    assert fields['governing_law'].startswith('Ohio')
+    assert fields['liability_cap'] == {'amount': '500', 'currency': 'EUR'}
+    assert extract_fields('')['parties'] == []
+
+
+def test_audit_findings_and_sentence_evidence():
+    from src.app.core.extract import audit_risky_clauses
+    text = ('Intro. The Supplier accepts unlimited liability for breaches. '
+            'The Supplier shall indemnify the Client against all\n  claims. '
+            'Renewal: this auto-renews unless notice of 10 days is given\n'
+            'Liability cap referenced below')
+    findings = audit_risky_clauses(text)
+    kinds = [f['clause'] for f in findings]
+    assert kinds == ['auto_renewal_short_notice', 'unlimited_liability', 'broad_indemnity', 'liability_cap_unclear']
+    assert findings[1]['evidence'] == 'The Supplier accepts unlimited liability for breaches.'
+    assert findings[2]['evidence'].endswith('against all\n  claims.')
+    assert text[findings[1]['start']:findings[1]['end']] == 'unlimited liability'
+
+
+def test_audit_window_prefixes_wrapped_onto_next_line():
+    from src.app.core.extract import audit_risky_clauses, auto_renewal_notice_days
+    renewal = 'This agreement will auto\nrenew unless notice of 10 days is given.'
+    harmless = 'Vendor shall hold\nharmless Client from any losses.'
+    assert [f['clause'] for f in audit_risky_clauses(renewal)] == ['auto_renewal_short_notice']
+    assert [f['clause'] for f in audit_risky_clauses(harmless)] == ['broad_indemnity']
+    assert auto_renewal_notice_days(renewal) == [10]
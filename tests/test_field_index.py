@@ -0,0 +1,51 @@
+from src.app.core import analysis_store, field_index, registry
+
+
+DOCS = {
+    1: 'Agreement between Acme Corp and Beta LLC, dated today.\nGoverning Law: Delaware\n'
+       'Liability cap: $2,000,000 USD\nThe Supplier accepts unlimited liability.\n',
+    2: 'Agreement between Gamma Inc and Acme Corp, dated today.\nGoverning Law: New York\n'
+       'Liability cap: $500,000 USD\nThis auto-renews unless notice of 10 days is given\n',
+    3: 'Governing Law: Delaware\nThis auto-renews unless notice of 60 days is given\n',
+}
+
+
+def _register(monkeypatch, tmp_path):
+    monkeypatch.setattr(analysis_store, 'ANALYSIS_DIR', str(tmp_path))
+    monkeypatch.setattr(field_index, '_fingerprint', None)
+    metas = []
+    for doc_id, text in DOCS.items():
+        txt = tmp_path / f'{doc_id}.txt'
+        txt.write_text(text, encoding='utf-8')
+        metas.append({'id': doc_id, 'sha256': f'fi-{doc_id}', 'path_txt': str(txt)})
+    registry.add(metas[:2])
+    return metas
+
+
+def test_field_index_terms_ranges_and_facets(isolated_registry, monkeypatch, tmp_path):
+    metas = _register(monkeypatch, tmp_path)
+    assert field_index.search(governing_law='delaware')['document_ids'] == [1]
+    assert field_index.search(party='Acme Corp')['document_ids'] == [1, 2]
+    assert field_index.search(liability_cap_min=1_000_000)['document_ids'] == [1]
+    assert field_index.search(clause='unlimited_liability')['document_ids'] == [1]
+
+    # Newly registered documents are picked up incrementally
+    registry.add(metas[2:])
+    assert field_index.search(governing_law='Delaware')['document_ids'] == [1, 3]
+    assert field_index.search(notice_days_min=30)['document_ids'] == [3]
+    assert field_index.search(notice_days_max=30, party='acme')['document_ids'] == [2]
+    result = field_index.search(governing_law='delaware', severity='high')
+    assert result['document_ids'] == [1]
+    assert result['facets']['clause'] == {'unlimited_liability': 1, 'liability_cap_high': 1}
+    assert field_index.search(governing_law='Ohio')['document_ids'] == []
+
+
+def test_documents_search_endpoint(isolated_registry, monkeypatch, tmp_path):
+    from fastapi.testclient import TestClient
+    from src.app.main import app
+
+    _register(monkeypatch, tmp_path)
+    body = TestClient(app).get('/documents/search', params={'party': 'acme', 'liability_cap_max': 1000000}).json()
+    assert body['status'] == 'ok'
+    assert body['count'] == 1 and body['document_ids'] == [2]
+    assert body['facets']['clause'] == {'auto_renewal_short_notice': 1}
@@ -0,0 +1,230 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.app.core import index_faiss
+from src.app.core.config import settings
+
+
+def _chunks(doc_id, texts):
+    return [{'text': t, 'doc_id': doc_id, 'start': 0, 'end': len(t)} for t in texts]
+
+
+def test_add_chunks_appends_searchable_segment():
+    index_faiss.rebuild_index(_chunks(1, ['The governing law is the State of Delaware.', 'Payment is due in thirty days.']))
+    index_faiss.add_chunks(_chunks(2, ['Either party may terminate with ninety days written notice.']))
+    assert len(index_faiss.load_state().segments) == 2
+    assert index_faiss.chunk_count() == 3
+    res = index_faiss.query('terminate notice', top_k=2)
+    assert res[0]['doc_id'] == 2
+    assert res[0]['chunk_index'] == 2
+
+
+def test_merge_folds_segments_and_keeps_order(monkeypatch):
+    monkeypatch.setattr(settings, 'INDEX_MAX_SEGMENTS', 2)
+    monkeypatch.setattr(settings, 'INDEX_MERGE_FACTOR', 2)
+    index_faiss.rebuild_index(_chunks(1, ['alpha contract renewal clause']))
+    for doc_id, word in [(2, 'bravo'), (3, 'charlie'), (4, 'delta')]:
+        index_faiss.add_chunks(_chunks(doc_id, [f'{word} indemnity obligations']))
+    index_faiss.wait_for_merges()
+    while index_faiss.merge_segments():
+        pass
+    assert len(index_faiss.load_state().segments) <= 2
+    res = index_faiss.query('charlie', top_k=1)
+    assert res[0]['doc_id'] == 3
+    assert res[0]['chunk_index'] == 2
+    # Reloading from the manifest sees the merged layout
+    index_faiss.load_state(force=True)
+    assert index_faiss.chunk_count() == 4
+
+
+def test_sparse_backend_matches_dense(monkeypatch):
+    chunks = _chunks(1, [
+        'The governing law is the State of Delaware.',
+        'Payment is due in thirty days after invoice.',
+        'Either party may terminate with ninety days written notice.',
+    ])
+    index_faiss.rebuild_index(chunks)
+    dense = index_faiss.query('terminate with written notice', top_k=3)
+    monkeypatch.setattr(settings, 'INDEX_BACKEND', 'sparse')
+    index_faiss.rebuild_index(chunks)
+    seg_dir = index_faiss._segment_dir(index_faiss.load_state().segments[0].seg_id)
+    assert 'matrix.npy' not in os.listdir(seg_dir)
+    assert 'csr_data.npy' in os.listdir(seg_dir)
+    index_faiss.load_state(force=True)
+    sparse = index_faiss.query('terminate with written notice', top_k=3)
+    assert [r['chunk_index'] for r in sparse] == [r['chunk_index'] for r in dense]
+    assert [r['score'] for r in sparse] == pytest.approx([r['score'] for r in dense], abs=1e-6)
+    assert sparse[0].keys() == dense[0].keys()
+
+
+def test_snapshot_stays_resident_until_a_new_generation():
+    index_faiss.rebuild_index(_chunks(1, ['resident snapshot text']))
+    snap = index_faiss.load_state()
+    index_faiss.query('snapshot')
+    assert index_faiss.load_state() is snap
+    index_faiss.add_chunks(_chunks(2, ['another generation of text']))
+    assert index_faiss.generation() == snap.generation + 1
+    # A query already holding the old snapshot keeps seeing it unchanged
+    assert len(snap.segments) == 1
+
+
+def test_segments_load_memory_mapped():
+    chunks = _chunks(1, ['Confidential information stays secret.', '', 'Notices go to the registered office.'])
+    chunks[2]['page'] = 3
+    index_faiss.rebuild_index(chunks)
+    before = index_faiss.query('registered office notices', top_k=2)
+    seg = index_faiss.load_state(force=True).segments[0]
+    assert isinstance(seg.matrix, np.memmap)
+    assert list(seg.chunk_texts) == [c['text'] for c in chunks]
+    assert seg.chunk_meta[0] == {'doc_id': 1, 'start': 0, 'end': len(chunks[0]['text']), 'page': None}
+    after = index_faiss.query('registered office notices', top_k=2)
+    assert after == before
+    assert after[0]['page'] == 3
+
+
+def test_versioned_manifests_and_gc(monkeypatch):
+    monkeypatch.setattr(settings, 'INDEX_KEEP_GENERATIONS', 1)
+    monkeypatch.setattr(settings, 'INDEX_GC_GRACE_SECONDS', 0)
+    index_faiss.rebuild_index(_chunks(1, ['first version of the index']))
+    old_id = index_faiss.load_state().segments[0].seg_id
+    index_faiss.rebuild_index(_chunks(1, ['second version of the index']))
+    snap = index_faiss.load_state()
+    assert os.listdir(index_faiss.MANIFESTS_DIR) == [f'{snap.generation:012d}.json']
+    assert os.listdir(index_faiss.SEGMENTS_DIR) == [snap.segments[0].seg_id]
+    assert not os.path.exists(index_faiss._segment_dir(old_id))
+
+
+def test_concurrent_add_chunks_from_worker_processes(tmp_path):
+    import subprocess
+    import sys
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = ('import sys\n'
+              'from src.app.core import index_faiss\n'
+              'for n in range(25):\n'
+              "    index_faiss.add_chunks([{'text': f'clause {sys.argv[1]} {n}', 'doc_id': n, 'start': 0, 'end': 9}])\n"
+              'index_faiss.wait_for_merges()\n')
+    env = dict(os.environ, DATA_DIR=str(tmp_path), INDEX_MAX_SEGMENTS='1000')
+    workers = [subprocess.Popen([sys.executable, '-c', script, name], cwd=root, env=env) for name in ('a', 'b')]
+    assert [w.wait(timeout=120) for w in workers] == [0, 0]
+    manifest = index_faiss._read_manifest(str(tmp_path / 'index' / 'segments.json'))
+    # Every segment either worker committed is in the final generation
+    assert len(manifest['segments']) == 50 and manifest['generation'] == 50
+
+
+def test_reader_keeps_snapshot_when_manifest_points_at_missing_segment():
+    index_faiss.rebuild_index(_chunks(1, ['published generation']))
+    snap = index_faiss.load_state()
+    index_faiss._write_json_atomic(index_faiss.MANIFEST_PATH, {'generation': snap.generation + 1, 'segments': ['gone']})
+    assert index_faiss.load_state() is snap
+    assert index_faiss.query('published')[0]['doc_id'] == 1
+
+
+@pytest.mark.parametrize('kind', ['ivf', 'hnsw'])
+def test_ann_index_types_agree_with_flat(monkeypatch, kind):
+    words = ['alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf', 'hotel']
+    chunks = _chunks(1, [f'{a} {b} clause {i}' for i, (a, b) in enumerate((a, b) for a in words for b in words if a < b)])
+    index_faiss.rebuild_index(chunks)
+    flat = index_faiss.query('charlie golf clause', top_k=3)
+    monkeypatch.setattr(settings, 'FAISS_INDEX_TYPE', kind)
+    monkeypatch.setattr(settings, 'FAISS_ANN_MIN_CHUNKS', 1)
+    index_faiss.rebuild_index(chunks)
+    seg = index_faiss.load_state(force=True).segments[0]
+    assert seg.index is not None
+    assert 'faiss.index' in os.listdir(index_faiss._segment_dir(seg.seg_id))
+    # Exhaustive search parameters make the approximate index exact
+    exact = index_faiss.query('charlie golf clause', top_k=3, nprobe=64, ef_search=256)
+    assert exact[0]['chunk_index'] == flat[0]['chunk_index']
+    assert [r['score'] for r in exact] == pytest.approx([r['score'] for r in flat], abs=1e-5)
+
+
+@pytest.mark.parametrize('backend', ['faiss', 'sparse'])
+def test_doc_filter_searches_only_selected_rows(monkeypatch, backend):
+    monkeypatch.setattr(settings, 'INDEX_BACKEND', backend)
+    index_faiss.rebuild_index(_chunks(1, ['governing law is Delaware', 'payment within thirty days'])
+                              + _chunks(2, ['governing law is England and Wales']))
+    index_faiss.add_chunks(_chunks(3, ['governing law is New York']) + _chunks(1, ['governing law amendments']))
+    seg = index_faiss.load_state().segments[0]
+    assert seg.doc_rows({1}).tolist() == [0, 1]
+    assert seg.doc_rows({9}).tolist() == []
+    res = index_faiss.query('governing law', top_k=5, doc_ids={1})
+    assert {r['doc_id'] for r in res} == {1}
+    assert sorted(r['chunk_index'] for r in res) == [0, 1, 4]
+    unfiltered = {r['chunk_index']: r['score'] for r in index_faiss.query('governing law', top_k=5)}
+    for r in res:
+        if r['chunk_index'] in unfiltered:
+            assert r['score'] == pytest.approx(unfiltered[r['chunk_index']], abs=1e-6)
+    assert index_faiss.query('governing law', doc_ids=set()) == []
+
+
+def test_hashing_vectorizer_matches_tfidf_and_appends_without_refit(monkeypatch):
+    texts = [
+        'The governing law is the State of Delaware.',
+        'Payment is due in thirty days after invoice.',
+        'Either party may terminate with ninety days written notice.',
+        'Notices must be in writing and sent to the registered office.',
+    ]
+    index_faiss.rebuild_index(_chunks(1, texts))
+    tfidf = index_faiss.query('written notice to terminate', top_k=4)
+    monkeypatch.setattr(settings, 'INDEX_VECTORIZER', 'hashing')
+    monkeypatch.setattr(settings, 'CHUNK_BATCH_SIZE', 2)
+    index_faiss.rebuild_index(_chunks(1, texts))
+    hashed = index_faiss.query('written notice to terminate', top_k=4)
+    # Same score per chunk; chunks tied at zero may come back in any order
+    scores = {r['chunk_index']: r['score'] for r in tfidf}
+    assert hashed[0]['chunk_index'] == tfidf[0]['chunk_index']
+    assert {r['chunk_index']: r['score'] for r in hashed} == pytest.approx(scores, abs=1e-5)
+    # Appending a delta segment scores exactly like one segment over everything
+    index_faiss.rebuild_index(_chunks(1, texts[:2]))
+    index_faiss.add_chunks(_chunks(2, texts[2:]))
+    seg = index_faiss.load_state(force=True).segments[1]
+    assert seg.is_hashed() and 'csr_data.npy' in os.listdir(index_faiss._segment_dir(seg.seg_id))
+    appended = index_faiss.query('written notice to terminate', top_k=4)
+    assert [r['score'] for r in appended] == pytest.approx([r['score'] for r in hashed], abs=1e-5)
+
+
+def test_compact_vectors_shrink_footprint(monkeypatch):
+    words = ['alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf', 'hotel']
+    chunks = _chunks(1, [f'{a} {b} clause {i}' for i, (a, b) in enumerate((a, b) for a in words for b in words if a < b)])
+    index_faiss.rebuild_index(chunks)
+    flat = index_faiss.query('charlie golf clause', top_k=3)
+    base = index_faiss.memory_footprint()
+    monkeypatch.setattr(settings, 'FAISS_ANN_MIN_CHUNKS', 1)
+    monkeypatch.setattr(settings, 'INDEX_DENSE_DTYPE', 'float16')
+    index_faiss.rebuild_index(chunks)
+    # Exact float16 segments keep fp16 codes in a flat FAISS index, not matrix.npy
+    seg = index_faiss.load_state(force=True).segments[0]
+    assert seg.matrix is None and isinstance(seg.index, index_faiss.faiss.IndexScalarQuantizer)
+    half = index_faiss.query('charlie golf clause', top_k=3)
+    assert [r['score'] for r in half] == pytest.approx([r['score'] for r in flat], abs=1e-2)
+    footprint = index_faiss.memory_footprint()
+    assert footprint['vectors'] + footprint['ann_index'] < base['vectors']
+    # SVD projection plus SQ8 codes: no matrix.npy at all
+    monkeypatch.setattr(settings, 'INDEX_SVD_DIM', 8)
+    monkeypatch.setattr(settings, 'FAISS_INDEX_TYPE', 'sq8')
+    index_faiss.rebuild_index(chunks)
+    seg = index_faiss.load_state(force=True).segments[0]
+    assert seg.matrix is None and seg.projection is not None
+    assert 'svd.joblib' in os.listdir(index_faiss._segment_dir(seg.seg_id))
+    footprint = index_faiss.memory_footprint()
+    assert footprint['vectors'] == 0 and 0 < footprint['ann_index'] < base['vectors']
+    assert len(index_faiss.query('charlie golf clause', top_k=3)) == 3
+
+
+@pytest.mark.parametrize('kind', index_faiss.QUANTISED_INDEX_TYPES)
+def test_doc_filter_on_quantised_index_types(monkeypatch, kind):
+    words = ['alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf', 'hotel']
+    pairs = [(a, b) for a in words for b in words if a < b]
+    chunks = [{'text': f'{a} {b} clause {i}', 'doc_id': i % 7 + 1, 'start': 0, 'end': 1}
+              for i, (a, b) in enumerate(pairs * 4)]
+    monkeypatch.setattr(settings, 'FAISS_INDEX_TYPE', kind)
+    monkeypatch.setattr(settings, 'FAISS_ANN_MIN_CHUNKS', 5)
+    monkeypatch.setattr(settings, 'INDEX_SVD_DIM', 16)
+    index_faiss.rebuild_index(chunks)
+    seg = index_faiss.load_state(force=True).segments[0]
+    assert seg.matrix is None and seg.index is not None
+    # One document (16 rows, over FAISS_ANN_MIN_CHUNKS) and several documents
+    for doc_ids in ({3}, {1, 2, 4, 6}):
+        res = index_faiss.query('charlie golf clause', top_k=5, doc_ids=doc_ids, nprobe=64)
+        assert res and {r['doc_id'] for r in res} <= doc_ids
@@ -0,0 +1,42 @@
+import os
+
+from fastapi.testclient import TestClient
+from pdfminer.high_level import extract_text
+
+from src.app.main import app
+from src.app.core.extract import pdf_to_text_with_pages, chunk_text_iter_with_spans
+
+
+DOCS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'data', 'docs')
+client = TestClient(app)
+
+
+def _pdf(name):
+    with open(os.path.join(DOCS, name), 'rb') as f:
+        return f.read()
+
+
+def test_page_offsets_match_pdfminer_text():
+    text, offsets = pdf_to_text_with_pages(_pdf('6.pdf'))
+    assert text == extract_text(os.path.join(DOCS, '6.pdf'))
+    assert offsets[0] == 0 and len(offsets) == 4
+    for off in offsets[1:]:
+        assert text[off - 1] == '\f'
+    chunks = list(chunk_text_iter_with_spans(text, offsets))
+    assert chunks[-1]['end'] == len(text)
+    assert [c['page'] for c in chunks] == sorted(c['page'] for c in chunks)
+    assert chunks[-1]['page'] == 4
+
+
+def test_batch_ingest_keeps_upload_order_and_cites_pages():
+    files = [
+        ('files', ('a.pdf', _pdf('7.pdf'), 'application/pdf')),
+        ('files', ('b.pdf', _pdf('Professional_NDA.pdf'), 'application/pdf')),
+        ('files', ('c.pdf', _pdf('7.pdf'), 'application/pdf')),
+    ]
+    data = client.post('/ingest', files=files).json()
+    assert data['status'] == 'ok'
+    first, second, dup = data['document_ids']
+    assert second == first + 1 and dup == first
+    resp = client.post('/ask', json={'question': 'governing law England Wales'}).json()
+    assert resp['citations'][0]['page'] is not None
@@ -0,0 +1,64 @@
+import fcntl
+import json
+import os
+import time
+
+from fastapi.testclient import TestClient
+
+from src.app.main import app
+from src.app.core import jobs
+
+
+DOCS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'data', 'docs')
+client = TestClient(app)
+
+
+def test_background_ingest_job_reports_document_ids():
+    with open(os.path.join(DOCS, 'new.pdf'), 'rb') as f:
+        pdf = f.read()
+    accepted = client.post('/ingest', params={'background': True},
+                           files={'files': ('new.pdf', pdf, 'application/pdf')}).json()
+    assert accepted['status'] == 'accepted'
+    job = {}
+    for _ in range(300):
+        job = client.get(f"/jobs/{accepted['job_id']}").json()
+        if job['state'] in ('done', 'failed'):
+            break
+        time.sleep(0.05)
+    assert job['state'] == 'done', job
+    assert len(job['document_ids']) == 1
+    metrics = client.get('/metrics').text
+    assert 'ingest_jobs_queued' in metrics
+    assert 'ingest_job_duration_seconds_count{status="done"}' in metrics
+
+
+def test_unknown_job():
+    assert client.get('/jobs/does-not-exist').json()['status'] == 'error'
+
+
+def test_restart_marks_jobs_of_dead_workers_failed(monkeypatch, tmp_path):
+    # A spool dir left behind by earlier processes: one owner still holds its
+    # lock (a live worker), the other is gone
+    monkeypatch.setattr(jobs, 'JOBS_DIR', str(tmp_path))
+    monkeypatch.setattr(jobs, 'OWNERS_DIR', str(tmp_path / 'owners'))
+    (tmp_path / 'owners').mkdir()
+    (tmp_path / 'owners' / 'gone.lock').touch()
+    live = open(tmp_path / 'owners' / 'live.lock', 'w')
+    fcntl.flock(live, fcntl.LOCK_EX)
+    states = {'a': ('queued', 'gone'), 'b': ('running', 'gone'), 'c': ('running', 'live'),
+              'd': ('done', 'gone'), 'e': ('queued', None)}
+    for job_id, (state, owner) in states.items():
+        (tmp_path / job_id).mkdir()
+        (tmp_path / job_id / 'job.json').write_text(json.dumps(
+            {'job_id': job_id, 'state': state, 'error': None, 'files': [], 'owner': owner}))
+    try:
+        assert jobs.recover_interrupted_jobs() == 3
+        after = {job_id: jobs.get_job(job_id) for job_id in states}
+        assert {j for j, job in after.items() if job['state'] == 'failed'} == {'a', 'b', 'e'}
+        assert after['a']['error'].startswith('interrupted')
+        assert after['c']['state'] == 'running' and after['d']['state'] == 'done'
+        assert 'owner' not in after['c'] and not (tmp_path / 'owners' / 'gone.lock').exists()
+        # Idempotent: nothing left to recover
+        assert jobs.recover_interrupted_jobs() == 0
+    finally:
+        live.close()
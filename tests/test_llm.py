@@ -0,0 +1,72 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.app.core import llm
+from src.app.core.config import settings
+from src.app.core.extract import llm_extract_fields, llm_audit_risky_clauses
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    """Answers every chat completion like the Groq API would, recording requests."""
+    requests = []
+    status = 200
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        type(self).requests.append((self.path, body))
+        if 'risk auditor' in body['messages'][0]['content']:
+            content = {'findings': [{'clause': 'unlimited_liability', 'severity': 'high', 'evidence': 'x', 'start': 1, 'end': 2}]}
+        else:
+            content = {'governing_law': 'Delaware', 'parties': ['Acme', 'Beta']}
+        payload = json.dumps({
+            'id': 'chatcmpl-1', 'object': 'chat.completion', 'created': 0, 'model': body['model'],
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': json.dumps(content)}}],
+        }).encode('utf-8')
+        self.send_response(type(self).status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in(monkeypatch, tmp_path):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _StandIn.requests, _StandIn.status = [], 200
+    monkeypatch.setattr(settings, 'GROQ_API_KEY', 'test-key')
+    monkeypatch.setattr(settings, 'GROQ_BASE_URL', f'http://127.0.0.1:{server.server_address[1]}')
+    monkeypatch.setattr(settings, 'LLM_MAX_RETRIES', 0)
+    monkeypatch.setattr(llm, 'CACHE_DIR', str(tmp_path))
+    yield _StandIn
+    server.shutdown()
+
+
+def test_llm_responses_are_cached_per_document_prompt_and_model(stand_in, monkeypatch):
+    fields = llm_extract_fields('Governing Law: Ohio', doc_sha256='doc-1')
+    assert fields['governing_law'] == 'Delaware' and fields['signatories'] == []
+    assert stand_in.requests[0][0].endswith('/chat/completions')
+    assert llm_extract_fields('Governing Law: Ohio', doc_sha256='doc-1') == fields
+    assert len(stand_in.requests) == 1
+
+    findings = llm_audit_risky_clauses('Governing Law: Ohio', doc_sha256='doc-1')
+    assert findings[0]['clause'] == 'unlimited_liability'
+    monkeypatch.setattr(settings, 'GROQ_MODEL', 'another-model')
+    llm_extract_fields('Governing Law: Ohio', doc_sha256='doc-1')
+    assert len(stand_in.requests) == 3
+
+
+def test_llm_errors_fall_back_to_regex_and_are_not_cached(stand_in):
+    stand_in.status = 500
+    fields = llm_extract_fields('Governing Law: Ohio\n', doc_sha256='doc-2')
+    assert fields['governing_law'].startswith('Ohio')
+    stand_in.status = 200
+    assert llm_extract_fields('Governing Law: Ohio\n', doc_sha256='doc-2')['governing_law'] == 'Delaware'
+    assert len(stand_in.requests) == 2
@@ -0,0 +1,52 @@
+import json
+
+from src.app.core import registry
+
+
+def test_lookups_and_external_writes(isolated_registry, tmp_path):
+    assert registry.next_id() == 1 and registry.get(1) is None
+
+    txt = tmp_path / '1.txt'
+    txt.write_text('hello contract', encoding='utf-8')
+    registry.add([{'id': 1, 'sha256': 'aa', 'path_txt': str(txt)}])
+    assert registry.get(1)['sha256'] == 'aa'
+    assert registry.get_by_sha256('aa')['id'] == 1
+    assert registry.load_text(1) == 'hello contract'
+    assert registry.next_id() == 2
+
+    # Another worker process rewrote docs.json: picked up on the next lookup
+    docs = json.loads((tmp_path / 'docs.json').read_text(encoding='utf-8'))
+    docs.append({'id': 7, 'sha256': 'bb'})
+    (tmp_path / 'docs.json').write_text(json.dumps(docs), encoding='utf-8')
+    assert registry.get_by_sha256('bb')['id'] == 7
+    assert registry.next_id() == 8
+    assert registry.count() == 2
+
+
+def test_ids_created_between(isolated_registry):
+    import datetime
+    registry.add([
+        {'id': 1, 'created_at': '2026-01-01T00:00:00Z'},
+        {'id': 2, 'created_at': '2026-02-01T00:00:00Z'},
+        {'id': 3},
+    ])
+    feb = datetime.datetime(2026, 2, 1)
+    assert registry.ids_created_between() == [1, 2]
+    assert registry.ids_created_between(after=feb) == [2]
+    assert registry.ids_created_between(before=feb) == [1]
+
+
+def test_concurrent_adds_from_worker_processes(tmp_path):
+    import os
+    import subprocess
+    import sys
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = ('import sys\n'
+              'from src.app.core import registry\n'
+              'for n in range(60):\n'
+              "    registry.add([{'id': int(sys.argv[1]) + n}])\n")
+    env = dict(os.environ, DATA_DIR=str(tmp_path))
+    workers = [subprocess.Popen([sys.executable, '-c', script, start], cwd=root, env=env) for start in ('0', '1000')]
+    assert [w.wait(timeout=60) for w in workers] == [0, 0]
+    docs = json.loads((tmp_path / 'index' / 'docs.json').read_text(encoding='utf-8'))
+    assert len(docs) == 120
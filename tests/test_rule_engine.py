@@ -0,0 +1,28 @@
+from src.app.core import index_faiss
+from src.app.core.rule_engine import build_sentence_index, rule_engine_answer
+
+
+CHUNK = ('Either party may terminate this Agreement.  Termination requires notice! '
+         'NOTICES go to the registered office?\nPayment terms: thirty days.')
+
+
+def test_sentence_index_spans_and_postings():
+    runs, masks, spans = build_sentence_index(CHUNK).split('\n')
+    bounds = [int(x) for x in spans.split(' ')]
+    assert [CHUNK[s:e] for s, e in zip(bounds[::2], bounds[1::2])] == [
+        'Either party may terminate this Agreement.', 'Termination requires notice!',
+        'NOTICES go to the registered office?', 'Payment terms: thirty days.']
+    postings = {run: int(bits, 16) for run, bits in zip(runs.split(' '), masks.split(' '))}
+    assert postings['notice'] == 0b10 and postings['notices'] == 0b100
+    assert 'may' not in postings
+
+
+def test_precomputed_index_gives_the_same_answer():
+    question = 'What notice is needed to terminate? Terms?'
+    expected = 'Either party may terminate this Agreement.\nTermination requires notice!\n' \
+               'NOTICES go to the registered office?\nPayment terms: thirty days.'
+    assert rule_engine_answer(question, [CHUNK]) == expected
+    index_faiss.rebuild_index([{'text': CHUNK, 'doc_id': 1, 'start': 0, 'end': len(CHUNK)}])
+    retrieved = index_faiss.query(question, top_k=1)
+    assert retrieved[0]['sentences'] == build_sentence_index(CHUNK)
+    assert rule_engine_answer(question, [CHUNK], sentence_indexes=[retrieved[0]['sentences']]) == expected